@@ -0,0 +1,343 @@
+"""Headless benchmarks for the calculator's hot paths.
+
+Runs the calculation, Excel save/load and PDF export code of
+secondsimulator.py over a synthetic portfolio and prints one JSON document
+with throughput, latency percentiles and peak memory per benchmark:
+
+    python benchmark.py --properties 200 --repeat 5 --output bench.json
+
+PropertyTab.calculate_now (calculate without the job runner) needs Tk. It
+runs against $DISPLAY, or an Xvfb started for the run, and otherwise
+against a stub frame: the tab then stays unbuilt, which is the same path
+the app takes for tabs that were never opened (everything but drawing the
+widgets and charts).
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import secondsimulator as sim
+from tests.conftest import synthetic_portfolio
+
+PERCENTILES = (50, 90, 99)
+
+
+# --- SYNTHETIC PORTFOLIO ---
+def loan_scenarios(portfolio):
+    """(loan_amount, annual_rate, years) for every rate/term scenario."""
+    scenarios = []
+    for inputs in portfolio:
+        price = float(inputs.price or inputs.available_funds)
+        loan = price * float(inputs.ltv) / 100
+        for rate, years in zip(inputs.rates, inputs.years):
+            scenarios.append((loan, float(rate), int(years)))
+    return scenarios
+
+
+# --- MEASUREMENT ---
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+def measure(name, make_calls, repeat, items_per_call=1):
+    """Time every call returned by make_calls(), `repeat` times over.
+
+    make_calls runs untimed before each pass, so it can clear caches or
+    build fresh tabs. A further untimed pass under tracemalloc gives the
+    peak Python memory of one pass.
+    """
+    latencies = []
+    for _ in range(repeat):
+        for call in make_calls():
+            start = time.perf_counter_ns()
+            call()
+            latencies.append(time.perf_counter_ns() - start)
+
+    calls = make_calls()
+    tracemalloc.start()
+    for call in calls:
+        call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    busy = sum(latencies) / 1e9
+    ms = [value / 1e6 for value in latencies]
+    report = {
+        "name": name,
+        "calls": len(latencies),
+        "items_per_call": items_per_call,
+        "seconds": round(busy, 6),
+        "throughput_per_s": round(len(latencies) * items_per_call / busy, 3) if busy else None,
+        "latency_ms": {f"p{p}": round(percentile(ms, p), 6) for p in PERCENTILES},
+        "peak_memory_bytes": peak,
+    }
+    report["latency_ms"].update(mean=round(sum(ms) / len(ms), 6) if ms else 0.0,
+                                max=round(ms[-1], 6) if ms else 0.0)
+    return report
+
+def skipped(name, reason):
+    return {"name": name, "skipped": reason}
+
+def cold(calls):
+    """make_calls for a pass that starts with empty memoization caches."""
+    def make_calls():
+        sim.clear_caches()
+        return calls
+    return make_calls
+
+def warm(calls):
+    def make_calls():
+        for call in calls:
+            call()
+        return calls
+    return make_calls
+
+
+# --- DISPLAY ---
+@contextmanager
+def virtual_display(mode):
+    """Yield the display mode used: "display", "xvfb" or "stub"."""
+    if mode == "none" or (mode == "auto" and not os.environ.get("DISPLAY") and not shutil.which("Xvfb")):
+        yield "stub"
+        return
+    if mode == "auto" and os.environ.get("DISPLAY"):
+        yield "display"
+        return
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        raise SystemExit("Xvfb was not found; use --display none to run the GUI paths on a stub.")
+    read_fd, write_fd = os.pipe()
+    process = subprocess.Popen([xvfb, "-displayfd", str(write_fd), "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                               pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(write_fd)
+    previous = os.environ.get("DISPLAY")
+    try:
+        with os.fdopen(read_fd) as pipe:
+            number = pipe.readline().strip()
+        if not number:
+            raise SystemExit("Xvfb failed to start.")
+        os.environ["DISPLAY"] = f":{number}"
+        yield "xvfb"
+    finally:
+        process.terminate()
+        process.wait()
+        if previous is None:
+            os.environ.pop("DISPLAY", None)
+        else:
+            os.environ["DISPLAY"] = previous
+
+
+class StubFrame:
+    """Just enough of ttk.Frame for an unbuilt PropertyTab."""
+    master = None
+
+    def __init__(self, parent=None, **kwargs):
+        pass
+
+    def pack(self, **kwargs):
+        pass
+
+    def destroy(self):
+        pass
+
+
+@contextmanager
+def stub_frames():
+    real = sim.ttk.Frame
+    sim.ttk.Frame = StubFrame
+    try:
+        yield
+    finally:
+        sim.ttk.Frame = real
+
+def tab_calculate_calls(portfolio, display):
+    """make_calls running PropertyTab.set_inputs + calculate_now on fresh tabs."""
+    job_runner = sim.JobRunner(None)
+    if display == "stub":
+        def make_calls():
+            sim.clear_caches()
+            with stub_frames():
+                tabs = [sim.PropertyTab(None, n, None, job_runner) for n in range(len(portfolio))]
+            return [lambda tab=tab, inputs=inputs: (tab.set_inputs(inputs), tab.calculate_now())
+                    for tab, inputs in zip(tabs, portfolio)]
+        return make_calls, None
+
+    root = sim.tk.Tk()
+    root.geometry("1200x900")
+    notebook = sim.ttk.Notebook(root)
+    notebook.pack(expand=True, fill="both")
+    live = []
+
+    def make_calls():
+        sim.clear_caches()
+        for tab in live:
+            tab.release_charts()
+            notebook.forget(tab.frame)
+            tab.frame.destroy()
+        live.clear()
+        for n in range(len(portfolio)):
+            tab = sim.PropertyTab(notebook, n, root, job_runner)
+            notebook.add(tab.frame, text=f"נכס {n + 1}")
+            tab.build()
+            live.append(tab)
+        root.update()
+
+        def run(tab, inputs):
+            tab.set_inputs(inputs)
+            tab.calculate_now()
+            root.update_idletasks()
+        return [lambda tab=tab, inputs=inputs: run(tab, inputs) for tab, inputs in zip(live, portfolio)]
+    return make_calls, root
+
+
+# --- BENCHMARKS ---
+def run_benchmarks(args, display):
+    portfolio = synthetic_portfolio(args.properties, args.seed)
+    scenarios = loan_scenarios(portfolio)
+    prices = [float(inputs.price or inputs.available_funds) for inputs in portfolio]
+    affordability = [inputs for inputs in portfolio if inputs.calculate_affordability]
+    selected = set(args.only or BENCHMARKS)
+    reports = []
+    workdir = tempfile.mkdtemp(prefix="mortgage-bench-")
+    workbook = os.path.join(workdir, "portfolio.xlsx")
+
+    def want(name):
+        return name in selected
+
+    try:
+        payment = [lambda s=s: sim.calculate_monthly_payment(*s) for s in scenarios]
+        amortization = [lambda s=s: sim.generate_amortization_df(*s) for s in scenarios]
+        tax = [lambda price=price: sim.calculate_purchase_tax(price) for price in prices]
+        if want("monthly_payment"):
+            reports.append(measure("monthly_payment_cold", cold(payment), args.repeat))
+            reports.append(measure("monthly_payment_warm", warm(payment), args.repeat))
+        if want("amortization"):
+            reports.append(measure("amortization_df_cold", cold(amortization), args.repeat))
+            reports.append(measure("amortization_df_warm", warm(amortization), args.repeat))
+        if want("purchase_tax"):
+            reports.append(measure("purchase_tax", lambda: tax, args.repeat))
+        if want("affordability"):
+            solve = [lambda inputs=inputs: sim.compute_property(inputs) for inputs in affordability]
+            reports.append(measure("affordability_compute_property", cold(solve), args.repeat))
+        if want("tab_calculate"):
+            root = None
+            try:
+                make_calls, root = tab_calculate_calls(portfolio, display)
+                report = measure("tab_calculate", make_calls, args.repeat)
+                report["display"] = display
+                reports.append(report)
+            except sim.tk.TclError as e:
+                reports.append(skipped("tab_calculate", f"Tk unavailable: {e}"))
+            finally:
+                if root is not None:
+                    root.destroy()
+
+        if want("save_data") or want("load_data") or want("export_pdf"):
+            results = [sim.compute_property(inputs) for inputs in portfolio]
+        if want("save_data"):
+            # As save_data runs it on the worker: every tab changed, so each
+            # property is recomputed before the workbook is written.
+            work = [(inputs, None) for inputs in portfolio]
+            save = [lambda: sim._save_data_job(sim.Job("save_data"), workbook, work)]
+            reports.append(measure("save_data", cold(save), args.repeat, len(portfolio)))
+            write = [lambda: sim.write_property_workbook(workbook, results)]
+            reports.append(measure("excel_write", lambda: write, args.repeat, len(portfolio)))
+        if want("load_data"):
+            if not os.path.exists(workbook):
+                sim.write_property_workbook(workbook, results)
+            load = [lambda: sim.read_property_workbook(workbook, sim.Job("load_data"))]
+            report = measure("load_data", cold(load), args.repeat, len(portfolio))
+            report["workbook_bytes"] = os.path.getsize(workbook)
+            reports.append(report)
+        if want("export_pdf"):
+            try:
+                sim.ensure_pdf_support()
+            except Exception as e:
+                reports.append(skipped("export_pdf", f"PDF support unavailable: {e}"))
+            else:
+                exported = results[:args.pdf_properties]
+                pdf = [lambda n=n, result=result: sim.write_property_pdf(
+                           os.path.join(workdir, f"property-{n}.pdf"), result, f"נכס {n + 1}", False, sim.Job("export_pdf"))
+                       for n, result in enumerate(exported)]
+                reports.append(measure("export_pdf", lambda: pdf, args.repeat))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return reports
+
+BENCHMARKS = ("monthly_payment", "amortization", "purchase_tax", "affordability",
+              "tab_calculate", "save_data", "load_data", "export_pdf")
+
+
+def environment(args, display):
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": sim.np.__version__,
+        "seed": args.seed,
+        "properties": args.properties,
+        "repeat": args.repeat,
+        "pdf_properties": min(args.pdf_properties, args.properties),
+        "display": display,
+    }
+    for name in ("pandas", "openpyxl", "reportlab", "matplotlib"):
+        try:
+            info[name] = getattr(__import__(name), "__version__", None) or getattr(sys.modules[name], "Version", None)
+        except ImportError:
+            info[name] = None
+    return info
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the mortgage calculator headlessly.")
+    parser.add_argument("--properties", type=int, default=50, help="size of the synthetic portfolio")
+    parser.add_argument("--repeat", type=int, default=3, help="timed passes per benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pdf-properties", type=int, default=5, help="properties exported per PDF pass")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="run only these benchmarks")
+    parser.add_argument("--display", choices=("auto", "xvfb", "none"), default="auto",
+                        help="auto: $DISPLAY, else Xvfb, else stub; none: always stub")
+    parser.add_argument("--output", help="write the JSON here instead of stdout")
+    args = parser.parse_args(argv)
+    if args.properties < 1 or args.repeat < 1:
+        parser.error("--properties and --repeat must be positive")
+
+    started = time.perf_counter()
+    with virtual_display(args.display) as display:
+        reports = run_benchmarks(args, display)
+    document = {
+        "environment": environment(args, display),
+        "benchmarks": reports,
+        "wall_seconds": round(time.perf_counter() - started, 3),
+    }
+    try:
+        import resource
+        # ru_maxrss is in KiB on Linux and in bytes on macOS.
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        document["peak_rss_bytes"] = maxrss if sys.platform == "darwin" else maxrss * 1024
+    except ImportError:
+        document["peak_rss_bytes"] = None
+
+    text = json.dumps(document, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,74 +1,446 @@
+import time
+STARTUP_STARTED = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
-import pandas as pd
+import importlib
+import inspect
 import io
-from PIL import Image
-import openpyxl
-
-# --- NEW IMPORTS FOR PDF GENERATION ---
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image as RLImage, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-# For Hebrew support in ReportLab:
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib.enums import TA_RIGHT, TA_LEFT, TA_CENTER
-from reportlab.lib.styles import ParagraphStyle
-
-# Register a font that supports Hebrew characters (e.g., Arial Unicode MS or DejaVuSans)
-# You might need to provide the full path to a .ttf file if it's not in your system's font paths
-# For example, download 'DejaVuSans.ttf' and place it in your script's directory, or
-# 'arial.ttf' if you are on Windows and it's typically found at C:/Windows/Fonts/arial.ttf
-
-# --- MODIFIED FONT REGISTRATION ---
-try:
-    # Register the regular font
-    pdfmetrics.registerFont(TTFont('DejaVuSans', 'DejaVuSans.ttf'))
-    # Register the bold font (assuming DejaVuSans-Bold.ttf exists)
-    pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', 'DejaVuSans-Bold.ttf'))
-    # Register the font family to link regular and bold versions
-    pdfmetrics.registerFontFamily('DejaVuSans',
-                                  normal='DejaVuSans',
-                                  bold='DejaVuSans-Bold',
-                                  italic='DejaVuSans', # If you don't have italic, map to normal
-                                  boldItalic='DejaVuSans-Bold') # If you don't have bold italic, map to bold
-
-    # Define a style for Hebrew text that aligns right-to-left
-    # Note: ReportLab's bidi support can be complex. For simple strings, it often works.
-    # For complex RTL layouts, more advanced methods or external libraries might be needed.
-    # We will set alignment to TA_RIGHT for Hebrew.
-    heb_style = ParagraphStyle(name='Hebrew', fontName='DejaVuSans', fontSize=10, alignment=TA_RIGHT)
-    # Use the 'DejaVuSans-Bold' font name directly for headings if you prefer,
-    # or rely on the <b> tag and registerFontFamily for automatic bolding.
-    # For headings, it's often better to explicitly set the fontName to the bold variant
-    # if you want consistent bolding without relying on HTML tags inside Paragraphs.
-    heb_heading_style = ParagraphStyle(name='HebrewHeading', fontName='DejaVuSans-Bold', fontSize=14, alignment=TA_RIGHT, spaceAfter=6)
-    heb_subheading_style = ParagraphStyle(name='HebrewSubHeading', fontName='DejaVuSans-Bold', fontSize=12, alignment=TA_RIGHT, spaceAfter=4)
-except Exception as e:
-    messagebox.showwarning("Font Warning", f"Could not load DejaVuSans font for PDF. Hebrew text may not display correctly: {e}\nMake sure 'DejaVuSans.ttf' and 'DejaVuSans-Bold.ttf' are in the script's directory or provide full paths.")
-    # Fallback to a default font if DejaVuSans isn't found
-    heb_style = ParagraphStyle(name='Hebrew', fontName='Helvetica', fontSize=10, alignment=TA_RIGHT)
-    heb_heading_style = ParagraphStyle(name='HebrewHeading', fontName='Helvetica-Bold', fontSize=14, alignment=TA_RIGHT, spaceAfter=6)
-    heb_subheading_style = ParagraphStyle(name='HebrewSubHeading', fontName='Helvetica-Bold', fontSize=12, alignment=TA_RIGHT, spaceAfter=4)
-    
+import os
+import sys
+import json
+import queue
+import sqlite3
+import bisect
+import functools
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from dataclasses import asdict, dataclass, field, fields, replace
+
+# --- STARTUP BUDGET ---
+# Only tkinter and numpy are imported eagerly. pandas loads on first use,
+# matplotlib when a tab first has a chart to draw, and reportlab (with the
+# PDF font registration) on the first PDF export. Run with --startup-report
+# to print the time to first window and the per-module import times.
+STARTUP_BUDGET_SECONDS = 1.0
+IMPORT_TIMES = {}
+
+def timed_import(name):
+    """Import a module by name, recording its first import time in IMPORT_TIMES."""
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    IMPORT_TIMES.setdefault(name, time.perf_counter() - start)
+    return module
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = timed_import(self._name)
+        return getattr(self._module, attr)
+
+
+np = timed_import("numpy")
+pd = LazyModule("pandas")
+
+def report_startup(stream=None):
+    elapsed = time.perf_counter() - STARTUP_STARTED
+    report = {
+        "time_to_first_window": round(elapsed, 4),
+        "budget": STARTUP_BUDGET_SECONDS,
+        "within_budget": elapsed <= STARTUP_BUDGET_SECONDS,
+        "imports": {name: round(seconds, 4) for name, seconds in IMPORT_TIMES.items()},
+    }
+    json.dump(report, stream or sys.stdout, indent=2)
+    (stream or sys.stdout).write("\n")
+    return report
+
+@functools.lru_cache(maxsize=None)
+def _matplotlib_figure_class():
+    matplotlib = timed_import("matplotlib")
+    # Configure Matplotlib for Hebrew support
+    # Using 'DejaVu Sans' as a fallback if 'Arial Unicode MS' is not available
+    matplotlib.rcParams['font.family'] = 'DejaVu Sans' 
+    matplotlib.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'DejaVu Sans', 'sans-serif'] 
+    matplotlib.rcParams['axes.unicode_minus'] = False 
+    return timed_import("matplotlib.figure").Figure
+
+@functools.lru_cache(maxsize=None)
+def tk_chart_classes():
+    """(Figure, FigureCanvasTkAgg), importing matplotlib on first call."""
+    Figure = _matplotlib_figure_class()
+    backend_tkagg = timed_import("matplotlib.backends.backend_tkagg")
+    return Figure, backend_tkagg.FigureCanvasTkAgg
+
+@functools.lru_cache(maxsize=None)
+def agg_chart_classes():
+    """(Figure, FigureCanvasAgg) for rendering charts off-screen, on any thread."""
+    Figure = _matplotlib_figure_class()
+    backend_agg = timed_import("matplotlib.backends.backend_agg")
+    return Figure, backend_agg.FigureCanvasAgg
+
+# --- PDF SUPPORT (loaded on first export) ---
+_pdf_support_loaded = False
+# Exports call ensure_pdf_support from worker threads as well as the Tk thread.
+_pdf_support_lock = threading.Lock()
+
+def ensure_pdf_support(parent=None):
+    """Import reportlab and register the Hebrew fonts the first time a PDF is made."""
+    if _pdf_support_loaded:
+        return
+    with _pdf_support_lock:
+        if not _pdf_support_loaded:
+            _load_pdf_support(parent)
+
+def _load_pdf_support(parent):
+    global _pdf_support_loaded, A4, SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, RLImage, PageBreak, KeepTogether
+    global getSampleStyleSheet, inch, colors, heb_style, heb_heading_style, heb_subheading_style
+    start = time.perf_counter()
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image as RLImage, PageBreak, KeepTogether
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.lib import colors
+    # For Hebrew support in ReportLab:
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.lib.enums import TA_RIGHT
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab import rl_config
+    # Binary image streams: ASCII85-encoding every chart dominated build time.
+    rl_config.useA85 = 0
+
+    # Register a font that supports Hebrew characters (e.g., Arial Unicode MS or DejaVuSans)
+    # You might need to provide the full path to a .ttf file if it's not in your system's font paths
+    # For example, download 'DejaVuSans.ttf' and place it in your script's directory, or
+    # 'arial.ttf' if you are on Windows and it's typically found at C:/Windows/Fonts/arial.ttf
+    try:
+        # Register the regular font
+        pdfmetrics.registerFont(TTFont('DejaVuSans', 'DejaVuSans.ttf'))
+        # Register the bold font (assuming DejaVuSans-Bold.ttf exists)
+        pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', 'DejaVuSans-Bold.ttf'))
+        # Register the font family to link regular and bold versions
+        pdfmetrics.registerFontFamily('DejaVuSans',
+                                      normal='DejaVuSans',
+                                      bold='DejaVuSans-Bold',
+                                      italic='DejaVuSans', # If you don't have italic, map to normal
+                                      boldItalic='DejaVuSans-Bold') # If you don't have bold italic, map to bold
+
+        # Define a style for Hebrew text that aligns right-to-left
+        # Note: ReportLab's bidi support can be complex. For simple strings, it often works.
+        # We will set alignment to TA_RIGHT for Hebrew.
+        heb_style = ParagraphStyle(name='Hebrew', fontName='DejaVuSans', fontSize=10, alignment=TA_RIGHT)
+        # For headings, explicitly use the bold variant for consistent bolding.
+        heb_heading_style = ParagraphStyle(name='HebrewHeading', fontName='DejaVuSans-Bold', fontSize=14, alignment=TA_RIGHT, spaceAfter=6)
+        heb_subheading_style = ParagraphStyle(name='HebrewSubHeading', fontName='DejaVuSans-Bold', fontSize=12, alignment=TA_RIGHT, spaceAfter=4)
+    except Exception as e:
+        if parent is not None:
+            messagebox.showwarning("Font Warning", f"Could not load DejaVuSans font for PDF. Hebrew text may not display correctly: {e}\nMake sure 'DejaVuSans.ttf' and 'DejaVuSans-Bold.ttf' are in the script's directory or provide full paths.", parent=parent)
+        # Fallback to a default font if DejaVuSans isn't found
+        heb_style = ParagraphStyle(name='Hebrew', fontName='Helvetica', fontSize=10, alignment=TA_RIGHT)
+        heb_heading_style = ParagraphStyle(name='HebrewHeading', fontName='Helvetica-Bold', fontSize=14, alignment=TA_RIGHT, spaceAfter=6)
+        heb_subheading_style = ParagraphStyle(name='HebrewSubHeading', fontName='Helvetica-Bold', fontSize=12, alignment=TA_RIGHT, spaceAfter=4)
+    IMPORT_TIMES.setdefault("reportlab", time.perf_counter() - start)
+    _pdf_support_loaded = True
+
 # Constants for fees
 LAWYER_FEE_RATE = 0.01
 BROKER_FEE_RATE = 0.02
 
+
+class CalculationError(Exception):
+    """Invalid or missing input; title/message are shown to the user as-is."""
+
+    def __init__(self, title, message):
+        super().__init__(message)
+        self.title = title
+        self.message = message
+
+
+# --- MEMOIZATION ---
+# save_data, export_to_pdf and load_data re-run calculate() on every tab, which
+# asks for the same payments, schedules and taxes again. These bounded LRU
+# caches sit in front of the pure calculation functions.
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and/or total bytes."""
+
+    def __init__(self, name, max_entries=None, max_bytes=None, sizeof=sys.getsizeof):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (found, value) and mark the entry as most recently used."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key][0]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            self._evict()
+
+    def resize(self, max_entries=None, max_bytes=None):
+        with self._lock:
+            self.max_entries = max_entries
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _evict(self):
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self.current_bytes > self.max_bytes)
+        ):
+            _, (_, size) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+
+
+PAYMENT_CACHE = LRUCache("calculate_monthly_payment", max_entries=4096)
+AMORTIZATION_CACHE = LRUCache("generate_schedule", max_entries=512, max_bytes=64 * 1024 * 1024, sizeof=lambda schedule: schedule.nbytes)
+PURCHASE_TAX_CACHE = LRUCache("calculate_purchase_tax", max_entries=4096)
+# PDF charts, keyed by a hash of the schedule they plot (see chart_flowable).
+CHART_IMAGE_CACHE = LRUCache("chart_png", max_entries=2048, max_bytes=64 * 1024 * 1024, sizeof=len)
+CHART_DRAWING_CACHE = LRUCache("chart_drawing", max_entries=64)
+_CACHES = (PAYMENT_CACHE, AMORTIZATION_CACHE, PURCHASE_TAX_CACHE, CHART_IMAGE_CACHE, CHART_DRAWING_CACHE)
+
+def memoize(cache, copy=None):
+    """Cache a function of numeric arguments in `cache`.
+
+    Arguments, positional or by keyword with defaults filled in, are
+    normalized to floats and `func` is called with those floats, so
+    300000, 300000.0 and "300000" share an entry and the same result.
+    `copy` is applied to every returned value so callers can never mutate
+    what is stored in the cache.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        arity = len(signature.parameters)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if kwargs or len(args) != arity:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                args = bound.args
+            key = tuple(float(arg) for arg in args)
+            found, value = cache.get(key)
+            if not found:
+                value = func(*key)
+                cache.put(key, value)
+            return copy(value) if copy is not None else value
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+def cache_stats():
+    return {cache.name: cache.stats() for cache in _CACHES}
+
+def clear_caches():
+    for cache in _CACHES:
+        cache.clear()
+
+# --- TIMING SPANS ---
+# Per-stage timings of calculate, save, load and PDF export, shown in the
+# developer panel (Ctrl+Shift+D) and dumpable as JSON or a Chrome trace
+# (chrome://tracing, Perfetto). Off unless started with --spans or
+# MORTGAGE_SPANS=1; while off, span() hands back one shared no-op context
+# manager, so an instrumented stage costs a method call and nothing else.
+SPAN_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+_SPAN_BUCKETS_NS = tuple(int(bound * 1e6) for bound in SPAN_BUCKETS_MS)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("recorder", "name", "start")
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.record(self.name, self.start)
+        return False
+
+
+class SpanRecorder:
+    """Thread-safe counters, histograms and a bounded trace of timed stages.
+
+    Stage names are "<operation>.<stage>", e.g. "save_data.write". Every
+    stage keeps a count, total, min, max and a histogram over
+    SPAN_BUCKETS_MS; the last max_events spans are kept for the trace.
+    """
+
+    def __init__(self, enabled=False, max_events=100_000):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._events = deque(maxlen=max_events)
+        self._origin = time.perf_counter_ns()
+
+    def span(self, name):
+        """Context manager timing the enclosed block as stage `name`."""
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name)
+
+    def record(self, name, start_ns, end_ns=None):
+        """Record a stage that started at perf_counter_ns() `start_ns`.
+
+        For stages that begin and end in different callbacks or threads.
+        """
+        if not self.enabled:
+            return
+        if end_ns is None:
+            end_ns = time.perf_counter_ns()
+        elapsed = end_ns - start_ns
+        thread = threading.current_thread()
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = [0, 0, elapsed, elapsed, [0] * (len(_SPAN_BUCKETS_NS) + 1)]
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = min(stats[2], elapsed)
+            stats[3] = max(stats[3], elapsed)
+            stats[4][bisect.bisect_left(_SPAN_BUCKETS_NS, elapsed)] += 1
+            self._events.append((name, start_ns, elapsed, thread.ident, thread.name))
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._events.clear()
+
+    def stats(self):
+        """{stage: count, total/mean/min/max and p50/p90/p99 in ms, histogram}.
+
+        Percentiles are read off the histogram: the upper bound of the
+        bucket they fall in, capped at the slowest span seen.
+        """
+        with self._lock:
+            snapshot = {name: (count, total, low, high, list(buckets))
+                        for name, (count, total, low, high, buckets) in self._stats.items()}
+        report = {}
+        for name, (count, total, low, high, buckets) in sorted(snapshot.items()):
+            percentiles = {}
+            for p in (50, 90, 99):
+                target, seen = count * p / 100, 0
+                for bucket, n in enumerate(buckets):
+                    seen += n
+                    if seen >= target:
+                        break
+                bound = _SPAN_BUCKETS_NS[bucket] if bucket < len(_SPAN_BUCKETS_NS) else high
+                percentiles[f"p{p}_ms"] = min(bound, high) / 1e6
+            report[name] = {
+                "count": count,
+                "total_ms": total / 1e6,
+                "mean_ms": total / count / 1e6,
+                "min_ms": low / 1e6,
+                "max_ms": high / 1e6,
+                **percentiles,
+                # Upper bound (ms) of each bucket, None for the overflow bucket.
+                "histogram": [[bound, n] for bound, n in zip(SPAN_BUCKETS_MS + (None,), buckets)],
+            }
+        return report
+
+    def _trace_events(self):
+        with self._lock:
+            events = list(self._events)
+        trace = []
+        threads = {}
+        pid = os.getpid()
+        for name, start_ns, elapsed, tid, thread_name in events:
+            threads[tid] = thread_name
+            trace.append({"name": name, "cat": name.split(".", 1)[0], "ph": "X", "pid": pid, "tid": tid,
+                          "ts": (start_ns - self._origin) / 1000, "dur": elapsed / 1000})
+        for tid, thread_name in threads.items():
+            trace.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}})
+        return trace
+
+    def dump_json(self, filepath):
+        """Write the stage statistics and the recorded spans to `filepath`."""
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump({"stages": self.stats(),
+                       "spans": [event for event in self._trace_events() if event["ph"] == "X"]},
+                      f, ensure_ascii=False, indent=2)
+
+    def dump_chrome_trace(self, filepath):
+        """Write the recorded spans in the Chrome trace event format."""
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self._trace_events(), "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+
+SPANS = SpanRecorder(enabled="--spans" in sys.argv or os.environ.get("MORTGAGE_SPANS", "0") not in ("", "0"))
+
+# Tax brackets and rates for purchase tax (assuming Israeli tax law for example)
+# These are illustrative and should be updated with actual current rates if this is for real use.
+PURCHASE_TAX_BRACKETS = [
+    (0, 6055070, 8),
+    (6055070, float('inf'), 10),
+]
+
+@memoize(PURCHASE_TAX_CACHE)
 def calculate_purchase_tax(price):
-    # Tax brackets and rates for purchase tax (assuming Israeli tax law for example)
-    # These are illustrative and should be updated with actual current rates if this is for real use.
-    brackets = [
-        (0, 6055070, 8),
-        (6055070, float('inf'), 10),
-    ]
     tax = 0
     remaining_price = price
-    for low, high, rate in brackets:
+    for low, high, rate in PURCHASE_TAX_BRACKETS:
         if remaining_price > low:
             taxable_in_current_bracket = min(high, remaining_price) - low if remaining_price > low else 0
             tax += taxable_in_current_bracket * rate / 100
@@ -83,6 +455,64 @@ def estimate_lawyer_fee(price):
 def estimate_broker_fee(price):
     return price * BROKER_FEE_RATE
 
+def total_funds_needed(price, ltv, skip_tax=False, include_tax_in_mortgage=False, lawyer_fee=None, broker_fee=None):
+    """Own capital needed to buy at `price`.
+
+    lawyer_fee / broker_fee of None mean the percentage estimate; a number
+    is a fixed manual fee (pass 0 to skip the broker).
+    """
+    purchase_tax = 0 if skip_tax else calculate_purchase_tax(price)
+    if include_tax_in_mortgage:
+        down_payment = (price + purchase_tax) * ((100 - ltv) / 100)
+    else:
+        down_payment = price * (1 - ltv / 100) + purchase_tax
+    lawyer = estimate_lawyer_fee(price) if lawyer_fee is None else lawyer_fee
+    broker = estimate_broker_fee(price) if broker_fee is None else broker_fee
+    return down_payment + lawyer + broker
+
+def _purchase_tax_kinks():
+    # calculate_purchase_tax carries `remaining_price` from bracket to
+    # bracket, so its kinks sit at bracket edges shifted by the widths of
+    # earlier brackets. Every such point is a candidate; extra ones are
+    # harmless because the function is still linear between them.
+    kinks = {0.0}
+    offsets = [0.0]
+    for low, high, _ in PURCHASE_TAX_BRACKETS:
+        for offset in list(offsets):
+            kinks.update(edge + offset for edge in (low, high) if edge != float('inf'))
+        offsets += [offset + (high - low) for offset in offsets if high != float('inf')]
+    return sorted(k for k in kinks if k >= 0)
+
+def solve_affordable_price(available_funds, ltv, skip_tax=False, include_tax_in_mortgage=False, lawyer_fee=None, broker_fee=None):
+    """Highest price whose total_funds_needed equals available_funds.
+
+    total_funds_needed is continuous, increasing and linear between the
+    purchase-tax kinks, so each value is found exactly by locating its
+    segment and inverting the line. Accepts a scalar or an array of funds
+    and returns the same shape; NaN where the fixed manual fees alone exceed
+    the funds and inf where the needed capital does not grow with price.
+    """
+    def needed(price):
+        return total_funds_needed(price, ltv, skip_tax, include_tax_in_mortgage, lawyer_fee, broker_fee)
+
+    points = np.array(_purchase_tax_kinks())
+    values = np.array([needed(x) for x in points])
+    slopes = np.empty(points.size)
+    slopes[:-1] = np.diff(values) / np.diff(points)
+    # Linear past the last kink; a wide step keeps the slope exact to
+    # rounding instead of losing digits to a 1 shekel difference.
+    step = max(points[-1], 1.0)
+    slopes[-1] = (needed(points[-1] + step) - values[-1]) / step
+
+    funds = np.asarray(available_funds, dtype=np.float64)
+    segment = np.clip(np.searchsorted(values, funds, side='right') - 1, 0, points.size - 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price = points[segment] + (funds - values[segment]) / slopes[segment]
+    price = np.where(slopes[segment] > 0, price, np.inf)
+    price = np.where(funds < values[0], np.nan, price)
+    return float(price) if price.ndim == 0 else price
+
+@memoize(PAYMENT_CACHE)
 def calculate_monthly_payment(loan_amount, annual_rate, years):
     if loan_amount <= 0 or years <= 0:
         return 0.0
@@ -105,35 +535,2189 @@ def calculate_monthly_payment(loan_amount, annual_rate, years):
     
     return loan_amount * (monthly_rate * power_term) / denominator
 
-def generate_amortization_df(loan_amount, annual_rate, years):
-    if loan_amount <= 0 or annual_rate < 0 or years <= 0:
-        return pd.DataFrame() 
+def amortization_arrays(loan_amount, annual_rate, years):
+    """Closed-form annuity schedule as NumPy arrays.
 
-    current_monthly_payment = calculate_monthly_payment(loan_amount, annual_rate, years)
-    months = years * 12
-    balance = loan_amount
-    data = []
+    Returns (months, principal, interest, balance, payment) where every item
+    except the scalar payment has one entry per month. The balance after k of
+    n payments is L*((1+r)^n - (1+r)^k) / ((1+r)^n - 1), so the whole table
+    is computed at once instead of walking it month by month.
+    """
+    months = int(years * 12)
+    payment = calculate_monthly_payment(loan_amount, annual_rate, years)
+    monthly_rate = (annual_rate / 100) / 12
+    k = np.arange(months + 1, dtype=np.float64)
 
-    for month in range(1, months + 1):
-        if balance <= 0:
-            break
+    if abs(monthly_rate) < 1e-9:
+        balance_after = loan_amount * (months - k) / months
+    else:
+        growth = np.power(1 + monthly_rate, k)
+        balance_after = loan_amount * (growth[-1] - growth) / (growth[-1] - 1)
+
+    opening = balance_after[:-1]
+    # Same early stop as the month loop: no rows once the balance is paid off.
+    paid_off = np.flatnonzero(opening <= 0)
+    if paid_off.size:
+        opening = opening[:paid_off[0]]
+
+    interest = opening * monthly_rate
+    principal = np.minimum(payment - interest, opening)
+    balance = np.maximum(opening - principal, 0)
+    month_numbers = np.arange(1, opening.size + 1)
+    return month_numbers, principal, interest, balance, payment
+
+# Columns of a schedule, in the order AmortizationSchedule stores them.
+SCHEDULE_COLUMNS = ("קרן", "ריבית", "יתרה", "תשלום חודשי")
+
+class AmortizationSchedule:
+    """One scenario's amortization table, kept as a single read-only
+    (4, months) array in SCHEDULE_COLUMNS order: shekels rounded to agorot,
+    or int64 agorot with agorot=True. The month column is implied, totals
+    are computed once, and to_df() builds the DataFrame view on demand."""
+
+    __slots__ = ("loan_amount", "annual_rate", "years", "agorot", "values",
+                 "total_principal", "total_interest", "total_paid")
+
+    def __init__(self, values, loan_amount=None, annual_rate=None, years=None, agorot=False):
+        values = np.ascontiguousarray(values, dtype=np.int64 if agorot else np.float64).reshape(len(SCHEDULE_COLUMNS), -1)
+        values.setflags(write=False)
+        self.values = values
+        self.loan_amount = loan_amount
+        self.annual_rate = annual_rate
+        self.years = years
+        self.agorot = agorot
+        totals = values.sum(axis=1) / (100 if agorot else 1)
+        self.total_principal = float(totals[0])
+        self.total_interest = float(totals[1])
+        self.total_paid = float(totals[3])
+
+    def __len__(self):
+        return self.values.shape[1]
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    @property
+    def months(self):
+        return np.arange(1, len(self) + 1)
+
+    def column(self, index):
+        """Column `index` of SCHEDULE_COLUMNS in shekels."""
+        return self.values[index] / 100 if self.agorot else self.values[index]
+
+    principal = property(lambda self: self.column(0))
+    interest = property(lambda self: self.column(1))
+    balance = property(lambda self: self.column(2))
+    payment = property(lambda self: self.column(3))
+
+    def shekels(self):
+        """All columns as a (4, months) float64 array."""
+        return self.values / 100 if self.agorot else self.values
+
+    def to_df(self):
+        if self.empty:
+            return pd.DataFrame()
+        df = pd.DataFrame({"חודש": self.months})
+        for name, values in zip(SCHEDULE_COLUMNS, self.shekels()):
+            df[name] = values
+        return df
+
+def _schedule_values(principal, interest, balance, payment):
+    return np.round(np.vstack([principal, interest, balance, payment]), 2)
+
+@memoize(AMORTIZATION_CACHE)
+def generate_schedule(loan_amount, annual_rate, years, agorot=False):
+    """The schedule of one loan. With agorot=True it is the exact lender
+    schedule from exact_batch_amortization, in int64 agorot; otherwise the
+    closed-form schedule rounded to agorot row by row."""
+    if loan_amount <= 0 or annual_rate < 0 or years <= 0:
+        return AmortizationSchedule(np.zeros((len(SCHEDULE_COLUMNS), 0)), loan_amount, annual_rate, years, bool(agorot))
+    if agorot:
+        exact = exact_batch_amortization([loan_amount], [annual_rate], [years])
+        values = [exact[key][0] for key in ("principal", "interest", "balance", "payment")]
+        return AmortizationSchedule(values, loan_amount, annual_rate, years, agorot=True)
 
-        interest = balance * (annual_rate / 100) / 12
-        principal = current_monthly_payment - interest
-        
-        principal = min(principal, balance)
-        
-        balance -= principal
-        
-        data.append({
-            "חודש": round(month, 2), 
-            "קרן": round(principal, 2), 
-            "ריבית": round(interest, 2),
-            "יתרה": round(max(balance, 0), 2),
-            "תשלום חודשי": round(current_monthly_payment, 2)
+    month_numbers, principal, interest, balance, payment = amortization_arrays(loan_amount, annual_rate, years)
+    values = _schedule_values(principal, interest, balance, np.full(month_numbers.size, round(payment, 2)))
+    return AmortizationSchedule(values, loan_amount, annual_rate, years)
+
+def generate_amortization_df(loan_amount, annual_rate, years):
+    return generate_schedule(loan_amount, annual_rate, years).to_df()
+
+# Rows per chunk for the batch engine: 4096 scenarios x 360 months keeps each
+# intermediate float64 array around 12 MB regardless of the batch size.
+BATCH_CHUNK_SIZE = 4096
+# batch_amortization keeps every row at once (about 33 bytes per scenario
+# and month); above this it refuses and points to iter_batch_amortization.
+BATCH_MAX_BYTES = 512 * 1024 * 1024
+
+def term_months(years):
+    """Payments in a term of `years`, as a float array: whole months only,
+    like the schedules, so payments, totals and point queries agree."""
+    return np.floor(np.asarray(years, dtype=np.float64) * 12)
+
+def monthly_payment_array(loan_amounts, annual_rates, years):
+    """Vectorized calculate_monthly_payment over broadcastable arrays."""
+    loan = np.asarray(loan_amounts, dtype=np.float64)
+    rate = np.asarray(annual_rates, dtype=np.float64)
+    yrs = np.asarray(years, dtype=np.float64)
+    loan, rate, yrs = np.broadcast_arrays(loan, rate, yrs)
+
+    months = term_months(yrs)
+    monthly_rate = (rate / 100) / 12
+    valid = (loan > 0) & (months > 0)
+    linear = np.abs(monthly_rate) < 1e-9
+
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        power_term = np.power(1 + monthly_rate, months)
+        annuity = loan * (monthly_rate * power_term) / (power_term - 1)
+        straight = loan / months
+    payment = np.where(linear | (power_term == 1), straight, annuity)
+    payment = np.where(np.isnan(payment) & ~linear, np.inf, payment)
+    return np.where(valid, payment, 0.0)
+
+# Point queries on the annuity schedule of (loan, rate, years), straight from
+# the closed form: no schedule is built, and every argument may be a scalar
+# or an array (they broadcast). Months are 1-based like the schedule's
+# "חודש" column; month 0 is the start of the loan.
+
+def _point_result(value):
+    return float(value) if np.ndim(value) == 0 else value
+
+def _balance_after(loan, monthly_rate, months, k):
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        growth_n = np.power(1 + monthly_rate, months)
+        annuity = loan * (growth_n - np.power(1 + monthly_rate, k)) / (growth_n - 1)
+        linear = loan * (months - k) / months
+    balance = np.where(np.abs(monthly_rate) < 1e-9, linear, annuity)
+    return np.where((loan > 0) & (months > 0), np.maximum(balance, 0.0), 0.0)
+
+def _query_arrays(loan_amount, annual_rate, years, *months):
+    arrays = np.broadcast_arrays(*(np.asarray(value, dtype=np.float64) for value in (loan_amount, annual_rate, years) + months))
+    loan, rate, yrs = arrays[:3]
+    return (loan, rate / 100 / 12, term_months(yrs)) + tuple(arrays[3:])
+
+def balance_at_month(loan_amount, annual_rate, years, month):
+    """Balance left after the payment of `month`."""
+    loan, monthly_rate, months, month = _query_arrays(loan_amount, annual_rate, years, month)
+    return _point_result(_balance_after(loan, monthly_rate, months, np.clip(month, 0, months)))
+
+def cumulative_principal(loan_amount, annual_rate, years, start_month, end_month):
+    """Principal repaid in months start_month..end_month (inclusive)."""
+    loan, monthly_rate, months, start, end = _query_arrays(loan_amount, annual_rate, years, start_month, end_month)
+    start = np.clip(start, 1, months + 1)
+    end = np.clip(end, 0, months)
+    repaid = _balance_after(loan, monthly_rate, months, start - 1) - _balance_after(loan, monthly_rate, months, end)
+    return _point_result(np.where(end >= start, repaid, 0.0))
+
+def cumulative_interest(loan_amount, annual_rate, years, start_month, end_month):
+    """Interest paid in months start_month..end_month (inclusive)."""
+    loan, monthly_rate, months, start, end = _query_arrays(loan_amount, annual_rate, years, start_month, end_month)
+    count = np.maximum(np.clip(end, 0, months) - np.clip(start, 1, months + 1) + 1, 0)
+    payment = monthly_payment_array(loan_amount, annual_rate, years)
+    principal = cumulative_principal(loan_amount, annual_rate, years, start_month, end_month)
+    return _point_result(np.where(count > 0, payment * count - principal, 0.0))
+
+def loan_totals(loan_amount, annual_rate, years):
+    """Monthly payment, total interest and total paid over the whole term."""
+    payment = monthly_payment_array(loan_amount, annual_rate, years)
+    total_paid = payment * term_months(years)
+    total_interest = np.where(payment > 0, total_paid - np.asarray(loan_amount, dtype=np.float64), 0.0)
+    return _point_result(payment), _point_result(total_interest), _point_result(total_paid)
+
+def months_to_payoff(balance, annual_rate, payment):
+    """Payments needed to repay `balance` with a fixed `payment` (the last
+    one may be partial); inf when the payment does not cover the interest."""
+    balance, rate, payment = np.broadcast_arrays(*(np.asarray(value, dtype=np.float64) for value in (balance, annual_rate, payment)))
+    monthly_rate = rate / 100 / 12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annuity = -np.log1p(-balance * monthly_rate / payment) / np.log1p(monthly_rate)
+        linear = balance / payment
+    months = np.where(np.abs(monthly_rate) < 1e-9, linear, annuity)
+    months = np.where((payment <= balance * monthly_rate) | (payment <= 0), np.inf, np.ceil(months - 1e-9))
+    return _point_result(np.where(balance > 0, months, 0.0))
+
+def _batch_amortization_chunk(loan, rate, years, width):
+    months = term_months(years).astype(np.int64)
+    valid = (loan > 0) & (rate >= 0) & (months > 0)
+    months = np.where(valid, months, 0)
+    payment = np.where(valid, monthly_payment_array(loan, rate, years), 0.0)
+    monthly_rate = (rate / 100) / 12
+
+    n = months[:, None]
+    k = np.minimum(np.arange(width + 1)[None, :], n)
+    r = monthly_rate[:, None]
+    safe_n = np.maximum(n, 1)
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        growth = np.power(1 + r, k)
+        growth_n = np.power(1 + r, n)
+        annuity_balance = loan[:, None] * (growth_n - growth) / (growth_n - 1)
+    linear_balance = loan[:, None] * (safe_n - k) / safe_n
+    balance_after = np.where(np.abs(r) < 1e-9, linear_balance, annuity_balance)
+
+    opening = balance_after[:, :-1]
+    after_term = np.arange(width)[None, :] >= n
+    interest = np.where(after_term, 0.0, opening * r)
+    principal = np.where(after_term, 0.0, np.minimum(payment[:, None] - interest, opening))
+    balance = np.where(after_term, 0.0, np.maximum(opening - principal, 0))
+    payments = np.where(after_term, 0.0, payment[:, None])
+    return {
+        "months": months,
+        "principal": principal,
+        "interest": interest,
+        "balance": balance,
+        "payment": payments,
+        "after_term": after_term,
+        "total_interest": interest.sum(axis=1),
+        "total_paid": payments.sum(axis=1),
+    }
+
+def _batch_inputs(loan_amounts, annual_rates, years):
+    loan, rate, yrs = np.broadcast_arrays(
+        np.asarray(loan_amounts, dtype=np.float64),
+        np.asarray(annual_rates, dtype=np.float64),
+        np.asarray(years, dtype=np.float64),
+    )
+    loan, rate, yrs = loan.ravel(), rate.ravel(), yrs.ravel()
+    width = int(np.max(np.where(yrs > 0, yrs * 12, 0), initial=0))
+    return loan, rate, yrs, width
+
+def iter_batch_amortization(loan_amounts, annual_rates, years, chunk_size=BATCH_CHUNK_SIZE):
+    """Yield (start_index, chunk) pairs of padded amortization arrays.
+
+    Inputs broadcast against each other and are flattened to one scenario per
+    row. Each chunk is a dict with 2-D "principal", "interest", "balance" and
+    "payment" arrays (scenarios x months, zero after the term), the boolean
+    "after_term" mask, the per-row "months" count and per-row
+    "total_interest"/"total_paid". Only one chunk is alive at a time.
+    """
+    loan, rate, yrs, width = _batch_inputs(loan_amounts, annual_rates, years)
+    for start in range(0, loan.size, chunk_size):
+        stop = start + chunk_size
+        yield start, _batch_amortization_chunk(loan[start:stop], rate[start:stop], yrs[start:stop], width)
+
+def batch_amortization(loan_amounts, annual_rates, years, chunk_size=BATCH_CHUNK_SIZE, max_bytes=BATCH_MAX_BYTES):
+    """Amortize many (loan, rate, years) scenarios into padded 2-D arrays.
+
+    Same layout as the chunks of iter_batch_amortization, assembled into one
+    result. Values are unrounded; generate_amortization_df rounds per row.
+    The result holds all scenarios x months at once, so memory grows with
+    the batch: callers that need bounded memory must use
+    iter_batch_amortization (or batch_amortization_totals). Raises
+    ValueError when the result would exceed `max_bytes` (None: no limit).
+    """
+    loan, rate, yrs, width = _batch_inputs(loan_amounts, annual_rates, years)
+    count = loan.size
+    needed = count * width * (4 * 8 + 1) + count * 3 * 8
+    if max_bytes is not None and needed > max_bytes:
+        raise ValueError(f"batch_amortization would need {needed / 2**20:,.0f} MB for {count:,} scenarios "
+                         f"(limit {max_bytes / 2**20:,.0f} MB); use iter_batch_amortization instead.")
+    result = {
+        "months": np.zeros(count, dtype=np.int64),
+        "principal": np.zeros((count, width)),
+        "interest": np.zeros((count, width)),
+        "balance": np.zeros((count, width)),
+        "payment": np.zeros((count, width)),
+        "after_term": np.ones((count, width), dtype=bool),
+        "total_interest": np.zeros(count),
+        "total_paid": np.zeros(count),
+    }
+    for start, chunk in iter_batch_amortization(loan, rate, yrs, chunk_size):
+        stop = start + chunk["months"].size
+        for key, values in chunk.items():
+            result[key][start:stop] = values
+    return result
+
+def batch_amortization_totals(loan_amounts, annual_rates, years, chunk_size=BATCH_CHUNK_SIZE):
+    """Per-scenario payment and totals without keeping the monthly arrays.
+
+    Returns a dict of 1-D arrays: "payment", "months", "total_interest" and
+    "total_paid". Peak memory is bounded by chunk_size, not by the batch size.
+    """
+    loan, rate, yrs, width = _batch_inputs(loan_amounts, annual_rates, years)
+    count = loan.size
+    result = {
+        "payment": np.zeros(count),
+        "months": np.zeros(count, dtype=np.int64),
+        "total_interest": np.zeros(count),
+        "total_paid": np.zeros(count),
+    }
+    for start, chunk in iter_batch_amortization(loan, rate, yrs, chunk_size):
+        stop = start + chunk["months"].size
+        result["payment"][start:stop] = chunk["payment"][:, 0] if width else 0.0
+        result["months"][start:stop] = chunk["months"]
+        result["total_interest"][start:stop] = chunk["total_interest"]
+        result["total_paid"][start:stop] = chunk["total_paid"]
+    return result
+
+# --- EXACT AGOROT SCHEDULES ---
+# Lenders keep balances in whole agorot: the payment is rounded once, each
+# month's interest is rounded, and the last payment absorbs whatever is left
+# so the balance closes at exactly zero. The month-to-month recurrence runs
+# on int64 arrays with one row per loan, so a batch costs one pass over the
+# months however many loans it holds.
+
+# Annual rates are taken to 1/10000 of a percent; interest is then
+# balance * rate_units / EXACT_RATE_DENOMINATOR in exact integer arithmetic.
+EXACT_RATE_SCALE = 10_000
+EXACT_RATE_DENOMINATOR = 12 * 100 * EXACT_RATE_SCALE
+ROUNDING_MODES = ("half_up", "half_even")
+
+def _divide_rounded(numerator, denominator, rounding):
+    quotient, remainder = np.divmod(numerator, denominator)
+    if rounding == "half_even":
+        up = (2 * remainder > denominator) | ((2 * remainder == denominator) & (quotient % 2 == 1))
+    else:
+        up = 2 * remainder >= denominator
+    return quotient + up
+
+def _round_agorot(shekels, rounding):
+    agorot = np.asarray(shekels, dtype=np.float64) * 100
+    rounded = np.rint(agorot) if rounding == "half_even" else np.floor(agorot + 0.5)
+    return rounded.astype(np.int64)
+
+def exact_batch_amortization(loan_amounts, annual_rates, years, rounding="half_up"):
+    """Lender-style schedules in int64 agorot for many loans at once.
+
+    Same padded layout as batch_amortization, but "principal", "interest",
+    "balance" and "payment" are int64 agorot and the totals reconcile
+    exactly: total_paid == loan + total_interest for every row. rounding is
+    "half_up" or "half_even" (banker's rounding).
+    """
+    if rounding not in ROUNDING_MODES:
+        raise ValueError(f"unknown rounding mode: {rounding}")
+    loan, rate, yrs, width = _batch_inputs(loan_amounts, annual_rates, years)
+    months = term_months(yrs).astype(np.int64)
+    valid = (loan > 0) & (rate >= 0) & (months > 0)
+    months = np.where(valid, months, 0)
+    balance = np.where(valid, _round_agorot(loan, rounding), 0)
+    rate_units = np.rint(rate * EXACT_RATE_SCALE).astype(np.int64)
+    payment = np.where(valid, _round_agorot(monthly_payment_array(loan, rate, yrs), rounding), 0)
+
+    count = loan.size
+    result = {key: np.zeros((count, width), dtype=np.int64) for key in ("principal", "interest", "balance", "payment")}
+    for month in range(width):
+        active = month < months
+        interest = np.where(active, _divide_rounded(balance * rate_units, EXACT_RATE_DENOMINATOR, rounding), 0)
+        principal = np.where(month == months - 1, balance, np.clip(payment - interest, 0, balance))
+        principal = np.where(active, principal, 0)
+        balance = balance - principal
+        result["principal"][:, month] = principal
+        result["interest"][:, month] = interest
+        result["balance"][:, month] = balance
+        result["payment"][:, month] = principal + interest
+    result["months"] = months
+    result["total_interest"] = result["interest"].sum(axis=1)
+    result["total_paid"] = result["payment"].sum(axis=1)
+    return result
+
+# --- CPI-LINKED LOANS ---
+# A CPI-linked loan is amortized in real terms and every amount is scaled by
+# the price index I_t = (1 + i_1) ... (1 + i_t): the indexed balance after
+# month t is the real balance times I_t, and the indexation added in month t
+# is the previous indexed balance times i_t.
+
+def monthly_inflation_path(inflation, months):
+    """Monthly inflation rates, shape (paths, months), from annual % assumptions.
+
+    A scalar is one constant rate, a 1-D array is one path of annual rates
+    by month and a 2-D array holds a path per row. Paths shorter than the
+    term keep their last value, so a column of rates is one constant
+    assumption per row.
+    """
+    path = np.asarray(inflation, dtype=np.float64)
+    path = path.reshape((1, -1) if path.ndim < 2 else path.shape)
+    if path.shape[1] == 0:
+        path = np.zeros((path.shape[0], 1))
+    if np.any(path <= -100):
+        raise CalculationError("קלט לא חוקי", "שיעור האינפלציה חייב להיות גדול מ-100%-.")
+    if path.shape[1] < months:
+        path = np.pad(path, ((0, 0), (0, months - path.shape[1])), mode='edge')
+    return np.power(1 + path[:, :months] / 100, 1 / 12) - 1
+
+def _index_schedule(loan_amounts, real, monthly_inflation):
+    # real holds padded (rows, width) arrays from batch_amortization;
+    # monthly_inflation broadcasts against them.
+    index = np.cumprod(1 + monthly_inflation, axis=-1)
+    opening = np.concatenate([np.asarray(loan_amounts, dtype=np.float64).reshape(-1, 1),
+                              real["balance"][:, :-1]], axis=1)
+    opening = np.where(real["after_term"], 0.0, opening)
+    return {
+        "index": np.broadcast_to(index, np.broadcast_shapes(index.shape, opening.shape)),
+        "principal": real["principal"] * index,
+        "interest": real["interest"] * index,
+        "indexation": opening * (index / (1 + monthly_inflation)) * monthly_inflation,
+        "balance": real["balance"] * index,
+        "payment": real["payment"] * index,
+    }
+
+def indexed_amortization(loan_amount, annual_rate, years, inflation):
+    """Schedule of a CPI-linked loan under one or many inflation assumptions.
+
+    inflation is as for monthly_inflation_path; every path is evaluated in
+    the same call. Returns "index", "principal", "interest", "indexation",
+    "balance" and "payment" as (paths, months) arrays, plus the 1-D totals
+    "total_interest", "total_indexation" and "total_paid".
+    """
+    real = batch_amortization([loan_amount], [annual_rate], [years])
+    months = int(real["months"][0])
+    real = {key: real[key][:, :months] for key in ("principal", "interest", "balance", "payment", "after_term")}
+    result = _index_schedule([loan_amount], real, monthly_inflation_path(inflation, months))
+    result["total_interest"] = result["interest"].sum(axis=1)
+    result["total_indexation"] = result["indexation"].sum(axis=1)
+    result["total_paid"] = result["payment"].sum(axis=1)
+    return result
+
+def indexed_totals(loan_amounts, annual_rates, years, inflation):
+    """Totals of CPI-linked loans under constant inflation, in closed form.
+
+    Broadcasts over all arguments, so many loans or many inflation
+    assumptions cost one call. The real payment P and real principal
+    p_t = p_1 (1+r)^(t-1) are scaled by g^t with g = 1 + monthly inflation,
+    so each total is a geometric sum. Returns a dict of arrays: "payment"
+    (first indexed payment), "total_interest", "total_indexation" and
+    "total_paid".
+    """
+    loan = np.asarray(loan_amounts, dtype=np.float64)
+    payment = monthly_payment_array(loan, annual_rates, years)
+    rate = np.asarray(annual_rates, dtype=np.float64) / 100 / 12
+    months = term_months(years)
+    inflation = np.asarray(inflation, dtype=np.float64)
+    if np.any(inflation <= -100):
+        raise CalculationError("קלט לא חוקי", "שיעור האינפלציה חייב להיות גדול מ-100%-.")
+    g = np.power(1 + inflation / 100, 1 / 12)
+
+    def geometric(ratio):
+        # sum of ratio^(t-1) for t = 1..months
+        with np.errstate(divide='ignore', invalid='ignore'):
+            value = (np.power(ratio, months) - 1) / (ratio - 1)
+        return np.where(np.abs(ratio - 1) < 1e-12, months, value)
+
+    total_paid = payment * g * geometric(g)
+    principal = (payment - loan * rate) * g * geometric((1 + rate) * g)
+    valid = payment > 0
+    return {
+        "payment": np.where(valid, payment * g, 0.0),
+        "total_interest": np.where(valid, total_paid - principal, 0.0),
+        "total_indexation": np.where(valid, principal - loan, 0.0),
+        "total_paid": np.where(valid, total_paid, 0.0),
+    }
+
+# --- MORTGAGE MIX ---
+# A scenario's loan may be split into tracks, each with its own share, rate
+# and term. Every track is amortized by the batch engine and the combined
+# schedule is the month-by-month sum of the track arrays.
+
+MORTGAGE_TRACK_KINDS = ["קבועה לא צמודה", "פריים", "קבועה צמודה", "משתנה לא צמודה", "משתנה צמודה"]
+CPI_LINKED_TRACK_KINDS = {"קבועה צמודה", "משתנה צמודה"}
+
+@dataclass(frozen=True)
+class MortgageTrack:
+    """One track of a mix: share of the loan (%), annual rate (%) and term (years)."""
+    share: float
+    rate: float
+    years: int
+    kind: str = ""
+
+    @property
+    def indexed(self):
+        return self.kind in CPI_LINKED_TRACK_KINDS
+
+def _track_batch(loan_amount, tracks):
+    return ([loan_amount * track.share / 100 for track in tracks],
+            [track.rate for track in tracks],
+            [track.years for track in tracks])
+
+def mix_amortization(loan_amount, tracks, inflation=0.0):
+    """Per-track batch_amortization of a mix and the combined monthly columns.
+
+    CPI-linked tracks are indexed by inflation (see monthly_inflation_path).
+    Returns (batch, combined): combined maps "principal", "interest",
+    "indexation", "balance" and "payment" to 1-D arrays as long as the
+    longest track; tracks that already ended contribute zero to later months.
+    """
+    loans = _track_batch(loan_amount, tracks)
+    batch = batch_amortization(*loans)
+    batch["indexation"] = np.zeros_like(batch["balance"])
+    linked = np.array([track.indexed for track in tracks], dtype=bool)
+    if linked.any() and np.any(np.asarray(inflation) != 0):
+        monthly = monthly_inflation_path(inflation, batch["balance"].shape[1])
+        indexed = _index_schedule(np.asarray(loans[0])[linked],
+                                  {key: batch[key][linked] for key in ("principal", "interest", "balance", "payment", "after_term")},
+                                  monthly)
+        for key in ("principal", "interest", "indexation", "balance", "payment"):
+            batch[key][linked] = indexed[key]
+        batch["total_interest"] = batch["interest"].sum(axis=1)
+        batch["total_paid"] = batch["payment"].sum(axis=1)
+    combined = {key: batch[key].sum(axis=0) for key in ("principal", "interest", "indexation", "balance", "payment")}
+    return batch, combined
+
+def generate_mix_schedule(loan_amount, tracks, inflation=0.0, agorot=False):
+    """Combined schedule of a mix, as an AmortizationSchedule.
+
+    With agorot=True every track is an exact lender schedule
+    (exact_batch_amortization), except indexed CPI-linked tracks, whose
+    amounts are rounded to agorot month by month.
+    """
+    tracks = tuple(tracks)
+    key = ("mix", float(loan_amount), tracks, float(inflation), bool(agorot))
+    found, schedule = AMORTIZATION_CACHE.get(key)
+    if not found:
+        columns = ("principal", "interest", "balance", "payment")
+        if loan_amount <= 0 or not tracks:
+            values = np.zeros((len(SCHEDULE_COLUMNS), 0))
+        elif agorot:
+            batch, _ = mix_amortization(loan_amount, tracks, inflation)
+            exact = exact_batch_amortization(*_track_batch(loan_amount, tracks))
+            indexed = np.array([track.indexed and inflation != 0 for track in tracks])[:, None]
+            values = [np.where(indexed, _round_agorot(batch[key], "half_up"), exact[key]).sum(axis=0) for key in columns]
+        else:
+            _, combined = mix_amortization(loan_amount, tracks, inflation)
+            values = _schedule_values(*(combined[key] for key in columns))
+        schedule = AmortizationSchedule(values, loan_amount, agorot=bool(agorot))
+        AMORTIZATION_CACHE.put(key, schedule)
+    return schedule
+
+def generate_mix_df(loan_amount, tracks, inflation=0.0):
+    """Combined schedule of a mix, in the same layout as generate_amortization_df."""
+    return generate_mix_schedule(loan_amount, tracks, inflation).to_df()
+
+def mix_first_payment(loan_amount, tracks, inflation=0.0):
+    growth = (1 + inflation / 100) ** (1 / 12)
+    return sum(calculate_monthly_payment(loan_amount * track.share / 100, track.rate, track.years) * (growth if track.indexed else 1)
+               for track in tracks)
+
+def compare_mixes(loan_amount, mixes, inflation=0.0):
+    """Totals of many mixes (e.g. bank offers) for the same loan, at once.
+
+    The tracks of every mix go through a single batch_amortization_totals
+    call and are summed per mix; CPI-linked tracks take their totals from
+    indexed_totals under the constant annual inflation. Returns 1-D arrays
+    with one entry per mix: "first_payment", "total_interest",
+    "total_indexation", "total_paid" and "months".
+    """
+    owner = np.repeat(np.arange(len(mixes)), [len(tracks) for tracks in mixes])
+    tracks = [track for mix in mixes for track in mix]
+    loans = _track_batch(loan_amount, tracks)
+    totals = batch_amortization_totals(*loans)
+    totals["total_indexation"] = np.zeros(len(tracks))
+    linked = np.array([track.indexed for track in tracks], dtype=bool)
+    if inflation and linked.any():
+        indexed = indexed_totals(*(np.asarray(values)[linked] for values in loans), inflation)
+        for key in ("payment", "total_interest", "total_indexation", "total_paid"):
+            totals[key][linked] = indexed[key]
+    result = {}
+    for key, source in (("first_payment", "payment"), ("total_interest", "total_interest"),
+                        ("total_indexation", "total_indexation"), ("total_paid", "total_paid")):
+        result[key] = np.zeros(len(mixes))
+        np.add.at(result[key], owner, totals[source])
+    result["months"] = np.zeros(len(mixes), dtype=np.int64)
+    np.maximum.at(result["months"], owner, totals["months"])
+    return result
+
+def parse_tracks(raw_tracks, scenario):
+    """MortgageTracks from the track dicts typed in the mix editor."""
+    tracks = []
+    for n, raw in enumerate(raw_tracks, 1):
+        try:
+            share = float(raw.get("share"))
+            rate = float(raw.get("rate"))
+            years = int(raw.get("years"))
+        except (TypeError, ValueError):
+            raise CalculationError("שגיאת קלט", f"מסלול {n} בתמהיל (תרחיש {scenario + 1}): חלק, ריבית ושנים חייבים להיות מספרים (שנים - מספר שלם).")
+        if share <= 0 or rate < 0 or years <= 0:
+            raise CalculationError("קלט לא חוקי", f"מסלול {n} בתמהיל (תרחיש {scenario + 1}): החלק והשנים חייבים להיות חיוביים והריבית אינה יכולה להיות שלילית.")
+        tracks.append(MortgageTrack(share, rate, years, raw.get("kind", "")))
+    if abs(sum(track.share for track in tracks) - 100) > 0.01:
+        raise CalculationError("קלט לא חוקי", f"סכום חלקי המסלולים בתמהיל (תרחיש {scenario + 1}) חייב להיות 100%.")
+    return tracks
+
+# --- SENSITIVITY GRID ---
+# Default grid for the sensitivity view: 0-10% in 0.05 steps x 5-35 years.
+SENSITIVITY_RATES = np.round(np.arange(0, 10 + 1e-9, 0.05), 2)
+SENSITIVITY_YEARS = np.arange(5, 36)
+SENSITIVITY_MAX_CELLS = 1_000_000
+SENSITIVITY_METRICS = [
+    ("payment", "תשלום חודשי (₪)"),
+    ("total_interest", "סה\"כ ריבית (₪)"),
+    ("rent_ratio", "יחס שכירות/תשלום"),
+]
+
+def sensitivity_axes(rate_from, rate_to, rate_step, years_from, years_to):
+    """Rate and term axes for sensitivity_grid from the values typed by the user."""
+    try:
+        rate_from, rate_to, rate_step = float(rate_from), float(rate_to), float(rate_step)
+        years_from, years_to = int(years_from), int(years_to)
+    except (TypeError, ValueError):
+        raise CalculationError("שגיאת קלט", "טווחי הריבית והשנים חייבים להיות מספרים (שנים - מספר שלם).")
+    if rate_from < 0 or rate_step <= 0 or rate_to < rate_from:
+        raise CalculationError("קלט לא חוקי", "טווח הריבית אינו חוקי: נדרשת ריבית לא שלילית, צעד חיובי ו'עד' שאינו קטן מ'מ-'.")
+    if years_from <= 0 or years_to < years_from:
+        raise CalculationError("קלט לא חוקי", "טווח השנים אינו חוקי: נדרשות שנים חיוביות ו'עד' שאינו קטן מ'מ-'.")
+    rates = np.round(np.arange(rate_from, rate_to + rate_step / 2, rate_step), 6)
+    years = np.arange(years_from, years_to + 1)
+    if rates.size * years.size > SENSITIVITY_MAX_CELLS:
+        raise CalculationError("קלט לא חוקי", f"הטבלה גדולה מדי ({rates.size * years.size:,} תאים). המקסימום הוא {SENSITIVITY_MAX_CELLS:,}.")
+    return rates, years
+
+def sensitivity_grid(loan_amount, rates=SENSITIVITY_RATES, years=SENSITIVITY_YEARS, rent=None):
+    """Monthly payment, total interest and rent/payment ratio over a rate x term grid.
+
+    Returns the "rates" and "years" axes and, for every key in
+    SENSITIVITY_METRICS, an array of shape (len(rates), len(years));
+    "rent_ratio" is NaN without a rent. The annuity is evaluated for the
+    whole grid at once, and since n payments repay the loan exactly the
+    total interest is n * payment - loan, so no schedule is built per cell.
+    """
+    rates = np.asarray(rates, dtype=np.float64)
+    years = np.asarray(years, dtype=np.float64)
+    payment = monthly_payment_array(loan_amount, rates[:, None], years[None, :])
+    total_paid = payment * term_months(years)[None, :]
+    total_interest = np.where(payment > 0, total_paid - loan_amount, 0.0)
+    if rent is None:
+        rent_ratio = np.full(payment.shape, np.nan)
+    else:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rent_ratio = np.where(payment != 0, rent / payment, 0.0)
+    return {
+        "rates": rates,
+        "years": years,
+        "payment": payment,
+        "total_interest": total_interest,
+        "rent_ratio": rent_ratio,
+    }
+
+def write_sensitivity_workbook(filepath, grid):
+    """One sheet per metric: terms across, rates down."""
+    openpyxl = timed_import("openpyxl")
+    workbook = openpyxl.Workbook(write_only=True)
+    years = [int(value) for value in grid["years"]]
+    for key, label in SENSITIVITY_METRICS:
+        sheet = workbook.create_sheet(title=label.replace("/", "-"))
+        sheet.append(["ריבית (%) \\ שנים"] + years)
+        for rate, values in zip(grid["rates"].tolist(), grid[key]):
+            sheet.append([rate] + [None if not np.isfinite(value) else round(value, 2) for value in values.tolist()])
+    workbook.save(filepath)
+
+# --- PREPAYMENT AND REFINANCE ---
+# What-ifs against one schedule: prepaying an amount after month k, or
+# refinancing the balance after month k at a new rate. With the balance and
+# cumulative interest of the schedule precomputed, the interest left after
+# month k is a difference of prefix sums and the interest of the changed
+# remainder follows from the annuity formulas, so every candidate costs O(1)
+# and a whole months x amounts grid is a handful of array operations.
+
+def prepayment_table(loan_amount, annual_rate, years):
+    """Prefix sums of a generate_schedule schedule.
+
+    "balance"[k] is the balance after k payments (balance[0] is the loan)
+    and "cum_interest"[k] the interest paid in the first k months.
+    """
+    schedule = generate_schedule(loan_amount, annual_rate, years)
+    if schedule.empty:
+        raise CalculationError("אין נתונים לחישוב", "לא ניתן לבנות לוח סילוקין לתרחיש זה.")
+    return {
+        "months": len(schedule),
+        "monthly_rate": annual_rate / 100 / 12,
+        "payment": float(schedule.payment[0]),
+        "balance": np.concatenate([[loan_amount], schedule.balance]),
+        "cum_interest": np.concatenate([[0.0], np.cumsum(schedule.interest)]),
+    }
+
+def _annuity_interest(balance, monthly_rate, months):
+    # Interest of repaying balance in months equal payments.
+    balance, monthly_rate, months = np.broadcast_arrays(*(np.asarray(value, dtype=np.float64) for value in (balance, monthly_rate, months)))
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        factor = monthly_rate / (1 - np.power(1 + monthly_rate, -months))
+        interest = balance * (months * factor - 1)
+    return np.where((monthly_rate > 1e-12) & (months > 0), interest, 0.0)
+
+def _interest_at_payment(balance, monthly_rate, payment):
+    # Interest of repaying balance with a fixed payment; the last payment
+    # is whatever is left.
+    balance = np.asarray(balance, dtype=np.float64)
+    if monthly_rate <= 1e-12:
+        return np.zeros(balance.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payoff = -np.log1p(-balance * monthly_rate / payment) / np.log1p(monthly_rate)
+    full = np.maximum(np.ceil(payoff - 1e-9) - 1, 0)
+    growth = np.power(1 + monthly_rate, full)
+    remaining = balance * growth - payment * (growth - 1) / monthly_rate
+    interest = payment * full + remaining * (1 + monthly_rate) - balance
+    return np.where(balance > 0, interest, 0.0)
+
+def _early_repayment_fee(amounts, fee_percent, fee_fixed):
+    return np.where(amounts > 0, amounts * fee_percent / 100 + fee_fixed, 0.0)
+
+def prepayment_savings(table, months, amounts, keep_payment=True, fee_percent=0.0, fee_fixed=0.0):
+    """Interest saved by prepaying amounts right after the given months.
+
+    months and amounts broadcast against each other; amounts above the
+    balance are capped. keep_payment shortens the term, otherwise the
+    payment is lowered over the remaining term. Returns a dict of arrays:
+    "amount" (as capped), "interest_saved", "fee" and "net_saving".
+    """
+    months = np.clip(np.asarray(months, dtype=np.int64), 0, table["months"])
+    balance = table["balance"][months]
+    amounts = np.minimum(np.asarray(amounts, dtype=np.float64), balance)
+    remaining = balance - amounts
+    before = table["cum_interest"][-1] - table["cum_interest"][months]
+    if keep_payment:
+        after = _interest_at_payment(remaining, table["monthly_rate"], table["payment"])
+    else:
+        after = _annuity_interest(remaining, table["monthly_rate"], table["months"] - months)
+    fee = _early_repayment_fee(amounts, fee_percent, fee_fixed)
+    saved = before - after
+    return {"amount": amounts, "interest_saved": saved, "fee": fee, "net_saving": saved - fee}
+
+def refinance_savings(table, months, annual_rate, years=None, fee_percent=0.0, fee_fixed=0.0):
+    """Interest saved by refinancing the balance after the given months.
+
+    The new loan runs for years (default: the remaining term) at
+    annual_rate; months and annual_rate broadcast. The early-repayment fee
+    applies to the whole balance. Same keys as prepayment_savings.
+    """
+    months = np.clip(np.asarray(months, dtype=np.int64), 0, table["months"])
+    balance = table["balance"][months]
+    term = table["months"] - months if years is None else np.asarray(years) * 12
+    before = table["cum_interest"][-1] - table["cum_interest"][months]
+    after = _annuity_interest(balance, np.asarray(annual_rate, dtype=np.float64) / 100 / 12, term)
+    fee = _early_repayment_fee(balance, fee_percent, fee_fixed)
+    saved = before - after
+    return {"amount": np.broadcast_to(balance, saved.shape), "interest_saved": saved, "fee": fee, "net_saving": saved - fee}
+
+def optimize_prepayment(loan_amount, annual_rate, years, amounts, keep_payment=True, fee_percent=0.0, fee_fixed=0.0,
+                        refinance_rates=()):
+    """Best prepayment (every month x every amount) and refinance (every
+    month x every rate) for one schedule, by net saving after fees.
+
+    Returns the "table" and, for "prepayment" and "refinance", the full
+    savings grids plus the best "month", "amount"/"rate" and "net_saving"
+    (None when no candidate saves anything). "total_interest" is the
+    schedule's interest without any change.
+    """
+    table = prepayment_table(loan_amount, annual_rate, years)
+    months = np.arange(1, table["months"])
+    amounts = np.asarray(amounts, dtype=np.float64)
+    result = {"table": table, "total_interest": float(table["cum_interest"][-1])}
+
+    grid = prepayment_savings(table, months[:, None], amounts[None, :], keep_payment, fee_percent, fee_fixed)
+    best = None
+    if grid["net_saving"].size:
+        row, column = np.unravel_index(np.argmax(grid["net_saving"]), grid["net_saving"].shape)
+        if grid["net_saving"][row, column] > 0:
+            best = {"month": int(months[row]), "amount": float(grid["amount"][row, column]),
+                    "net_saving": float(grid["net_saving"][row, column]), "fee": float(grid["fee"][row, column])}
+    result["prepayment"] = dict(grid, best=best)
+
+    rates = np.asarray(refinance_rates, dtype=np.float64)
+    grid = refinance_savings(table, months[:, None], rates[None, :], None, fee_percent, fee_fixed)
+    best = None
+    if grid["net_saving"].size:
+        row, column = np.unravel_index(np.argmax(grid["net_saving"]), grid["net_saving"].shape)
+        if grid["net_saving"][row, column] > 0:
+            best = {"month": int(months[row]), "rate": float(rates[column]),
+                    "net_saving": float(grid["net_saving"][row, column]), "fee": float(grid["fee"][row, column])}
+    result["refinance"] = dict(grid, best=best)
+    return result
+
+# --- VARIABLE-RATE SIMULATION ---
+# Paths per chunk: 8192 paths x 360 months keeps each float64 array around
+# 24 MB, however many paths are simulated.
+MONTE_CARLO_CHUNK_SIZE = 8192
+# Monthly bands are taken from this many paths (an i.i.d. sample of all of
+# them); keeping every path's payments would not be bounded in memory.
+MONTE_CARLO_BAND_PATHS = 20_000
+MONTE_CARLO_PERCENTILES = (5, 25, 50, 75, 95)
+
+@dataclass
+class RatePathModel:
+    """Mean-reverting (Ornstein-Uhlenbeck) annual rate in %, stepped monthly.
+
+    The rate drifts from initial_rate towards long_term_rate at
+    reversion_speed per year, with volatility in percentage points per
+    sqrt(year), and is never below floor.
+    """
+    initial_rate: float
+    long_term_rate: float
+    reversion_speed: float = 0.2
+    volatility: float = 1.0
+    floor: float = 0.0
+
+def simulate_rate_paths(model, months, paths, rng):
+    """(paths, months) array of the annual rate in force in each month."""
+    dt = 1 / 12
+    if model.reversion_speed > 0:
+        decay = np.exp(-model.reversion_speed * dt)
+        step_sd = model.volatility * np.sqrt((1 - decay ** 2) / (2 * model.reversion_speed))
+    else:
+        decay, step_sd = 1.0, model.volatility * np.sqrt(dt)
+    shocks = rng.standard_normal((paths, months))
+    rates = np.empty((paths, months))
+    rate = np.full(paths, float(model.initial_rate))
+    for k in range(months):
+        rates[:, k] = rate
+        rate = model.long_term_rate + (rate - model.long_term_rate) * decay + step_sd * shocks[:, k]
+        np.maximum(rate, model.floor, out=rate)
+    return rates
+
+def _simulate_chunk(loan_amount, months, rates):
+    """Re-amortize every path over its remaining term at each month's rate."""
+    balance = np.full(rates.shape[0], float(loan_amount))
+    payments = np.empty_like(rates)
+    total_interest = np.zeros(rates.shape[0])
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for k in range(months):
+            monthly_rate = rates[:, k] / 1200
+            remaining = months - k
+            annuity = balance * monthly_rate / (1 - np.power(1 + monthly_rate, -remaining))
+            payment = np.where(np.abs(monthly_rate) < 1e-12, balance / remaining, annuity)
+            interest = balance * monthly_rate
+            balance = balance - (payment - interest)
+            payments[:, k] = payment
+            total_interest += interest
+    return payments, total_interest
+
+def simulate_variable_rate_loan(loan_amount, years, model, paths=10_000, seed=None,
+                                chunk_size=MONTE_CARLO_CHUNK_SIZE, band_paths=MONTE_CARLO_BAND_PATHS,
+                                percentiles=MONTE_CARLO_PERCENTILES, job=None):
+    """Monte Carlo of a loan whose rate follows `model`, re-amortized monthly.
+
+    Paths are simulated chunk_size at a time from a seeded generator, so
+    the result only depends on (seed, chunk_size) and peak memory does not
+    grow with `paths`. Returns a dict with "months", "percentiles",
+    "payment_bands" and "rate_bands" (one row per percentile, one column per
+    month, from the first band_paths paths), "total_interest" (percentiles
+    over all paths), "mean_total_interest", and the fixed-rate "fixed_payment"
+    and "fixed_total_interest" at model.initial_rate for comparison.
+    """
+    months = int(years * 12)
+    if loan_amount <= 0 or months <= 0 or paths <= 0:
+        raise CalculationError("קלט לא חוקי", "נדרשים סכום הלוואה, שנים ומספר מסלולים חיוביים.")
+    chunk_seeds = np.random.SeedSequence(seed).spawn(-(-paths // chunk_size))
+    total_interest = np.empty(paths)
+    band_payments = []
+    band_rates = []
+    kept = 0
+    for n, chunk_seed in enumerate(chunk_seeds):
+        if job is not None:
+            job.check_cancelled()
+            job.report(n, len(chunk_seeds), "מדמה מסלולי ריבית...")
+        start = n * chunk_size
+        count = min(chunk_size, paths - start)
+        rates = simulate_rate_paths(model, months, count, np.random.default_rng(chunk_seed))
+        payments, interest = _simulate_chunk(loan_amount, months, rates)
+        total_interest[start:start + count] = interest
+        take = min(count, band_paths - kept)
+        if take > 0:
+            band_payments.append(payments[:take].astype(np.float32))
+            band_rates.append(rates[:take].astype(np.float32))
+            kept += take
+
+    fixed_payment = calculate_monthly_payment(loan_amount, model.initial_rate, years)
+    return {
+        "months": np.arange(1, months + 1),
+        "percentiles": tuple(percentiles),
+        "payment_bands": np.percentile(np.concatenate(band_payments), percentiles, axis=0),
+        "rate_bands": np.percentile(np.concatenate(band_rates), percentiles, axis=0),
+        "total_interest": np.percentile(total_interest, percentiles),
+        "mean_total_interest": float(total_interest.mean()),
+        "paths": paths,
+        "fixed_payment": fixed_payment,
+        "fixed_total_interest": fixed_payment * months - loan_amount,
+    }
+
+# --- TK-FREE CALCULATION CORE ---
+# PropertyTab only collects PropertyInputs from its widgets and renders the
+# PropertyResults returned by compute_property, so the same math runs in
+# worker processes and bulk jobs without a Tk root.
+
+@dataclass
+class PropertyInputs:
+    # Numeric fields hold the entry text (or a number) exactly as typed;
+    # compute_property parses and validates them.
+    alias: str = ""
+    link: str = ""
+    price: str = ""
+    area: str = ""
+    ltv: str = "70"
+    rent: str = ""
+    skip_tax: bool = False
+    include_tax_in_mortgage: bool = False
+    skip_broker: bool = False
+    manual_lawyer_fee: bool = False
+    lawyer_fee_manual_value: str = ""
+    manual_broker_fee: bool = False
+    broker_fee_manual_value: str = ""
+    calculate_affordability: bool = False
+    available_funds: str = ""
+    rates: list = field(default_factory=lambda: ["", "", ""])
+    years: list = field(default_factory=lambda: ["", "", ""])
+    # Per scenario, the mix tracks as typed ({"kind", "share", "rate",
+    # "years"}); a scenario with tracks ignores its rate and years.
+    tracks: list = field(default_factory=lambda: [[], [], []])
+    # Expected annual inflation (%) for the CPI-linked tracks of mixes.
+    inflation: str = ""
+    # Lender-style schedules in whole agorot (exact_batch_amortization).
+    exact_agorot: bool = False
+
+
+@dataclass
+class PropertyResults:
+    calculated_results: dict
+    loan_scenarios_data: list
+    loan_scenarios_rent_comparison: list
+    # One AmortizationSchedule per scenario, None where there is no data.
+    df_list: list
+    table_rows: list
+
+
+def _copy_inputs(inputs):
+    return replace(inputs, rates=list(inputs.rates), years=list(inputs.years),
+                   tracks=[[dict(track) for track in tracks] for tracks in inputs.tracks])
+
+def _inputs_key(inputs):
+    # In affordability mode the price entry only echoes the computed price,
+    # so it must not make an otherwise unchanged tab look edited.
+    if inputs.calculate_affordability:
+        return replace(inputs, price="")
+    return inputs
+
+def _is_blank(value):
+    return value is None or value == ""
+
+def _manual_fee(value, label):
+    try:
+        fee = float(value)
+    except (TypeError, ValueError):
+        raise CalculationError("שגיאת קלט", f"עלות {label} ידנית חייבת להיות מספר.")
+    if fee < 0:
+        raise CalculationError("קלט לא חוקי", f"עלות {label} ידנית אינה יכולה להיות שלילית.")
+    return fee
+
+def _parse_scenarios(inputs):
+    # A mix scenario reports its share-weighted rate and its longest term.
+    rates = []
+    years = []
+    mixes = []
+    valid_scenarios_count = 0
+    for i in range(3):
+        rate_val = inputs.rates[i] if i < len(inputs.rates) else ""
+        years_val = inputs.years[i] if i < len(inputs.years) else ""
+        raw_tracks = inputs.tracks[i] if i < len(inputs.tracks) else []
+
+        current_rate = None
+        current_years = None
+        current_mix = None
+
+        if raw_tracks:
+            current_mix = tuple(parse_tracks(raw_tracks, i))
+            current_rate = sum(track.share * track.rate for track in current_mix) / 100
+            current_years = max(track.years for track in current_mix)
+            valid_scenarios_count += 1
+        elif not _is_blank(rate_val) and not _is_blank(years_val):
+            try:
+                current_rate = float(rate_val)
+            except ValueError:
+                raise CalculationError("שגיאת קלט", f"ריבית שנתית (תרחיש {i+1}) חייבת להיות מספר.")
+            if current_rate < 0:
+                raise CalculationError("קלט לא חוקי", f"ריבית שנתית (תרחיש {i+1}) אינה יכולה להיות שלילית.")
+
+            try:
+                current_years = int(years_val)
+            except ValueError:
+                raise CalculationError("שגיאת קלט", f"שנים להחזר (תרחיש {i+1}) חייבות להיות מספר שלם.")
+            if current_years <= 0:
+                raise CalculationError("קלט לא חוקי", f"שנים להחזר (תרחיש {i+1}) חייבות להיות מספר חיובי שלם.")
+            valid_scenarios_count += 1
+
+        rates.append(current_rate)
+        years.append(current_years)
+        mixes.append(current_mix)
+
+    if valid_scenarios_count == 0:
+        raise CalculationError("אין נתונים לחישוב", "אנא הזן/י לפחות ריבית שנתית אחת ושנים להחזר עבור תרחיש.")
+    return rates, years, mixes
+
+def compute_property(inputs):
+    """Run the full property calculation for one PropertyInputs.
+
+    Returns PropertyResults with the same calculated_results and
+    loan_scenarios_data that PropertyTab exposes. Raises CalculationError
+    for invalid input and ValueError for unparsable numbers.
+    """
+    started = time.perf_counter_ns()
+    ltv_str = inputs.ltv
+    if _is_blank(ltv_str):
+        raise CalculationError("קלט חסר", "יש להזין אחוז מימון (LTV).")
+    ltv = float(ltv_str)
+    if not (0 <= ltv <= 100):
+        raise CalculationError("קלט לא חוקי", "אחוז מימון (LTV) חייב להיות בין 0 ל-100.")
+
+    area_str = inputs.area
+    area = float(area_str) if not _is_blank(area_str) else None
+    if area is not None and area <= 0:
+        raise CalculationError("קלט לא חוקי", "שטח המטר המרובע חייב להיות מספר חיובי.")
+
+    rent_str = inputs.rent
+    rent = float(rent_str) if not _is_blank(rent_str) else None
+    if rent is not None and rent < 0:
+        raise CalculationError("קלט לא חוקי", "שכירות חודשית צפויה אינה יכולה להיות שלילית.")
+
+    inflation_str = inputs.inflation
+    inflation = float(inflation_str) if not _is_blank(inflation_str) else 0.0
+    if inflation <= -100:
+        raise CalculationError("קלט לא חוקי", "אינפלציה שנתית צפויה חייבת להיות גדולה מ-100%-.")
+
+    available_funds = None
+    if inputs.calculate_affordability:
+        if _is_blank(inputs.available_funds):
+            raise CalculationError("קלט חסר", "יש להזין את סכום הכסף הפנוי.")
+        available_funds = float(inputs.available_funds)
+        if available_funds <= 0:
+            raise CalculationError("קלט לא חוקי", "סכום הכסף הפנוי חייב להיות חיובי.")
+
+    manual_lawyer_fee = _manual_fee(inputs.lawyer_fee_manual_value, "עו\"ד") if inputs.manual_lawyer_fee else None
+    if inputs.skip_broker:
+        manual_broker_fee = 0
+    elif inputs.manual_broker_fee:
+        manual_broker_fee = _manual_fee(inputs.broker_fee_manual_value, "מתווך")
+    else:
+        manual_broker_fee = None
+    SPANS.record("compute_property.parse", started)
+
+    if inputs.calculate_affordability:
+        with SPANS.span("compute_property.affordability"):
+            price = solve_affordable_price(available_funds, ltv, inputs.skip_tax, inputs.include_tax_in_mortgage,
+                                           manual_lawyer_fee, manual_broker_fee)
+        if np.isnan(price):
+            raise CalculationError("קלט לא חוקי", "ההון העצמי הזמין אינו מכסה את עלויות עו\"ד והמתווך הידניות.")
+        if np.isinf(price):
+            raise CalculationError("קלט לא חוקי", "לא ניתן לחשב מחיר נכס מקסימלי: ההון הנדרש אינו תלוי במחיר הנכס.")
+        input_price = f"{price:,.0f}"
+    else:
+        if _is_blank(inputs.price):
+            raise CalculationError("קלט חסר", "יש להזין מחיר דירה.")
+        price = float(inputs.price)
+        if price <= 0:
+            raise CalculationError("קלט לא חוקי", "מחיר הדירה חייב להיות מספר חיובי.")
+        input_price = inputs.price
+
+    purchase_tax = 0 if inputs.skip_tax else calculate_purchase_tax(price)
+    lawyer_fee = estimate_lawyer_fee(price) if manual_lawyer_fee is None else manual_lawyer_fee
+    broker_fee = estimate_broker_fee(price) if manual_broker_fee is None else manual_broker_fee
+
+    base_loan_amount = price * (ltv / 100)
+    if inputs.include_tax_in_mortgage:
+        loan_amount = (price + purchase_tax) * (ltv / 100)
+        down_payment = (price + purchase_tax) * ((100 - ltv) / 100)
+    else:
+        loan_amount = base_loan_amount
+        down_payment = (price - base_loan_amount) + purchase_tax
+
+    total_needed = down_payment + lawyer_fee + broker_fee
+
+    if inputs.calculate_affordability:
+        total_needed = available_funds
+
+    rates, years, mixes = _parse_scenarios(inputs)
+
+    calculated_results = {
+        "purchase_tax": purchase_tax,
+        "down_payment": down_payment,
+        "loan_amount": loan_amount,
+        "lawyer_fee": lawyer_fee,
+        "broker_fee": broker_fee,
+        "total_needed": total_needed,
+        "price_per_meter": price / area if area is not None and area > 0 else None,
+        "rent": rent,
+        "input_price": input_price,
+        "calculated_price": price,
+        "input_area": area_str,
+        "input_ltv": ltv_str,
+        "input_rent": rent_str,
+        "input_inflation": inflation_str,
+        "input_skip_tax": inputs.skip_tax,
+        "input_include_tax_in_mortgage": inputs.include_tax_in_mortgage,
+        "input_exact_agorot": inputs.exact_agorot,
+        "input_skip_broker": inputs.skip_broker,
+        "input_manual_lawyer_fee": inputs.manual_lawyer_fee,
+        "input_lawyer_fee_manual_value": inputs.lawyer_fee_manual_value,
+        "input_manual_broker_fee": inputs.manual_broker_fee,
+        "input_broker_fee_manual_value": inputs.broker_fee_manual_value,
+        "input_calculate_affordability": inputs.calculate_affordability,
+        "input_available_funds": inputs.available_funds,
+        "input_rates": rates,
+        "input_years": years,
+        "input_tracks": [[dict(track) for track in tracks] for tracks in inputs.tracks],
+        "scenario_payments": [None, None, None],
+        "scenario_indexation": [None, None, None],
+        "scenario_total_interest": [None, None, None],
+        "scenario_total_paid": [None, None, None],
+        "input_alias": inputs.alias,
+        "input_link": inputs.link,
+    }
+
+    loan_scenarios_data = []
+    loan_scenarios_rent_comparison = []
+    df_list = [None, None, None]
+    table_rows = []
+
+    for i in range(3):
+        if rates[i] is None or years[i] is None:
+            table_rows.append(("אין נתונים עבור תרחיש זה (חסר ריבית/שנים)",) * 6)
+            loan_scenarios_data.append({})
+            loan_scenarios_rent_comparison.append("אין נתוני השוואת שכירות עבור תרחיש זה")
+            continue
+
+        with SPANS.span("compute_property.amortization"):
+            if mixes[i]:
+                schedule = generate_mix_schedule(loan_amount, mixes[i], inflation, inputs.exact_agorot)
+            else:
+                schedule = generate_schedule(loan_amount, rates[i], years[i], inputs.exact_agorot)
+        if schedule.empty:
+            table_rows.append(("אין נתונים עבור תרחיש זה",) * 6)
+            loan_scenarios_data.append({})
+            loan_scenarios_rent_comparison.append("אין נתוני השוואת שכירות עבור תרחיש זה")
+            continue
+
+        df_list[i] = schedule
+        # Totals come from the closed form, not from summing the table,
+        # except in exact mode, where the agorot sums are the lender's totals.
+        if inputs.exact_agorot:
+            initial_monthly_payment_for_scenario = float(schedule.payment[0])
+            total_interest = schedule.total_interest
+            total_payment_sum_from_df = schedule.total_paid
+            if mixes[i]:
+                calculated_results["scenario_indexation"][i] = max(round(schedule.total_principal - loan_amount, 2), 0.0)
+        elif mixes[i]:
+            totals = compare_mixes(loan_amount, [mixes[i]], inflation)
+            initial_monthly_payment_for_scenario = float(totals["first_payment"][0])
+            total_interest = float(totals["total_interest"][0])
+            total_payment_sum_from_df = float(totals["total_paid"][0])
+            calculated_results["scenario_indexation"][i] = float(totals["total_indexation"][0])
+        else:
+            initial_monthly_payment_for_scenario = calculate_monthly_payment(loan_amount, rates[i], years[i])
+            _, total_interest, total_payment_sum_from_df = loan_totals(loan_amount, rates[i], years[i])
+        calculated_results["scenario_payments"][i] = initial_monthly_payment_for_scenario
+        calculated_results["scenario_total_interest"][i] = total_interest
+        calculated_results["scenario_total_paid"][i] = total_payment_sum_from_df
+        scenario_name = f"תרחיש {i+1}" + (f" (תמהיל, {len(mixes[i])} מסלולים)" if mixes[i] else "")
+
+        table_rows.append((
+            f"{loan_amount:,.0f}",
+            f"{rates[i]:.2f}",
+            f"{years[i]}",
+            f"{initial_monthly_payment_for_scenario:,.0f}",
+            f"{total_interest:,.0f}",
+            f"{total_payment_sum_from_df:,.0f}",
+        ))
+        loan_scenarios_data.append({
+            "תרחיש": scenario_name,
+            "סכום הלוואה (₪)": f"{loan_amount:,.0f}",
+            "ריבית שנתית (%)": f"{rates[i]:.2f}",
+            "שנים להחזר": f"{years[i]}",
+            "תשלום חודשי (₪)": f"{initial_monthly_payment_for_scenario:,.0f}",
+            "סה\"כ ריבית (₪)": f"{total_interest:,.0f}",
+            "סה\"כ תשלום כולל (₪)": f"{total_payment_sum_from_df:,.0f}"
         })
 
-    return pd.DataFrame(data)
+        rent_compare_str = ""
+        if rent is not None:
+            ratio = rent / initial_monthly_payment_for_scenario if initial_monthly_payment_for_scenario != 0 else 0
+            rent_compare_str = f"שכירות צפויה: {rent:,.0f} ₪ | תשלום חודשי ראשוני: {initial_monthly_payment_for_scenario:,.0f} ₪ | יחס שכירות/תשלום: {ratio:.2f}"
+        loan_scenarios_rent_comparison.append(rent_compare_str)
+
+    return PropertyResults(
+        calculated_results=calculated_results,
+        loan_scenarios_data=loan_scenarios_data,
+        loan_scenarios_rent_comparison=loan_scenarios_rent_comparison,
+        df_list=df_list,
+        table_rows=table_rows,
+    )
+
+# --- EXCEL WORKBOOK I/O ---
+# Tk-free so save_data / load_data can run them on a worker thread.
+
+SUMMARY_SHEET_NAME = "סיכום נכסים"
+SHEET_NAME_LIMIT = 31
+# Characters Excel does not allow in a sheet name.
+_SHEET_NAME_TABLE = str.maketrans({char: "_" for char in "\\/?*[]:"})
+
+def schedule_sheet_labels(aliases, scenarios=3):
+    """Unique sheet-name prefixes for the properties' aliases, in order.
+
+    A schedule sheet is named f"{label}_תרחיש_{n}". Excel caps sheet names
+    at 31 characters and compares them case-insensitively, so each alias is
+    cut to leave room for the suffix of scenario `scenarios`, and a label
+    already taken gets " (2)", " (3)"... in place of its last characters,
+    so every sheet still names its property and scenario.
+    """
+    room = SHEET_NAME_LIMIT - len(f"_תרחיש_{scenarios}")
+    labels, taken = [], {SUMMARY_SHEET_NAME.casefold()}
+    for alias in aliases:
+        base = str(alias).translate(_SHEET_NAME_TABLE).strip("'")[:room]
+        label, copy = base, 1
+        while label.casefold() in taken:
+            copy += 1
+            tag = f" ({copy})"
+            label = base[:room - len(tag)] + tag
+        taken.add(label.casefold())
+        labels.append(label)
+    return labels
+
+def summary_row_for(idx, result):
+    """One "סיכום נכסים" row for a property; result may be None if it failed."""
+    results = result.calculated_results if result is not None else {}
+    loan_scenarios = result.loan_scenarios_data if result is not None else []
+    rent_comparisons = result.loan_scenarios_rent_comparison if result is not None else []
+
+    alias = results.get("input_alias", f"נכס {idx + 1}")
+    link = results.get("input_link", "")
+
+    summary_row = {
+        "Alias": alias,
+        "Link": link,
+        "מחיר דירה (₪)": results.get("calculated_price"),
+        "מטר מרובע (שטח)": results.get("input_area"),
+        "אחוז מימון (LTV) %": results.get("input_ltv"),
+        "שכירות חודשית צפויה (₪)": results.get("input_rent"),
+        "אינפלציה שנתית צפויה (%)": results.get("input_inflation"),
+        "בטל מס רכישה": "כן" if results.get("input_skip_tax") else "לא",
+        "כלול מס רכישה במשכנתא": "כן" if results.get("input_include_tax_in_mortgage") else "לא",
+        "חישוב מדויק באגורות": "כן" if results.get("input_exact_agorot") else "לא",
+        "הזן עלות עו\"ד ידנית": "כן" if results.get("input_manual_lawyer_fee") else "לא",
+        "עלות עו\"ד ידנית": results.get("input_lawyer_fee_manual_value"),
+        "הזן עלות מתווך ידנית": "כן" if results.get("input_manual_broker_fee") else "לא",
+        "עלות מתווך ידנית": results.get("input_broker_fee_manual_value"),
+        "בטל עלות מתווך": "כן" if results.get("input_skip_broker") else "לא",
+        "חשב מחיר נכס לפי הון עצמי": "כן" if results.get("input_calculate_affordability") else "לא",
+        "הון עצמי זמין (₪)": results.get("input_available_funds"),
+        "מס רכישה משוער (₪)": results.get("purchase_tax"),
+        "הון עצמי נדרש (₪)": results.get("down_payment"),
+        "סכום הלוואה מהבנק (₪)": results.get("loan_amount"),
+        "עלות עורך דין משוערת (₪)": results.get("lawyer_fee"),
+        "עלות מתווך משוערת (₪)": results.get("broker_fee"),
+        "סה\"כ הון דרוש (₪)": results.get("total_needed"),
+        "מחיר למטר מרובע (₪)": results.get("price_per_meter"),
+    }
+
+    tracks = results.get("input_tracks", [[], [], []])
+    for i, scenario in enumerate(loan_scenarios):
+        prefix = f"תרחיש {i+1} - "
+        summary_row[prefix + "מסלולים"] = json.dumps(tracks[i], ensure_ascii=False) if tracks[i] else None
+        summary_row[prefix + "סכום הלוואה (₪)"] = scenario.get("סכום הלוואה (₪)")
+        summary_row[prefix + "ריבית שנתית (%)"] = scenario.get("ריבית שנתית (%)")
+        summary_row[prefix + "שנים להחזר"] = scenario.get("שנים להחזר")
+        summary_row[prefix + "תשלום חודשי (₪)"] = scenario.get("תשלום חודשי (₪)")
+        summary_row[prefix + "סה\"כ ריבית (₪)"] = scenario.get("סה\"כ ריבית (₪)")
+        summary_row[prefix + "סה\"כ תשלום כולל (₪)"] = scenario.get("סה\"כ תשלום כולל (₪)")
+
+    for i, rent_comp in enumerate(rent_comparisons):
+        summary_row[f"תרחיש {i+1} - השוואת שכירות"] = rent_comp
+
+    return summary_row
+
+# Schedule sheets converted to rows ahead of the writer; bounds how many
+# sheets are held in memory at once.
+EXPORT_WORKERS = 4
+EXPORT_PREFETCH = 8
+
+def _schedule_rows(schedule):
+    # Plain Python ints/floats so every cell is stored as a numeric cell.
+    with SPANS.span("write_property_workbook.rows"):
+        return [["חודש", *SCHEDULE_COLUMNS]] + list(zip(schedule.months.tolist(), *schedule.shekels().tolist()))
+
+def _ordered_parallel(func, items, workers=EXPORT_WORKERS, prefetch=EXPORT_PREFETCH):
+    """Like map(func, items) on a thread pool, in order, with bounded lookahead."""
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export") as pool:
+        for item in items:
+            pending.append(pool.submit(func, item))
+            if len(pending) >= prefetch:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def _summary_table(summary_data):
+    # Same header order as pd.DataFrame(summary_data): keys by first appearance.
+    columns = list(dict.fromkeys(key for row in summary_data for key in row))
+    rows = [[_excel_value(row.get(column)) for column in columns] for row in summary_data]
+    return [columns] + rows
+
+def _excel_value(value):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+# openpyxl series whose sheet writer takes a write-only sheet's <dimension>
+# from a calculate_dimension attribute (pinned in requirements.txt).
+OPENPYXL_DIMENSION_SERIES = ("3.1",)
+
+def _declares_dimensions(openpyxl):
+    return openpyxl.__version__.startswith(tuple(f"{series}." for series in OPENPYXL_DIMENSION_SERIES))
+
+def _append_sheet(workbook, title, rows):
+    """Add a write-only sheet holding `rows`, declaring its <dimension>.
+
+    openpyxl's read-only loader sizes every sheet when a workbook is opened,
+    and a sheet without a <dimension> is sized by parsing it in full. A
+    write-only sheet has no public way to declare one; the writer of the
+    pinned openpyxl series reads it from calculate_dimension, so the sheet
+    is given one from the rows it is about to receive. With any other
+    openpyxl the sheet is written without it: still valid, only slower to
+    open.
+    """
+    openpyxl = timed_import("openpyxl")
+    worksheet = workbook.create_sheet(title=title)
+    width = max((len(row) for row in rows), default=0)
+    if width and _declares_dimensions(openpyxl):
+        ref = f"A1:{timed_import('openpyxl.utils').get_column_letter(width)}{len(rows)}"
+        worksheet.calculate_dimension = lambda: ref
+    for row in rows:
+        worksheet.append(row)
+    return worksheet
+
+def write_property_workbook(filepath, results, job=None):
+    """Write one sheet per schedule plus the summary sheet to `filepath`.
+
+    `results` holds one PropertyResults (or None) per property, in tab
+    order. Uses openpyxl's write-only mode, which streams each sheet's rows
+    to disk instead of keeping the whole workbook in memory; the schedule
+    rows are prepared on a few threads ahead of the writer. The summary
+    sheet has the same columns and values load_data expects. The workbook
+    is written to a temporary file and moved into place, so a cancelled
+    job never leaves a truncated file behind.
+    """
+    openpyxl = timed_import("openpyxl")
+    base, ext = os.path.splitext(filepath)
+    temp_path = f"{base}.partial{ext}"
+
+    with SPANS.span("write_property_workbook.summary"):
+        summary_data = [summary_row_for(idx, result) for idx, result in enumerate(results)]
+    scenarios = max((len(result.df_list) for result in results if result is not None), default=0)
+    labels = schedule_sheet_labels((row["Alias"] for row in summary_data), scenarios)
+    sheets = []
+    for idx, result in enumerate(results):
+        if result is None:
+            continue
+        for i, schedule in enumerate(result.df_list):
+            if schedule is not None and not schedule.empty:
+                sheets.append((idx, f"{labels[idx]}_תרחיש_{i+1}", schedule))
+
+    try:
+        workbook = openpyxl.Workbook(write_only=True)
+        prepared = _ordered_parallel(lambda sheet: (sheet[0], sheet[1], _schedule_rows(sheet[2])), sheets)
+        # The write-only sheets are serialized as rows are appended, so
+        # "sheets" is mostly openpyxl time (and waiting for prepared rows).
+        with SPANS.span("write_property_workbook.sheets"):
+            for idx, sheet_name, rows in prepared:
+                if job is not None:
+                    job.check_cancelled()
+                    job.report(idx, len(results), "כותב גיליונות...")
+                _append_sheet(workbook, sheet_name, rows)
+
+        with SPANS.span("write_property_workbook.save"):
+            _append_sheet(workbook, SUMMARY_SHEET_NAME, _summary_table(summary_data))
+            workbook.save(temp_path)
+            os.replace(temp_path, filepath)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def _is_empty_cell(value):
+    return value is None or value == "" or (isinstance(value, float) and value != value)
+
+def _cell_text(value, as_int=True):
+    if _is_empty_cell(value):
+        return ""
+    return str(int(float(value))) if as_int else str(value)
+
+def _open_summary_sheet(filepath):
+    """(workbook, worksheet) for the summary sheet, opened read-only.
+
+    Opening sizes every sheet from its <dimension>, which write_property_workbook
+    declares (see _append_sheet), so the schedule sheets are not parsed.
+    Workbooks saved without one still load, only more slowly.
+    """
+    openpyxl = timed_import("openpyxl")
+    workbook = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+    worksheet = workbook[SUMMARY_SHEET_NAME] if SUMMARY_SHEET_NAME in workbook.sheetnames else None
+    if worksheet is None:
+        workbook.close()
+        raise CalculationError("שגיאה בטעינה", "קובץ Excel אינו מכיל גיליון 'סיכום נכסים'.")
+    return workbook, worksheet
+
+def read_summary_sheet(filepath):
+    """The "סיכום נכסים" sheet as ({header: [cell values]}, [Excel row numbers]).
+
+    Blank rows are skipped; row_numbers keeps the sheet row of every value
+    kept, for messages about a row. Other sheets are not parsed.
+    """
+    workbook, worksheet = _open_summary_sheet(filepath)
+    try:
+        rows = worksheet.iter_rows(values_only=True)
+        header = list(next(rows, None) or ())
+        columns = {name: [] for name in header if name is not None}
+        row_numbers = []
+        # The header is row 1; the read-only reader yields gaps as empty rows.
+        for row_number, row in enumerate(rows, 2):
+            if all(_is_empty_cell(value) for value in row):
+                continue
+            row_numbers.append(row_number)
+            row = tuple(row) + (None,) * (len(header) - len(row))
+            for name, value in zip(header, row):
+                if name is not None:
+                    columns[name].append(value)
+    finally:
+        workbook.close()
+    return columns, row_numbers
+
+def inputs_from_summary_columns(columns):
+    """Build PropertyInputs for every summary row, one column at a time.
+
+    Returns (inputs_list, problems): inputs_list has one entry per row,
+    None for rows with a malformed cell, and problems maps those row
+    indexes to a message naming the offending column.
+    """
+    count = max((len(values) for values in columns.values()), default=0)
+    problems = {}
+
+    def column(name):
+        return columns.get(name) or [None] * count
+
+    def text(name, as_int=True):
+        values = []
+        for index, value in enumerate(column(name)):
+            try:
+                values.append(_cell_text(value, as_int))
+            except (TypeError, ValueError):
+                problems.setdefault(index, f"ערך לא תקין בעמודה '{name}': {value}")
+                values.append("")
+        return values
+
+    def flag(name):
+        return [value == "כן" for value in column(name)]
+
+    alias = text("Alias", as_int=False)
+    link = text("Link", as_int=False)
+    price = text("מחיר דירה (₪)")
+    area = text("מטר מרובע (שטח)")
+    ltv = text("אחוז מימון (LTV) %")
+    rent = text("שכירות חודשית צפויה (₪)")
+    inflation = text("אינפלציה שנתית צפויה (%)", as_int=False)
+    skip_tax = flag("בטל מס רכישה")
+    include_tax = flag("כלול מס רכישה במשכנתא")
+    exact_agorot = flag("חישוב מדויק באגורות")
+    skip_broker = flag("בטל עלות מתווך")
+    manual_lawyer = flag("הזן עלות עו\"ד ידנית")
+    lawyer_fee = text("עלות עו\"ד ידנית")
+    manual_broker = flag("הזן עלות מתווך ידנית")
+    broker_fee = text("עלות מתווך ידנית")
+    calc_afford = flag("חשב מחיר נכס לפי הון עצמי")
+    available_funds = text("הון עצמי זמין (₪)")
+    rates = [text(f"תרחיש {i+1} - ריבית שנתית (%)", as_int=False) for i in range(3)]
+    years = [text(f"תרחיש {i+1} - שנים להחזר") for i in range(3)]
+    tracks = []
+    for i in range(3):
+        name = f"תרחיש {i+1} - מסלולים"
+        scenario_tracks = []
+        for index, value in enumerate(text(name, as_int=False)):
+            try:
+                scenario_tracks.append(json.loads(value) if value else [])
+            except ValueError:
+                problems.setdefault(index, f"ערך לא תקין בעמודה '{name}': {value}")
+                scenario_tracks.append([])
+        tracks.append(scenario_tracks)
+
+    inputs_list = []
+    for n in range(count):
+        if n in problems:
+            inputs_list.append(None)
+            continue
+        inputs_list.append(PropertyInputs(
+            alias=alias[n],
+            link=link[n],
+            price="" if calc_afford[n] else price[n],
+            area=area[n],
+            ltv=ltv[n],
+            rent=rent[n],
+            inflation=inflation[n],
+            skip_tax=skip_tax[n],
+            include_tax_in_mortgage=include_tax[n],
+            exact_agorot=exact_agorot[n],
+            # A manual broker fee disables "skip broker" in the tab.
+            skip_broker=skip_broker[n] and not manual_broker[n],
+            manual_lawyer_fee=manual_lawyer[n],
+            lawyer_fee_manual_value=lawyer_fee[n] if manual_lawyer[n] else "",
+            manual_broker_fee=manual_broker[n],
+            broker_fee_manual_value=broker_fee[n] if manual_broker[n] else "",
+            calculate_affordability=calc_afford[n],
+            available_funds=available_funds[n] if calc_afford[n] else "",
+            rates=[scenario[n] for scenario in rates],
+            years=[scenario[n] for scenario in years],
+            tracks=[scenario[n] for scenario in tracks],
+        ))
+    return inputs_list, problems
+
+def _error_text(error):
+    return error.message if isinstance(error, CalculationError) else str(error)
+
+def read_property_workbook(filepath, job=None):
+    """Read a saved workbook's summary sheet and compute every property.
+
+    Returns (loaded, problems). loaded holds (inputs, result, error) for
+    each usable row in sheet order, with result None and error set when
+    the property fails to compute. problems lists one message per
+    malformed or failing row, so they can be reported together.
+    """
+    with SPANS.span("read_property_workbook.read"):
+        columns, row_numbers = read_summary_sheet(filepath)
+    with SPANS.span("read_property_workbook.parse"):
+        inputs_list, bad_rows = inputs_from_summary_columns(columns)
+    aliases = columns.get("Alias") or [None] * len(inputs_list)
+
+    loaded = []
+    problems = []
+    with SPANS.span("read_property_workbook.compute"):
+        for index, inputs in enumerate(inputs_list):
+            if job is not None:
+                job.check_cancelled()
+                job.report(index, len(inputs_list), "מחשב נכסים...")
+            label = f"שורה {row_numbers[index]}" + (f" ({aliases[index]})" if not _is_empty_cell(aliases[index]) else "")
+            if inputs is None:
+                problems.append(f"{label}: {bad_rows[index]}")
+                continue
+            try:
+                loaded.append((inputs, compute_property(inputs), None))
+            except Exception as e:
+                loaded.append((inputs, None, e))
+                problems.append(f"{label}: {_error_text(e)}")
+    return loaded, problems
+
+# --- SQLITE PROJECT STORE ---
+# The native project file. Excel stays an export format; a project is saved
+# incrementally, so only properties whose inputs changed since the last save
+# are rewritten, and opening one reads the inputs alone (schedules are read
+# when a tab is first shown).
+
+PROJECT_FILE_EXTENSION = ".mortgage"
+# 2: PropertyInputs gained tracks, inflation and exact_agorot. Builds that
+# read version 1 would fail on those keys, so they must refuse the file.
+# 3: schedules.agorot; a schedule may be stored as int64 agorot.
+PROJECT_SCHEMA_VERSION = 3
+PROJECT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS properties (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    alias TEXT NOT NULL,
+    inputs TEXT NOT NULL,
+    results TEXT
+);
+CREATE INDEX IF NOT EXISTS properties_alias ON properties (alias);
+CREATE TABLE IF NOT EXISTS scenarios (
+    property_id INTEGER NOT NULL REFERENCES properties (id) ON DELETE CASCADE,
+    scenario INTEGER NOT NULL,
+    alias TEXT NOT NULL,
+    loan_amount REAL NOT NULL,
+    annual_rate REAL NOT NULL,
+    years INTEGER NOT NULL,
+    monthly_payment REAL NOT NULL,
+    total_interest REAL NOT NULL,
+    total_paid REAL NOT NULL,
+    PRIMARY KEY (property_id, scenario)
+);
+CREATE INDEX IF NOT EXISTS scenarios_alias ON scenarios (alias);
+CREATE TABLE IF NOT EXISTS schedules (
+    property_id INTEGER NOT NULL,
+    scenario INTEGER NOT NULL,
+    months INTEGER NOT NULL,
+    columns BLOB NOT NULL,
+    agorot INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (property_id, scenario),
+    FOREIGN KEY (property_id, scenario) REFERENCES scenarios (property_id, scenario) ON DELETE CASCADE
+);
+"""
+# Stored as one block per schedule, AmortizationSchedule.values as is:
+# int64 agorot when schedules.agorot is 1, float64 shekels otherwise.
+
+def _json_value(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _inputs_from_json(text):
+    # Keys this build does not know are dropped and missing ones keep their
+    # defaults, so adding a PropertyInputs field needs no schema bump.
+    known = {f.name for f in fields(PropertyInputs)}
+    return PropertyInputs(**{key: value for key, value in json.loads(text).items() if key in known})
+
+def _schedule_blob(schedule):
+    return schedule.values.tobytes()
+
+def _schedule_from_blob(months, agorot, blob):
+    values = np.frombuffer(blob, dtype=np.int64 if agorot else np.float64)
+    return AmortizationSchedule(values.reshape(len(SCHEDULE_COLUMNS), months), agorot=bool(agorot))
+
+class ProjectStore:
+    """A project file: one SQLite database with the inputs of every property,
+    its last result and the scenario schedules behind it.
+
+    Every call opens its own connection, so the store can be used from the
+    job runner's worker threads as well as from the Tk thread.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with closing(self._connect()) as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version > PROJECT_SCHEMA_VERSION:
+                raise CalculationError("שגיאה בפתיחת פרויקט", "קובץ הפרויקט נוצר בגרסה חדשה יותר של התוכנה.")
+            # A new file is empty; any other database must be a project.
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            if (tables if version == 0 else "properties" not in tables):
+                raise CalculationError("שגיאה בפתיחת פרויקט", "הקובץ אינו קובץ פרויקט של המחשבון.")
+            with conn:
+                if 0 < version < 3:
+                    conn.execute("ALTER TABLE schedules ADD COLUMN agorot INTEGER NOT NULL DEFAULT 0")
+                conn.executescript(PROJECT_SCHEMA)
+                conn.execute(f"PRAGMA user_version = {PROJECT_SCHEMA_VERSION}")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def load_inputs(self):
+        """[(property_id, PropertyInputs)] in tab order, without any results."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT id, inputs FROM properties ORDER BY position").fetchall()
+        return [(property_id, _inputs_from_json(text)) for property_id, text in rows]
+
+    def load_result(self, property_id):
+        """The PropertyResults saved for a property, schedules included, or None."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT results FROM properties WHERE id = ?", (property_id,)).fetchone()
+            if row is None or row[0] is None:
+                return None
+            schedules = conn.execute("SELECT scenario, months, agorot, columns FROM schedules WHERE property_id = ?",
+                                     (property_id,)).fetchall()
+        saved = json.loads(row[0])
+        df_list = [None, None, None]
+        for scenario, months, agorot, blob in schedules:
+            df_list[scenario] = _schedule_from_blob(months, agorot, blob)
+        return PropertyResults(
+            calculated_results=saved["calculated_results"],
+            loan_scenarios_data=saved["loan_scenarios_data"],
+            loan_scenarios_rent_comparison=saved["loan_scenarios_rent_comparison"],
+            df_list=df_list,
+            table_rows=[tuple(row) for row in saved["table_rows"]],
+        )
+
+    def save(self, records, job=None):
+        """Write the whole project in one transaction and return the property ids.
+
+        `records` holds (property_id, inputs, result) per tab, in order.
+        property_id is None for a property not yet in this store; inputs is
+        None for one unchanged since it was saved here, which then only has
+        its position updated. Properties missing from `records` are deleted.
+        """
+        ids = []
+        with closing(self._connect()) as conn:
+            with conn:
+                for position, (property_id, inputs, result) in enumerate(records):
+                    if job is not None:
+                        job.check_cancelled()
+                        job.report(position, len(records), "שומר נכסים...")
+                    if inputs is None:
+                        conn.execute("UPDATE properties SET position = ? WHERE id = ?", (position, property_id))
+                    else:
+                        property_id = self._write_property(conn, property_id, position, inputs, result)
+                    ids.append(property_id)
+                stale = {row[0] for row in conn.execute("SELECT id FROM properties")} - set(ids)
+                conn.executemany("DELETE FROM properties WHERE id = ?", [(property_id,) for property_id in stale])
+        return ids
+
+    def _write_property(self, conn, property_id, position, inputs, result):
+        results_text = None
+        if result is not None:
+            results_text = json.dumps({
+                "calculated_results": result.calculated_results,
+                "loan_scenarios_data": result.loan_scenarios_data,
+                "loan_scenarios_rent_comparison": result.loan_scenarios_rent_comparison,
+                "table_rows": result.table_rows,
+            }, ensure_ascii=False, default=_json_value)
+        if property_id is not None:
+            # Cascades to the property's schedules.
+            conn.execute("DELETE FROM scenarios WHERE property_id = ?", (property_id,))
+        cursor = conn.execute(
+            "INSERT OR REPLACE INTO properties (id, position, alias, inputs, results) VALUES (?, ?, ?, ?, ?)",
+            (property_id, position, inputs.alias, json.dumps(asdict(inputs), ensure_ascii=False), results_text))
+        property_id = cursor.lastrowid
+        if result is None:
+            return property_id
+
+        results = result.calculated_results
+        scenarios = []
+        schedules = []
+        for i, schedule in enumerate(result.df_list):
+            if schedule is None or schedule.empty:
+                continue
+            rate, years = results["input_rates"][i], results["input_years"][i]
+            payment = results.get("scenario_payments", [None] * 3)[i]
+            if payment is None:
+                payment = calculate_monthly_payment(results["loan_amount"], rate, years)
+            total_interest = results.get("scenario_total_interest", [None] * 3)[i]
+            total_paid = results.get("scenario_total_paid", [None] * 3)[i]
+            if total_interest is None or total_paid is None:
+                total_interest, total_paid = schedule.total_interest, schedule.total_paid
+            scenarios.append((property_id, i, inputs.alias, results["loan_amount"], rate, years, payment,
+                              total_interest, total_paid))
+            schedules.append((property_id, i, len(schedule), _schedule_blob(schedule), int(schedule.agorot)))
+        conn.executemany("INSERT INTO scenarios VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", scenarios)
+        conn.executemany("INSERT INTO schedules (property_id, scenario, months, columns, agorot) VALUES (?, ?, ?, ?, ?)",
+                         schedules)
+        return property_id
+
+def _save_project_job(job, store, records):
+    """Compute what `records` is missing, then save it to `store`.
+
+    `records` is as for ProjectStore.save, except that result may be None
+    for changed inputs that still need computing. Returns (ids, computed)
+    with computed holding (inputs, result, error) per record.
+    """
+    computed = []
+    for n, (property_id, inputs, result) in enumerate(records):
+        job.check_cancelled()
+        job.report(n, len(records), "מחשב נכסים...")
+        error = None
+        if inputs is not None and result is None:
+            try:
+                result = compute_property(inputs)
+            except Exception as e:
+                error = e
+        computed.append((inputs, result, error))
+    ids = store.save([(property_id, inputs, result) for (property_id, _, _), (inputs, result, _)
+                      in zip(records, computed)], job)
+    return ids, computed
+
+def _open_project_job(job, filepath):
+    store = ProjectStore(filepath)
+    return store, store.load_inputs()
+
+# --- PDF REPORT ---
+# Tk-free, so reports are laid out and written on a worker. Charts are drawn
+# off-screen from the schedule data rather than copied from the tab's
+# figures, and cached by content, so re-exporting an unchanged property
+# reuses them.
+
+PDF_CHART_DPI = 200
+PDF_CHART_WIDTH_INCHES = 7
+
+def _pdf_styles():
+    # Use the Hebrew styles defined by ensure_pdf_support
+    styles = getSampleStyleSheet()
+    for style in (heb_style, heb_heading_style, heb_subheading_style):
+        if style.name not in styles:
+            styles.add(style)
+    return styles
+
+def _chart_key(schedule, i, *options):
+    digest = hashlib.blake2b(np.ascontiguousarray(schedule.shekels()[:2]).tobytes(), digest_size=16)
+    return (digest.hexdigest(), i) + options
+
+def _chart_limits(schedule):
+    months = schedule.months
+    top = float(max(schedule.principal.max(), schedule.interest.max()))
+    return max(int(months[-1]), 2), top * 1.05 if top > 0 else 1
+
+def render_chart_png(schedule, i, dpi=PDF_CHART_DPI):
+    """PNG bytes of scenario i's chart, drawn like the tab's chart with Agg."""
+    key = _chart_key(schedule, i, "png", dpi)
+    found, png = CHART_IMAGE_CACHE.get(key)
+    if found:
+        return png
+    Figure, FigureCanvasAgg = agg_chart_classes()
+    fig = Figure(figsize=(5, 2.5), dpi=100)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    ax.plot(schedule.months, schedule.principal, label="קרן", color="green")
+    ax.plot(schedule.months, schedule.interest, label="ריבית", color="red")
+    ax.set_title(f"תרחיש {i+1} - פירוט תשלומים חודשיים", fontsize=9)
+    ax.set_xlabel("חודש", fontsize=8)
+    ax.set_ylabel("₪", fontsize=8)
+    ax.legend(fontsize=7)
+    ax.grid(True)
+    ax.tick_params(axis='both', which='major', labelsize=7)
+    last_month, y_top = _chart_limits(schedule)
+    ax.set_xlim(1, last_month)
+    ax.set_ylim(0, y_top)
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=dpi, bbox_inches='tight')
+    png = buf.getvalue()
+    CHART_IMAGE_CACHE.put(key, png)
+    return png
+
+def chart_drawing(schedule, i, width, height):
+    """Scenario i's chart as a reportlab Drawing, embedded as vector graphics."""
+    font = heb_style.fontName
+    key = _chart_key(schedule, i, "vector", width, height, font)
+    found, drawing = CHART_DRAWING_CACHE.get(key)
+    if found:
+        return drawing
+    from reportlab.graphics.shapes import Drawing, String
+    from reportlab.graphics.charts.lineplots import LinePlot
+    from reportlab.graphics.charts.legends import Legend
+
+    months = schedule.months.tolist()
+    last_month, y_top = _chart_limits(schedule)
+    drawing = Drawing(width, height)
+    plot = LinePlot()
+    plot.x, plot.y = 55, 30
+    plot.width, plot.height = width - 70, height - 55
+    plot.data = [list(zip(months, schedule.principal.tolist())), list(zip(months, schedule.interest.tolist()))]
+    plot.lines[0].strokeColor = colors.green
+    plot.lines[1].strokeColor = colors.red
+    for axis, top in ((plot.xValueAxis, last_month), (plot.yValueAxis, y_top)):
+        axis.valueMin, axis.valueMax = (1 if axis is plot.xValueAxis else 0), top
+        axis.labels.fontName = font
+        axis.labels.fontSize = 7
+        axis.visibleGrid = True
+        axis.gridStrokeColor = colors.lightgrey
+    plot.xValueAxis.labelTextFormat = "%d"
+    plot.yValueAxis.labelTextFormat = lambda value: f"{value:,.0f}"
+    drawing.add(plot)
+    drawing.add(String(width / 2, height - 12, f"תרחיש {i+1} - פירוט תשלומים חודשיים",
+                       fontName=font, fontSize=9, textAnchor="middle"))
+    drawing.add(String(plot.x + plot.width / 2, 4, "חודש", fontName=font, fontSize=8, textAnchor="middle"))
+    drawing.add(String(8, plot.y + plot.height / 2, "₪", fontName=font, fontSize=8))
+    legend = Legend()
+    legend.x, legend.y = plot.x + plot.width - 50, plot.y + plot.height - 5
+    legend.fontName = font
+    legend.fontSize = 7
+    legend.colorNamePairs = [(colors.green, "קרן"), (colors.red, "ריבית")]
+    drawing.add(legend)
+    CHART_DRAWING_CACHE.put(key, drawing)
+    return drawing
+
+def chart_flowable(schedule, i, vector=False, png=None):
+    """The PDF flowable for scenario i's chart, PDF_CHART_WIDTH_INCHES wide.
+
+    `png` is an already rendered render_chart_png(schedule, i) image, if any.
+    """
+    width = PDF_CHART_WIDTH_INCHES * inch
+    if vector:
+        with SPANS.span("pdf.chart_drawing"):
+            return chart_drawing(schedule, i, width, width / 2)
+    if png is None:
+        with SPANS.span("pdf.chart_png"):
+            png = render_chart_png(schedule, i)
+    img = RLImage(io.BytesIO(png))
+    aspect_ratio = img.imageHeight / img.imageWidth
+    height = width * aspect_ratio
+    # If the image is too tall, scale down based on height as well
+    max_height = A4[1] - (36*2 + 1*inch)  # A4 height - top/bottom margins - some space for title/text
+    if height > max_height:
+        height = max_height
+        width = height / aspect_ratio
+    img.drawWidth = width
+    img.drawHeight = height
+    return img
+
+def property_report_story(result, doc, default_alias="", vector_charts=False, chart_images=None):
+    """The flowables of one property's PDF report.
+
+    `chart_images` maps scenario index to PNG bytes rendered elsewhere.
+    """
+    styles = _pdf_styles()
+    results = result.calculated_results
+    story = []
+
+    # --- Title ---
+    alias = results.get("input_alias", default_alias)
+    story.append(Paragraph(f"<b>דוח נכס: {alias}</b>", styles['HebrewHeading']))
+    story.append(Spacer(1, 0.2 * inch))
+
+    # --- Input Data Section ---
+    story.append(Paragraph("<b>פרטי קלט:</b>", styles['HebrewSubHeading']))
+    story.append(Spacer(1, 0.1 * inch))
+
+    input_data = [
+        ("קישור:", results.get("input_link", "")),
+        ("מחיר דירה (₪):", f"{results.get('calculated_price', 0):,.0f}"),
+        ("מטר מרובע (שטח):", results.get("input_area", "")),
+        ("אחוז מימון (LTV) %:", results.get("input_ltv", "")),
+        ("שכירות חודשית צפויה (₪):", results.get("input_rent", "")),
+        ("אינפלציה שנתית צפויה (%):", results.get("input_inflation", "")),
+        ("בטל מס רכישה:", "כן" if results.get("input_skip_tax") else "לא"),
+        ("כלול מס רכישה במשכנתא:", "כן" if results.get("input_include_tax_in_mortgage") else "לא"),
+        ("חישוב מדויק באגורות:", "כן" if results.get("input_exact_agorot") else "לא"),
+    ]
+
+    if results.get("input_manual_lawyer_fee"):
+        input_data.append(("הזן עלות עו\"ד ידנית:", results.get("input_lawyer_fee_manual_value", "")))
+    else:
+        input_data.append(("עלות עו\"ד משוערת (% מהמחיר):", f"{LAWYER_FEE_RATE*100:.0f}%"))
+
+    if results.get("input_manual_broker_fee"):
+         input_data.append(("הזן עלות מתווך ידנית:", results.get("input_broker_fee_manual_value", "")))
+    elif results.get("input_skip_broker"):
+        input_data.append(("בטל עלות מתווך:", "כן"))
+    else:
+        input_data.append(("עלות מתווך משוערת (% מהמחיר):", f"{BROKER_FEE_RATE*100:.0f}%"))
+
+    if results.get("input_calculate_affordability"):
+        input_data.append(("חשב מחיר נכס לפי הון עצמי (₪):", results.get("input_available_funds", "")))
+
+    # Use the Hebrew style for Paragraphs in the table
+    input_table_data = [[Paragraph(f"<b>{k}</b>", styles['Hebrew']), Paragraph(str(v), styles['Hebrew'])] for k, v in input_data]
+
+    # Adjust colWidths to prevent cutting and fit content
+    table_col_widths = [doc.width * 0.4, doc.width * 0.6] # Allocate width dynamically
+    input_table = Table(input_table_data, colWidths=table_col_widths)
+    input_table.setStyle(TableStyle([
+        ('ALIGN', (0,0), (-1,-1), 'RIGHT'), # Align right for Hebrew
+        ('VALIGN', (0,0), (-1,-1), 'TOP'),
+        ('FONTNAME', (0,0), (0,-1), 'DejaVuSans-Bold'), # This now refers to the registered bold font
+        ('FONTNAME', (1,0), (1,-1), 'DejaVuSans'), # This now refers to the registered normal font
+        ('BOTTOMPADDING', (0,0), (-1,-1), 2),
+        ('GRID', (0,0), (-1,-1), 0.25, colors.black),
+        ('BACKGROUNDS', (0,0), (-1,-1), [colors.HexColor('#F0F8FF'), None]), # Light blue for alternating rows
+    ]))
+    story.append(input_table)
+    story.append(Spacer(1, 0.3 * inch))
+
+    # --- Calculation Summary ---
+    story.append(Paragraph("<b>סיכום חישובים:</b>", styles['HebrewSubHeading']))
+    story.append(Spacer(1, 0.1 * inch))
+
+    summary_data = [
+        ("מס רכישה משוער:", f"{results.get('purchase_tax', 0):,.0f} ₪"),
+        ("הון עצמי נדרש:", f"{results.get('down_payment', 0):,.0f} ₪"),
+        ("סכום הלוואה מהבנק:", f"{results.get('loan_amount', 0):,.0f} ₪"),
+        ("עלות עורך דין משוערת:", f"{results.get('lawyer_fee', 0):,.0f} ₪"),
+        ("עלות מתווך משוערת:", f"{results.get('broker_fee', 0):,.0f} ₪"),
+        ("סה\"כ הון דרוש:", f"{results.get('total_needed', 0):,.0f} ₪"),
+    ]
+    if results.get("price_per_meter") is not None:
+        summary_data.append(("מחיר למטר מרובע:", f"{results.get('price_per_meter', 0):,.2f} ₪"))
+
+    summary_table_data = [[Paragraph(f"<b>{k}</b>", styles['Hebrew']), Paragraph(str(v), styles['Hebrew'])] for k, v in summary_data]
+    summary_table = Table(summary_table_data, colWidths=table_col_widths)
+    summary_table.setStyle(TableStyle([
+        ('ALIGN', (0,0), (-1,-1), 'RIGHT'), # Align right for Hebrew
+        ('VALIGN', (0,0), (-1,-1), 'TOP'),
+        ('FONTNAME', (0,0), (0,-1), 'DejaVuSans-Bold'), # This too
+        ('FONTNAME', (1,0), (1,-1), 'DejaVuSans'), # And this
+        ('BOTTOMPADDING', (0,0), (-1,-1), 2),
+        ('GRID', (0,0), (-1,-1), 0.25, colors.black),
+        ('BACKGROUNDS', (0,0), (-1,-1), [colors.HexColor('#F0F8FF'), None]),
+    ]))
+    story.append(summary_table)
+    story.append(Spacer(1, 0.3 * inch))
+
+    # --- Loan Scenarios Table ---
+    story.append(Paragraph("<b>תרחישי הלוואה:</b>", styles['HebrewSubHeading']))
+    story.append(Spacer(1, 0.1 * inch))
+
+    loan_table_headers = ["תרחיש", "סכום הלוואה (₪)", "ריבית שנתית (%)", "שנים להחזר", "תשלום חודשי (₪)", "סה\"כ ריבית (₪)", "סה\"כ תשלום כולל (₪)"]
+
+    # Wrap headers in Paragraphs for font styling
+    loan_table_data = [[Paragraph(header, styles['Hebrew']) for header in loan_table_headers]]
+
+    for i, scenario in enumerate(result.loan_scenarios_data):
+        if scenario:
+            # Wrap each cell's content in Paragraph for font styling
+            loan_table_data.append([
+                Paragraph(scenario.get("תרחיש", ""), styles['Hebrew']),
+                Paragraph(scenario.get("סכום הלוואה (₪)", ""), styles['Hebrew']),
+                Paragraph(scenario.get("ריבית שנתית (%)", ""), styles['Hebrew']),
+                Paragraph(scenario.get("שנים להחזר", ""), styles['Hebrew']),
+                Paragraph(scenario.get("תשלום חודשי (₪)", ""), styles['Hebrew']),
+                Paragraph(scenario.get("סה\"כ ריבית (₪)", ""), styles['Hebrew']),
+                Paragraph(scenario.get("סה\"כ תשלום כולל (₪)", ""), styles['Hebrew'])
+            ])
+
+    if len(loan_table_data) > 1:
+        # Calculate optimal column widths based on content or fixed proportions
+        # Adjust colWidths to fit content. A4 width is ~595 points, effective width ~523 points.
+        # 523 / 7 columns ~= 75 points per column. Let's make it a bit more flexible.
+        col_widths = [doc.width * 0.12, doc.width * 0.17, doc.width * 0.12, doc.width * 0.1, doc.width * 0.17, doc.width * 0.16, doc.width * 0.16] # Adjusted widths
+
+        loan_table = Table(loan_table_data, colWidths=col_widths)
+        loan_table.setStyle(TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#ADD8E6')),
+            ('TEXTCOLOR', (0,0), (-1,0), colors.black),
+            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+            ('FONTNAME', (0,0), (-1,0), 'DejaVuSans-Bold'), # Ensure header font is bold
+            ('FONTSIZE', (0,0), (-1,0), 9), # Smaller font for table headers
+            ('BOTTOMPADDING', (0,0), (-1,0), 6),
+            ('BACKGROUNDS', (0,1), (-1,-1), [colors.beige, colors.white]),
+            ('GRID', (0,0), (-1,-1), 0.25, colors.black),
+            ('FONTNAME', (0,1), (-1,-1), 'DejaVuSans'), # Regular font for table data
+            ('FONTSIZE', (0,1), (-1,-1), 8), # Smaller font for table data
+        ]))
+        story.append(loan_table)
+        story.append(Spacer(1, 0.3 * inch))
+    else:
+        story.append(Paragraph("אין נתוני הלוואה לתרחישים.", styles['Hebrew']))
+        story.append(Spacer(1, 0.3 * inch))
+
+    # --- Mortgage Mixes ---
+    for i, tracks in enumerate(results.get("input_tracks", [])):
+        if tracks and result.df_list[i] is not None:
+            parts = [f"{track.get('kind') or 'מסלול'}: {track.get('share')}% | {track.get('rate')}% | {track.get('years')} שנים"
+                     for track in tracks]
+            indexation = results.get("scenario_indexation", [None] * 3)[i]
+            if indexation:
+                parts.append(f"הצמדה צפויה: {indexation:,.0f} ₪")
+            story.append(Paragraph(f"<b>תמהיל תרחיש {i+1}:</b> " + "; ".join(parts), styles['Hebrew']))
+            story.append(Spacer(1, 0.05 * inch))
+
+    # --- Rent Comparison ---
+    if any(result.loan_scenarios_rent_comparison):
+        story.append(Paragraph("<b>השוואת שכירות:</b>", styles['HebrewSubHeading']))
+        story.append(Spacer(1, 0.1 * inch))
+        for rent_comp_str in result.loan_scenarios_rent_comparison:
+            if rent_comp_str:
+                story.append(Paragraph(rent_comp_str, styles['Hebrew']))
+                story.append(Spacer(1, 0.05 * inch))
+        story.append(Spacer(1, 0.3 * inch))
+
+    # --- Amortization Graphs ---
+    story.append(Paragraph("<b>גרפי פירעון:</b>", styles['HebrewSubHeading']))
+    story.append(Spacer(1, 0.1 * inch))
+
+    for i, schedule in enumerate(result.df_list):
+        if schedule is not None and not schedule.empty:
+            # KeepTogether moves a chart that does not fit to the next page.
+            story.append(KeepTogether([
+                Paragraph(f"<b>תרחיש {i+1}</b>", styles['Hebrew']),
+                chart_flowable(schedule, i, vector=vector_charts, png=(chart_images or {}).get(i)),
+                Spacer(1, 0.2 * inch),
+            ]))
+    return story
+
+def write_property_pdf(filepath, result, default_alias="", vector_charts=False, job=None):
+    """Lay out and write one property's report to `filepath`."""
+    ensure_pdf_support()
+    doc = SimpleDocTemplate(filepath, pagesize=A4, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36) # Added margins
+    with SPANS.span("write_property_pdf.story"):
+        story = property_report_story(result, doc, default_alias, vector_charts)
+    if job is not None:
+        job.check_cancelled()
+    with SPANS.span("write_property_pdf.build"):
+        doc.build(story)
+
+# Chart images for a portfolio report are drawn in worker processes; "spawn"
+# because forking a process that runs Tk and worker threads is unsafe.
+PDF_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+def _render_chart_images(df_list, dpi=PDF_CHART_DPI):
+    """{scenario: PNG bytes} for one property; runs in a worker process."""
+    return {i: render_chart_png(schedule, i, dpi) for i, schedule in enumerate(df_list)
+            if schedule is not None and not schedule.empty}
+
+def _cached_chart_images(df_list, dpi=PDF_CHART_DPI):
+    images = {}
+    for i, schedule in enumerate(df_list):
+        if schedule is not None and not schedule.empty:
+            found, png = CHART_IMAGE_CACHE.get(_chart_key(schedule, i, "png", dpi))
+            if not found:
+                return None
+            images[i] = png
+    return images
+
+def render_portfolio_charts(results, job=None, workers=PDF_WORKERS):
+    """Chart images for every PropertyResults in `results`, as a list of dicts.
+
+    Properties whose charts are all cached are not sent to the pool; the
+    rest are rendered in up to `workers` processes and cached here.
+    """
+    images = [_cached_chart_images(result.df_list) for result in results]
+    missing = [n for n, found in enumerate(images) if found is None]
+    if not missing:
+        return images
+    multiprocessing = importlib.import_module("multiprocessing")
+    futures_module = importlib.import_module("concurrent.futures")
+    with futures_module.ProcessPoolExecutor(max_workers=min(workers, len(missing)),
+                                            mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(_render_chart_images, results[n].df_list): n for n in missing}
+        try:
+            for done, future in enumerate(futures_module.as_completed(futures), 1):
+                n = futures[future]
+                images[n] = future.result()
+                for i, png in images[n].items():
+                    CHART_IMAGE_CACHE.put(_chart_key(results[n].df_list[i], i, "png", PDF_CHART_DPI), png)
+                if job is not None:
+                    job.check_cancelled()
+                    job.report(done, len(missing), "מצייר גרפים...")
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return images
+
+def portfolio_summary_story(entries, doc):
+    """The opening page of a portfolio report: one row per property."""
+    styles = _pdf_styles()
+    story = [Paragraph("<b>דוח תיק נכסים</b>", styles['HebrewHeading']), Spacer(1, 0.2 * inch)]
+    headers = ["נכס", "מחיר דירה (₪)", "סכום הלוואה (₪)", "סה\"כ הון דרוש (₪)", "שכירות חודשית (₪)", "תשלום חודשי, תרחיש 1 (₪)"]
+    rows = [[Paragraph(header, styles['Hebrew']) for header in headers]]
+    for default_alias, result in entries:
+        results = result.calculated_results
+        first_scenario = next((scenario for scenario in result.loan_scenarios_data if scenario), {})
+        rent = results.get("rent")
+        rows.append([Paragraph(str(cell), styles['Hebrew']) for cell in (
+            results.get("input_alias") or default_alias,
+            f"{results.get('calculated_price', 0):,.0f}",
+            f"{results.get('loan_amount', 0):,.0f}",
+            f"{results.get('total_needed', 0):,.0f}",
+            f"{rent:,.0f}" if rent is not None else "",
+            first_scenario.get("תשלום חודשי (₪)", ""),
+        )])
+    table = Table(rows, colWidths=[doc.width * 0.2] + [doc.width * 0.16] * 5, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#ADD8E6')),
+        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+        ('BACKGROUNDS', (0,1), (-1,-1), [colors.beige, colors.white]),
+        ('GRID', (0,0), (-1,-1), 0.25, colors.black),
+    ]))
+    story.append(table)
+    return story
+
+def write_portfolio_pdf(filepath, entries, vector_charts=False, job=None, workers=PDF_WORKERS):
+    """Write one report covering every property to `filepath`.
+
+    `entries` holds (default_alias, PropertyResults) per property, in tab
+    order. Raster chart images are drawn in worker processes first; each
+    property's section then starts on a new page after the summary table.
+    """
+    ensure_pdf_support()
+    results = [result for _, result in entries]
+    images = [None] * len(entries) if vector_charts else render_portfolio_charts(results, job, workers)
+
+    doc = SimpleDocTemplate(filepath, pagesize=A4, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36)
+    story = portfolio_summary_story(entries, doc)
+    for n, ((default_alias, result), chart_images) in enumerate(zip(entries, images)):
+        if job is not None:
+            job.check_cancelled()
+            job.report(n, len(entries), "בונה דוח...")
+        story.append(PageBreak())
+        story.extend(property_report_story(result, doc, default_alias, vector_charts, chart_images))
+    if job is not None:
+        job.report(len(entries), len(entries), "כותב קובץ PDF...")
+    doc.build(story)
 
 # --- NEW FUNCTION FOR ERROR MESSAGES WITH COPY ---
 def show_error_with_copy(title, message, parent=None):
@@ -170,13 +2754,712 @@ def show_error_with_copy(title, message, parent=None):
     top.wait_window(top)
 
 
+# --- BACKGROUND JOBS ---
+# Saving, loading and PDF building run on a worker pool. Workers never touch
+# Tk: they report progress through a queue and JobRunner delivers progress
+# and completion callbacks on the Tk thread by polling with root.after.
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, name):
+        self.name = name
+        self.future = None
+        self._cancel_event = threading.Event()
+        self._progress = queue.Queue()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Called by the worker between steps; aborts the job if cancelled."""
+        if self._cancel_event.is_set():
+            raise JobCancelled(self.name)
+
+    def report(self, done, total, text=""):
+        self._progress.put((done, total, text))
+
+
+class JobRunner:
+    POLL_MS = 50
+
+    def __init__(self, root, max_workers=2):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._active = []
+        self._polling = False
+
+    def submit(self, name, func, *args, on_done=None, on_error=None, on_progress=None, on_cancel=None):
+        """Run func(job, *args) on the pool; callbacks run on the Tk thread."""
+        job = Job(name)
+        job.future = self.executor.submit(func, job, *args)
+        self._active.append((job, on_done, on_error, on_progress, on_cancel))
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.POLL_MS, self._poll)
+        return job
+
+    def cancel_all(self):
+        for job, *_ in self._active:
+            job.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _poll(self):
+        still_running = []
+        for entry in self._active:
+            job, on_done, on_error, on_progress, on_cancel = entry
+            latest = None
+            while True:
+                try:
+                    latest = job._progress.get_nowait()
+                except queue.Empty:
+                    break
+            if latest is not None and on_progress is not None:
+                self._safe_call(on_progress, *latest)
+
+            if not job.future.done():
+                still_running.append(entry)
+                continue
+            try:
+                value = job.future.result()
+            except (JobCancelled, CancelledError):
+                if on_cancel is not None:
+                    self._safe_call(on_cancel)
+            except Exception as e:
+                if on_error is not None:
+                    self._safe_call(on_error, e)
+            else:
+                if on_done is not None:
+                    self._safe_call(on_done, value)
+
+        self._active = still_running
+        if self._active:
+            self.root.after(self.POLL_MS, self._poll)
+        else:
+            self._polling = False
+
+    def _safe_call(self, callback, *args):
+        try:
+            callback(*args)
+        except Exception as e:
+            show_error_with_copy("שגיאה כללית", f"אירעה שגיאה בלתי צפויה: {e}", parent=self.root)
+
+
+class ProgressDialog:
+    """Modal progress bar with a cancel button for a running Job."""
+
+    def __init__(self, parent, title):
+        self.job = None
+        self.top = tk.Toplevel(parent)
+        self.top.title(title)
+        self.top.transient(parent)
+        self.top.resizable(False, False)
+        self.top.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        self.label = ttk.Label(self.top, text="", width=40, anchor="e")
+        self.label.pack(padx=10, pady=(10, 5))
+        self.bar = ttk.Progressbar(self.top, length=320, mode='determinate')
+        self.bar.pack(padx=10, pady=5)
+        self.cancel_button = ttk.Button(self.top, text="ביטול", command=self.cancel)
+        self.cancel_button.pack(pady=(5, 10))
+        self.top.grab_set()
+
+    def attach(self, job):
+        self.job = job
+
+    def update(self, done, total, text=""):
+        if not self.top.winfo_exists():
+            return
+        self.bar.config(maximum=max(total, 1), value=done)
+        if text:
+            self.label.config(text=text)
+
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancel()
+            self.cancel_button.config(state='disabled')
+            self.label.config(text="מבטל...")
+        else:
+            self.close()
+
+    def close(self):
+        if self.top.winfo_exists():
+            self.top.grab_release()
+            self.top.destroy()
+
+
+class SensitivityWindow:
+    """Heatmap of one property's payment, total interest or rent ratio over a
+    rate x term grid. Switching the metric or the grid only swaps the image
+    data, so even a large grid redraws interactively."""
+
+    def __init__(self, parent, title, loan_amount, rent=None, scenarios=()):
+        self.loan_amount = loan_amount
+        self.rent = rent
+        self.top = tk.Toplevel(parent)
+        self.top.title(title)
+        self.top.geometry("800x650")
+
+        controls = ttk.Frame(self.top, padding="10 10 10 0")
+        controls.pack(fill="x")
+        self.range_entries = {}
+        defaults = [("rate_from", "ריבית מ-(%)", SENSITIVITY_RATES[0]), ("rate_to", "עד", SENSITIVITY_RATES[-1]),
+                    ("rate_step", "צעד", 0.05), ("years_from", "שנים מ-", SENSITIVITY_YEARS[0]),
+                    ("years_to", "עד", SENSITIVITY_YEARS[-1])]
+        for column, (key, label, value) in enumerate(reversed(defaults)):
+            ttk.Label(controls, text=label).grid(row=0, column=2 * column + 1, padx=(2, 8))
+            entry = ttk.Entry(controls, width=6, justify='right')
+            entry.insert(0, f"{value:g}")
+            entry.grid(row=0, column=2 * column)
+            self.range_entries[key] = entry
+        ttk.Button(controls, text="חשב", command=self.recompute).grid(row=0, column=10, padx=5)
+
+        self.metric_var = tk.StringVar(value=SENSITIVITY_METRICS[0][1])
+        labels = [label for key, label in SENSITIVITY_METRICS if key != "rent_ratio" or rent is not None]
+        metric_box = ttk.Combobox(controls, textvariable=self.metric_var, values=labels, state="readonly", width=18)
+        metric_box.grid(row=1, column=0, columnspan=4, pady=5, sticky="w")
+        metric_box.bind("<<ComboboxSelected>>", lambda event: self.redraw())
+        ttk.Button(controls, text="ייצוא ל-Excel", command=self.export).grid(row=1, column=8, columnspan=3, pady=5)
+        self.hover_label = ttk.Label(self.top, text="", anchor="e")
+        self.hover_label.pack(fill="x", padx=10)
+
+        Figure, FigureCanvasTkAgg = tk_chart_classes()
+        self.figure = Figure(figsize=(7, 5), dpi=100)
+        self.ax = self.figure.add_subplot(111)
+        self.image = self.ax.imshow(np.zeros((1, 1)), aspect="auto", origin="lower", cmap="viridis")
+        self.colorbar = self.figure.colorbar(self.image, ax=self.ax)
+        self.ax.set_xlabel("שנים להחזר", fontsize=8)
+        self.ax.set_ylabel("ריבית שנתית (%)", fontsize=8)
+        scenario_years = [years for rate, years in scenarios]
+        scenario_rates = [rate for rate, years in scenarios]
+        # The tab's own scenarios, for orientation.
+        self.ax.plot(scenario_years, scenario_rates, "wo", markeredgecolor="black")
+        self.canvas = FigureCanvasTkAgg(self.figure, self.top)
+        self.canvas.get_tk_widget().pack(fill="both", expand=True)
+        self.canvas.mpl_connect("motion_notify_event", self._on_hover)
+
+        self.grid = None
+        self.recompute()
+
+    def recompute(self):
+        try:
+            rates, years = sensitivity_axes(*(self.range_entries[key].get() for key in
+                                              ("rate_from", "rate_to", "rate_step", "years_from", "years_to")))
+        except CalculationError as e:
+            show_error_with_copy(e.title, e.message, parent=self.top)
+            return
+        self.grid = sensitivity_grid(self.loan_amount, rates, years, self.rent)
+        rate_half = (rates[1] - rates[0]) / 2 if rates.size > 1 else 0.5
+        self.image.set_extent((years[0] - 0.5, years[-1] + 0.5, rates[0] - rate_half, rates[-1] + rate_half))
+        self.ax.set_xlim(years[0] - 0.5, years[-1] + 0.5)
+        self.ax.set_ylim(rates[0] - rate_half, rates[-1] + rate_half)
+        self.redraw()
+
+    def _metric_key(self):
+        return next(key for key, label in SENSITIVITY_METRICS if label == self.metric_var.get())
+
+    def redraw(self):
+        values = self.grid[self._metric_key()]
+        self.image.set_data(values)
+        finite = values[np.isfinite(values)]
+        if finite.size:
+            self.image.set_clim(finite.min(), max(finite.max(), finite.min() + 1e-9))
+        self.ax.set_title(self.metric_var.get(), fontsize=9)
+        self.canvas.draw_idle()
+
+    def _on_hover(self, event):
+        if event.inaxes is not self.ax or self.grid is None:
+            self.hover_label.config(text="")
+            return
+        rates, years = self.grid["rates"], self.grid["years"]
+        row = int(np.abs(rates - event.ydata).argmin())
+        column = int(np.abs(years - event.xdata).argmin())
+        value = self.grid[self._metric_key()][row, column]
+        self.hover_label.config(text=f"ריבית {rates[row]:.2f}% | {int(years[column])} שנים | {self.metric_var.get()}: {value:,.2f}")
+
+    def export(self):
+        filepath = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx")],
+                                                title="שמור טבלת רגישות", parent=self.top)
+        if not filepath:
+            return
+        try:
+            write_sensitivity_workbook(filepath, self.grid)
+        except Exception as e:
+            show_error_with_copy("שגיאה בשמירה", f"אירעה שגיאה בעת שמירת הטבלה: {e}", parent=self.top)
+
+
+class RateSimulationWindow:
+    """Monte Carlo of one of a property's scenarios under a variable rate:
+    percentile bands of the monthly payment and the rate, and the spread of
+    total interest against the fixed-rate schedule."""
+
+    def __init__(self, parent, title, loan_amount, scenarios, job_runner):
+        self.loan_amount = loan_amount
+        self.scenarios = scenarios
+        self.job_runner = job_runner
+        self.top = tk.Toplevel(parent)
+        self.top.title(title)
+        self.top.geometry("850x750")
+
+        controls = ttk.Frame(self.top, padding="10 10 10 0")
+        controls.pack(fill="x")
+        self.scenario_var = tk.StringVar()
+        scenario_labels = [f"תרחיש {i+1}: {rate:.2f}% / {years} שנים" for i, rate, years in scenarios]
+        self.scenario_box = ttk.Combobox(controls, textvariable=self.scenario_var, values=scenario_labels, state="readonly", width=28)
+        self.scenario_box.grid(row=0, column=0, columnspan=4, sticky="w", pady=2)
+        self.scenario_box.bind("<<ComboboxSelected>>", self._on_scenario_selected)
+
+        self.entries = {}
+        fields = [("long_term_rate", "ריבית ארוכת טווח (%)"), ("reversion_speed", "מהירות חזרה לממוצע (לשנה)"),
+                  ("volatility", "תנודתיות (נק' אחוז)"), ("floor", "ריבית מינימלית (%)"),
+                  ("paths", "מספר מסלולים"), ("seed", "זרע אקראי")]
+        defaults = {"reversion_speed": "0.2", "volatility": "1.0", "floor": "0", "paths": "10000", "seed": "1"}
+        for n, (key, label) in enumerate(fields):
+            row, column = 1 + n // 2, 2 * (n % 2)
+            ttk.Label(controls, text=label).grid(row=row, column=column + 1, sticky="e", padx=(2, 10))
+            entry = ttk.Entry(controls, width=10, justify='right')
+            entry.insert(0, defaults.get(key, ""))
+            entry.grid(row=row, column=column, pady=2)
+            self.entries[key] = entry
+        ttk.Button(controls, text="הרץ סימולציה", command=self.run).grid(row=4, column=0, columnspan=4, pady=5)
+        self.summary_label = ttk.Label(self.top, text="", anchor="e", justify="right")
+        self.summary_label.pack(fill="x", padx=10)
+
+        Figure, FigureCanvasTkAgg = tk_chart_classes()
+        self.figure = Figure(figsize=(7.5, 5.5), dpi=100)
+        self.payment_ax = self.figure.add_subplot(211)
+        self.rate_ax = self.figure.add_subplot(212, sharex=self.payment_ax)
+        self.canvas = FigureCanvasTkAgg(self.figure, self.top)
+        self.canvas.get_tk_widget().pack(fill="both", expand=True)
+
+        self.scenario_box.current(0)
+        self._on_scenario_selected()
+
+    def _scenario(self):
+        return self.scenarios[max(self.scenario_box.current(), 0)]
+
+    def _on_scenario_selected(self, event=None):
+        _, rate, _ = self._scenario()
+        entry = self.entries["long_term_rate"]
+        entry.delete(0, tk.END)
+        entry.insert(0, f"{rate:g}")
+
+    def run(self):
+        _, rate, years = self._scenario()
+        try:
+            model = RatePathModel(
+                initial_rate=rate,
+                long_term_rate=float(self.entries["long_term_rate"].get()),
+                reversion_speed=float(self.entries["reversion_speed"].get()),
+                volatility=float(self.entries["volatility"].get()),
+                floor=float(self.entries["floor"].get()),
+            )
+            paths = int(self.entries["paths"].get())
+            seed_text = self.entries["seed"].get().strip()
+            seed = int(seed_text) if seed_text else None
+        except ValueError:
+            show_error_with_copy("שגיאת קלט", "כל פרמטרי הסימולציה חייבים להיות מספרים (מסלולים וזרע - מספרים שלמים).", parent=self.top)
+            return
+        if model.reversion_speed < 0 or model.volatility < 0 or paths <= 0:
+            show_error_with_copy("קלט לא חוקי", "מהירות החזרה והתנודתיות אינן יכולות להיות שליליות, ומספר המסלולים חייב להיות חיובי.", parent=self.top)
+            return
+
+        dialog = ProgressDialog(self.top, "סימולציית ריבית משתנה")
+
+        def on_done(simulation):
+            dialog.close()
+            if self.top.winfo_exists():
+                self.show(simulation)
+
+        def on_error(e):
+            dialog.close()
+            if isinstance(e, CalculationError):
+                show_error_with_copy(e.title, e.message, parent=self.top)
+            else:
+                show_error_with_copy("שגיאה בסימולציה", f"אירעה שגיאה בעת הרצת הסימולציה: {e}", parent=self.top)
+
+        loan_amount = self.loan_amount
+        job = self.job_runner.submit("simulate_rates",
+                                     lambda job: simulate_variable_rate_loan(loan_amount, years, model, paths, seed, job=job),
+                                     on_done=on_done, on_error=on_error,
+                                     on_progress=dialog.update, on_cancel=dialog.close)
+        dialog.attach(job)
+
+    def show(self, simulation):
+        months = simulation["months"]
+        percentiles = simulation["percentiles"]
+        # Shade outer and inner bands around the median (rows are symmetric).
+        for ax, bands, label in ((self.payment_ax, simulation["payment_bands"], "תשלום חודשי (₪)"),
+                                 (self.rate_ax, simulation["rate_bands"], "ריבית שנתית (%)")):
+            ax.clear()
+            middle = len(percentiles) // 2
+            for low in range(middle):
+                ax.fill_between(months, bands[low], bands[-1 - low], color="tab:blue", alpha=0.15 + 0.15 * low,
+                                label=f"{percentiles[low]}-{percentiles[-1 - low]}%", linewidth=0)
+            ax.plot(months, bands[middle], color="tab:blue", label="חציון")
+            ax.set_ylabel(label, fontsize=8)
+            ax.grid(True)
+            ax.tick_params(axis='both', which='major', labelsize=7)
+        self.payment_ax.axhline(simulation["fixed_payment"], color="black", linestyle="--", label="ריבית קבועה")
+        self.payment_ax.legend(fontsize=7)
+        self.rate_ax.set_xlabel("חודש", fontsize=8)
+        self.figure.tight_layout()
+        self.canvas.draw_idle()
+
+        interest = " | ".join(f"{p}%: {value:,.0f}" for p, value in zip(percentiles, simulation["total_interest"]))
+        self.summary_label.config(text=(
+            f"{simulation['paths']:,} מסלולים. סה\"כ ריבית לפי אחוזון: {interest} ₪\n"
+            f"ממוצע: {simulation['mean_total_interest']:,.0f} ₪ | בריבית קבועה: {simulation['fixed_total_interest']:,.0f} ₪"))
+
+
+class PrepaymentWindow:
+    """Prepayment and refinance what-ifs for one of a property's scenarios:
+    a single "prepay X after month k" query and a search over every month
+    and amount (and refinance rate) for the best net saving."""
+
+    def __init__(self, parent, title, loan_amount, scenarios):
+        self.loan_amount = loan_amount
+        self.scenarios = scenarios
+        self.top = tk.Toplevel(parent)
+        self.top.title(title)
+        self.top.geometry("850x750")
+
+        controls = ttk.Frame(self.top, padding="10 10 10 0")
+        controls.pack(fill="x")
+        self.scenario_box = ttk.Combobox(controls, values=[f"תרחיש {i+1}: {rate:.2f}% / {years} שנים" for i, rate, years in scenarios],
+                                         state="readonly", width=28)
+        self.scenario_box.grid(row=0, column=0, columnspan=4, sticky="w", pady=2)
+        self.scenario_box.current(0)
+
+        self.entries = {}
+        fields = [("month", "חודש פירעון", "84"), ("amount", "סכום פירעון (₪)", "100000"),
+                  ("max_amount", "סכום מקסימלי לחיפוש (₪)", "500000"), ("amount_step", "צעד סכום (₪)", "10000"),
+                  ("fee_percent", "עמלת פירעון מוקדם (%)", "0"), ("fee_fixed", "עמלה קבועה (₪)", "0"),
+                  ("refinance_from", "ריבית מחזור מ-(%)", "2"), ("refinance_to", "ריבית מחזור עד (%)", "5")]
+        for n, (key, label, default) in enumerate(fields):
+            row, column = 1 + n // 2, 2 * (n % 2)
+            ttk.Label(controls, text=label).grid(row=row, column=column + 1, sticky="e", padx=(2, 10))
+            entry = ttk.Entry(controls, width=10, justify='right')
+            entry.insert(0, default)
+            entry.grid(row=row, column=column, pady=2)
+            self.entries[key] = entry
+        self.keep_payment_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(controls, text="שמור על התשלום החודשי (קיצור תקופה)", variable=self.keep_payment_var).grid(row=5, column=0, columnspan=4, sticky="w")
+        ttk.Button(controls, text="חשב פירעון", command=self.query).grid(row=6, column=2, columnspan=2, pady=5)
+        ttk.Button(controls, text="חפש אפשרות מיטבית", command=self.search).grid(row=6, column=0, columnspan=2, pady=5)
+        self.summary_label = ttk.Label(self.top, text="", anchor="e", justify="right")
+        self.summary_label.pack(fill="x", padx=10)
+
+        Figure, FigureCanvasTkAgg = tk_chart_classes()
+        self.figure = Figure(figsize=(7.5, 4.5), dpi=100)
+        self.ax = self.figure.add_subplot(111)
+        self.canvas = FigureCanvasTkAgg(self.figure, self.top)
+        self.canvas.get_tk_widget().pack(fill="both", expand=True)
+
+    def _values(self, *keys):
+        return [float(self.entries[key].get()) for key in keys]
+
+    def _table(self):
+        _, rate, years = self.scenarios[max(self.scenario_box.current(), 0)]
+        return prepayment_table(self.loan_amount, rate, years)
+
+    def query(self):
+        try:
+            month, amount, fee_percent, fee_fixed = self._values("month", "amount", "fee_percent", "fee_fixed")
+            table = self._table()
+        except ValueError:
+            show_error_with_copy("שגיאת קלט", "כל השדות חייבים להיות מספרים.", parent=self.top)
+            return
+        except CalculationError as e:
+            show_error_with_copy(e.title, e.message, parent=self.top)
+            return
+        if not 0 < month < table["months"] or amount <= 0:
+            show_error_with_copy("קלט לא חוקי", f"חודש הפירעון חייב להיות בין 1 ל-{table['months'] - 1} והסכום חיובי.", parent=self.top)
+            return
+        saving = prepayment_savings(table, int(month), amount, self.keep_payment_var.get(), fee_percent, fee_fixed)
+        self.summary_label.config(text=(
+            f"פירעון של {float(saving['amount']):,.0f} ₪ אחרי חודש {int(month)}: חיסכון בריבית {float(saving['interest_saved']):,.0f} ₪, "
+            f"עמלה {float(saving['fee']):,.0f} ₪, חיסכון נטו {float(saving['net_saving']):,.0f} ₪"))
+
+    def search(self):
+        try:
+            max_amount, step, fee_percent, fee_fixed, refinance_from, refinance_to = self._values(
+                "max_amount", "amount_step", "fee_percent", "fee_fixed", "refinance_from", "refinance_to")
+            if step <= 0 or max_amount < step or refinance_to < refinance_from or refinance_from < 0:
+                raise CalculationError("קלט לא חוקי", "נדרשים צעד סכום חיובי, סכום מקסימלי שאינו קטן מהצעד וטווח ריבית מחזור תקין.")
+            _, rate, years = self.scenarios[max(self.scenario_box.current(), 0)]
+            result = optimize_prepayment(self.loan_amount, rate, years, np.arange(step, max_amount + step / 2, step),
+                                         self.keep_payment_var.get(), fee_percent, fee_fixed,
+                                         np.arange(refinance_from, refinance_to + 0.125, 0.25))
+        except ValueError:
+            show_error_with_copy("שגיאת קלט", "כל השדות חייבים להיות מספרים.", parent=self.top)
+            return
+        except CalculationError as e:
+            show_error_with_copy(e.title, e.message, parent=self.top)
+            return
+
+        lines = [f"סה\"כ ריבית ללא שינוי: {result['total_interest']:,.0f} ₪"]
+        best = result["prepayment"]["best"]
+        lines.append(f"פירעון מיטבי: {best['amount']:,.0f} ₪ אחרי חודש {best['month']} - חיסכון נטו {best['net_saving']:,.0f} ₪ (עמלה {best['fee']:,.0f} ₪)"
+                     if best else "אין פירעון מוקדם שחוסך לאחר עמלות.")
+        best = result["refinance"]["best"]
+        lines.append(f"מחזור מיטבי: ריבית {best['rate']:.2f}% אחרי חודש {best['month']} - חיסכון נטו {best['net_saving']:,.0f} ₪ (עמלה {best['fee']:,.0f} ₪)"
+                     if best else "אין מחזור שחוסך לאחר עמלות.")
+        self.summary_label.config(text="\n".join(lines))
+
+        months = np.arange(1, result["table"]["months"])
+        self.ax.clear()
+        self.ax.plot(months, result["prepayment"]["net_saving"].max(axis=1), label="פירעון מוקדם (סכום מיטבי)")
+        if result["refinance"]["net_saving"].size:
+            self.ax.plot(months, result["refinance"]["net_saving"].max(axis=1), label="מחזור (ריבית מיטבית)")
+        self.ax.axhline(0, color="black", linewidth=0.8)
+        self.ax.set_xlabel("חודש", fontsize=8)
+        self.ax.set_ylabel("חיסכון נטו (₪)", fontsize=8)
+        self.ax.tick_params(axis='both', which='major', labelsize=7)
+        self.ax.grid(True)
+        self.ax.legend(fontsize=7)
+        self.figure.tight_layout()
+        self.canvas.draw_idle()
+
+class MortgageMixDialog:
+    """Editor for the tracks of one scenario's mix. Totals are refreshed as
+    the tracks are typed; on_save gets the track dicts ([] clears the mix)."""
+
+    def __init__(self, parent, title, tracks, on_save, loan_amount=None, inflation=0.0):
+        self.on_save = on_save
+        self.loan_amount = loan_amount
+        self.inflation = inflation
+        self.top = tk.Toplevel(parent)
+        self.top.title(title)
+        self.top.transient(parent)
+
+        self.rows_frame = ttk.Frame(self.top, padding="10 10 10 0")
+        self.rows_frame.pack(fill="both", expand=True)
+        for column, text in enumerate(["סוג מסלול", "חלק (%)", "ריבית (%)", "שנים", ""]):
+            ttk.Label(self.rows_frame, text=text).grid(row=0, column=column, padx=2)
+        self.rows = []
+        for track in tracks or [{"kind": MORTGAGE_TRACK_KINDS[0], "share": "100"}]:
+            self.add_row(track)
+
+        self.totals_label = ttk.Label(self.top, text="", anchor="e", justify="right")
+        self.totals_label.pack(fill="x", padx=10, pady=5)
+        buttons = ttk.Frame(self.top, padding="10 0 10 10")
+        buttons.pack(fill="x")
+        ttk.Button(buttons, text="הוסף מסלול", command=self.add_row).pack(side="right", padx=2)
+        ttk.Button(buttons, text="שמור", command=self.save).pack(side="left", padx=2)
+        ttk.Button(buttons, text="בטל תמהיל", command=self.clear).pack(side="left", padx=2)
+        self.update_totals()
+
+    def add_row(self, track=None):
+        track = track or {}
+        kind_var = tk.StringVar(value=track.get("kind", MORTGAGE_TRACK_KINDS[0]))
+        widgets = [ttk.Combobox(self.rows_frame, textvariable=kind_var, values=MORTGAGE_TRACK_KINDS, width=16)]
+        entries = []
+        for key in ("share", "rate", "years"):
+            entry = ttk.Entry(self.rows_frame, width=8, justify='right')
+            entry.insert(0, "" if track.get(key) is None else str(track.get(key)))
+            entry.bind("<KeyRelease>", lambda event: self.update_totals())
+            widgets.append(entry)
+            entries.append(entry)
+        row = (kind_var, entries, widgets)
+        widgets.append(ttk.Button(self.rows_frame, text="הסר", width=5, command=lambda: self.remove_row(row)))
+        self.rows.append(row)
+        self._grid_rows()
+        if hasattr(self, "totals_label"):
+            self.update_totals()
+
+    def remove_row(self, row):
+        for widget in row[2]:
+            widget.destroy()
+        self.rows.remove(row)
+        self._grid_rows()
+        self.update_totals()
+
+    def _grid_rows(self):
+        for n, (_, _, widgets) in enumerate(self.rows, 1):
+            for column, widget in enumerate(widgets):
+                widget.grid(row=n, column=column, padx=2, pady=2)
+
+    def tracks(self):
+        return [{"kind": kind_var.get(), "share": share.get().strip(), "rate": rate.get().strip(), "years": years.get().strip()}
+                for kind_var, (share, rate, years), _ in self.rows]
+
+    def update_totals(self):
+        raw = self.tracks()
+        shares = 0.0
+        for track in raw:
+            try:
+                shares += float(track["share"])
+            except ValueError:
+                pass
+        text = f"סה\"כ חלקים: {shares:g}%"
+        try:
+            tracks = parse_tracks(raw, 0) if raw else []
+        except CalculationError:
+            tracks = []
+        if tracks:
+            text += f" | ריבית משוקללת: {sum(t.share * t.rate for t in tracks) / 100:.2f}%"
+            if self.loan_amount:
+                totals = compare_mixes(self.loan_amount, [tracks], self.inflation)
+                text += (f"\nתשלום חודשי ראשון: {totals['first_payment'][0]:,.0f} ₪ | "
+                         f"סה\"כ ריבית: {totals['total_interest'][0]:,.0f} ₪ | {totals['months'][0]} חודשים")
+                if totals["total_indexation"][0]:
+                    text += f" | הצמדה: {totals['total_indexation'][0]:,.0f} ₪"
+        self.totals_label.config(text=text)
+
+    def save(self):
+        raw = self.tracks()
+        try:
+            parse_tracks(raw, 0)
+        except CalculationError as e:
+            show_error_with_copy(e.title, e.message, parent=self.top)
+            return
+        self.on_save(raw)
+        self.top.destroy()
+
+    def clear(self):
+        self.on_save([])
+        self.top.destroy()
+
+
+class DeveloperPanel:
+    """Live view of the SPANS stage timings, with switches to turn them on,
+    reset them and dump them as JSON or as a Chrome trace."""
+    REFRESH_MS = 1000
+    COLUMNS = [("stage", "שלב", 260), ("count", "קריאות", 70), ("total_ms", "סה\"כ (ms)", 90),
+               ("mean_ms", "ממוצע (ms)", 90), ("p50_ms", "p50 (ms)", 80), ("p90_ms", "p90 (ms)", 80),
+               ("p99_ms", "p99 (ms)", 80), ("max_ms", "מקסימום (ms)", 90)]
+
+    def __init__(self, parent):
+        self.top = tk.Toplevel(parent)
+        self.top.title("לוח מפתחים - זמני שלבים")
+        self.top.geometry("950x550")
+
+        controls = ttk.Frame(self.top, padding="10 10 10 0")
+        controls.pack(fill="x")
+        self.enabled_var = tk.BooleanVar(value=SPANS.enabled)
+        ttk.Checkbutton(controls, text="מדידת זמנים פעילה", variable=self.enabled_var,
+                        command=self._toggle).pack(side="right", padx=5)
+        ttk.Button(controls, text="אפס", command=self._reset).pack(side="right", padx=5)
+        ttk.Button(controls, text="שמור JSON...", command=lambda: self._dump("json")).pack(side="left", padx=5)
+        ttk.Button(controls, text="שמור Chrome trace...", command=lambda: self._dump("trace")).pack(side="left", padx=5)
+
+        self.table = ttk.Treeview(self.top, columns=[key for key, _, _ in self.COLUMNS], show="headings", height=14)
+        for key, title, width in self.COLUMNS:
+            self.table.heading(key, text=title)
+            self.table.column(key, width=width, anchor="w" if key == "stage" else "center")
+        self.table.pack(fill="both", expand=True, padx=10, pady=10)
+        self.table.bind("<<TreeviewSelect>>", lambda event: self._show_histogram())
+        self.histogram_label = ttk.Label(self.top, text="", anchor="w", justify="left", font=("Courier", 9))
+        self.histogram_label.pack(fill="x", padx=10, pady=(0, 10))
+
+        self._stats = {}
+        self._refresh()
+
+    def _toggle(self):
+        SPANS.enabled = self.enabled_var.get()
+
+    def _reset(self):
+        SPANS.reset()
+        self._refresh(reschedule=False)
+
+    def _refresh(self, reschedule=True):
+        if not self.top.winfo_exists():
+            return
+        self._stats = SPANS.stats()
+        selected = self.table.selection()
+        self.table.delete(*self.table.get_children())
+        for name, stats in self._stats.items():
+            self.table.insert("", "end", iid=name, values=[name] + [
+                stats[key] if key == "count" else f"{stats[key]:,.2f}" for key, _, _ in self.COLUMNS[1:]])
+        if selected and selected[0] in self._stats:
+            self.table.selection_set(selected[0])
+        self._show_histogram()
+        if reschedule:
+            self.top.after(self.REFRESH_MS, self._refresh)
+
+    def _show_histogram(self):
+        selected = self.table.selection()
+        if not selected or selected[0] not in self._stats:
+            self.histogram_label.config(text="בחר/י שלב להצגת התפלגות הזמנים.")
+            return
+        histogram = [(bound, n) for bound, n in self._stats[selected[0]]["histogram"] if n]
+        widest = max(n for _, n in histogram)
+        lines = []
+        for bound, n in histogram:
+            label = f"<= {bound:g} ms" if bound is not None else f"> {SPAN_BUCKETS_MS[-1]:g} ms"
+            lines.append(f"{label:>12} {'#' * max(1, round(40 * n / widest)):<40} {n}")
+        self.histogram_label.config(text="\n".join(lines))
+
+    def _dump(self, kind):
+        trace = kind == "trace"
+        filepath = filedialog.asksaveasfilename(parent=self.top, defaultextension=".json",
+                                                filetypes=[("JSON files", "*.json")],
+                                                title="שמור Chrome trace" if trace else "שמור זמני שלבים")
+        if not filepath:
+            return
+        try:
+            if trace:
+                SPANS.dump_chrome_trace(filepath)
+            else:
+                SPANS.dump_json(filepath)
+        except OSError as e:
+            show_error_with_copy("שגיאה בשמירה", f"לא ניתן לשמור את הקובץ: {e}", parent=self.top)
+
+
 class PropertyTab:
-    def __init__(self, parent, idx, root_window):
+    def __init__(self, parent, idx, root_window, job_runner):
         self.root = root_window
+        # The app's runner: one pool and one polling loop for every tab.
+        self.job_runner = job_runner
         self.idx = idx
         self.frame = ttk.Frame(parent)
         self.frame.pack(expand=True, fill="both")
 
+        # Widgets and figures are only built when the tab is first shown
+        # (see build); until then the inputs live in a PropertyInputs.
+        self.built = False
+        self.charts_built = False
+        self._pending_inputs = PropertyInputs()
+
+        self.figure_list = []
+        self.ax_list = []
+        self.canvas_list = []
+        self.line_list = []
+        self.chart_limits = []
+        self.temp_image_paths = [] 
+
+        self.df_list = [None, None, None] 
+
+        self.calculated_results = {}
+        self.loan_scenarios_data = [] 
+        self.loan_scenarios_rent_comparison = []
+        # Inputs and result of the last successful calculation, and the
+        # result currently rendered in the widgets (see ensure_results).
+        self._last_inputs = None
+        self._last_result = None
+        self._shown_result = None
+        # Project row this tab was last saved to, and the inputs saved there.
+        self.project = None
+        self.project_id = None
+        self._saved_inputs = None
+        self.scenario_tracks = [[], [], []]
+
+    def build(self):
+        """Create the tab's widgets and charts the first time it is shown."""
+        if self.built:
+            return
+        self.built = True
+
         self.canvas = tk.Canvas(self.frame, borderwidth=0, background="#f0f0f0")
         self.canvas.pack(side="left", fill="both", expand=True)
 
@@ -233,6 +3516,11 @@ class PropertyTab:
         self.rent_entry.grid(row=r, column=1, sticky="w", pady=pady)
         r += 1
 
+        ttk.Label(self.input_frame, text="אינפלציה שנתית צפויה (%) (מסלולים צמודים):").grid(row=r, column=0, sticky="e", padx=padx, pady=pady)
+        self.inflation_entry = new_entry()
+        self.inflation_entry.grid(row=r, column=1, sticky="w", pady=pady)
+        r += 1
+
         self.skip_tax_var = tk.BooleanVar()
         self.tax_checkbox = ttk.Checkbutton(self.input_frame, text="בטל מס רכישה", variable=self.skip_tax_var)
         self.tax_checkbox.grid(row=r, column=0, sticky="w", padx=padx, pady=pady)
@@ -245,6 +3533,11 @@ class PropertyTab:
         self.include_tax_in_mortgage_checkbox.grid(row=r, column=0, sticky="w", padx=padx, pady=pady)
         r += 1
 
+        self.exact_agorot_var = tk.BooleanVar()
+        ttk.Checkbutton(self.input_frame, text="חישוב מדויק באגורות (כמו לוח הבנק)",
+                        variable=self.exact_agorot_var).grid(row=r, column=0, sticky="w", padx=padx, pady=pady)
+        r += 1
+
         self.manual_lawyer_fee_var = tk.BooleanVar()
         self.manual_lawyer_fee_checkbox = ttk.Checkbutton(self.input_frame, text="הזן עלות עו\"ד ידנית", variable=self.manual_lawyer_fee_var, command=self._toggle_lawyer_fee_entry)
         self.manual_lawyer_fee_checkbox.grid(row=r, column=0, sticky="w", padx=padx, pady=pady)
@@ -277,11 +3570,16 @@ class PropertyTab:
 
         self.rate_entries = []
         self.years_entries = []
+        self.mix_labels = []
         for i in range(3):
             ttk.Label(self.input_frame, text=f"ריבית שנתית (תרחיש {i+1}) %:").grid(row=r, column=0, sticky="e", padx=padx, pady=pady)
             rate_entry = new_entry()
             rate_entry.grid(row=r, column=1, sticky="w", pady=pady)
             self.rate_entries.append(rate_entry)
+            ttk.Button(self.input_frame, text="תמהיל...", command=lambda i=i: self.edit_mix(i)).grid(row=r, column=2, sticky="w", padx=padx, pady=pady)
+            mix_label = ttk.Label(self.input_frame, text="")
+            mix_label.grid(row=r + 1, column=2, sticky="w", padx=padx, pady=pady)
+            self.mix_labels.append(mix_label)
             r += 1
 
             ttk.Label(self.input_frame, text=f"שנים להחזר (תרחיש {i+1}):").grid(row=r, column=0, sticky="e", padx=padx, pady=pady)
@@ -347,31 +3645,123 @@ class PropertyTab:
 
         self.results_frame.grid_rowconfigure(r_res, weight=1)
         self.results_frame.grid_columnconfigure(1, weight=1) 
+        self._chart_row = r_res
 
-        self.figure_list = []
-        self.ax_list = []
-        self.canvas_list = []
-        self.temp_image_paths = [] 
+        self.content_frame.bind('<Configure>', self._on_frame_configure)
 
+        self.export_pdf_button = ttk.Button(self.content_frame, text="ייצוא ל-PDF", command=self.export_to_pdf)
+        self.export_pdf_button.pack(pady=10)
+        self.vector_charts_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.content_frame, text="גרפים וקטוריים ב-PDF", variable=self.vector_charts_var).pack()
+        ttk.Button(self.content_frame, text="ניתוח רגישות ריבית/שנים", command=self.open_sensitivity).pack(pady=10)
+        ttk.Button(self.content_frame, text="סימולציית ריבית משתנה", command=self.open_rate_simulation).pack(pady=(0, 10))
+        ttk.Button(self.content_frame, text="פירעון מוקדם ומחזור", command=self.open_prepayment).pack(pady=(0, 10))
+
+        self.set_inputs(self._pending_inputs)
+        self._pending_inputs = None
+
+    def build_charts(self):
+        """Create the three scenario figures (again, after release_charts).
+
+        Deferred until there is a schedule to plot, which is also when
+        matplotlib gets imported.
+        """
+        if self.charts_built or not self.built:
+            return
+        Figure, FigureCanvasTkAgg = tk_chart_classes()
+        self.charts_built = True
         for i in range(3):
-            fig = plt.Figure(figsize=(5, 2.5), dpi=100) 
+            fig = Figure(figsize=(5, 2.5), dpi=100) 
             ax = fig.add_subplot(111)
             canvas = FigureCanvasTkAgg(fig, self.results_frame) 
-            canvas.get_tk_widget().grid(row=r_res+i, column=0, columnspan=2, pady=3, sticky='nsew')
+            canvas.get_tk_widget().grid(row=self._chart_row+i, column=0, columnspan=2, pady=3, sticky='nsew')
             self.figure_list.append(fig)
             self.ax_list.append(ax)
             self.canvas_list.append(canvas)
-
-        self.df_list = [None, None, None] 
-
-        self.calculated_results = {}
-        self.loan_scenarios_data = [] 
-        self.loan_scenarios_rent_comparison = []
-
-        self.content_frame.bind('<Configure>', self._on_frame_configure)
-
-        self.export_pdf_button = ttk.Button(self.content_frame, text="ייצוא ל-PDF", command=self.export_to_pdf)
-        self.export_pdf_button.pack(pady=10)
+            self.line_list.append(self._init_chart(i))
+            self.chart_limits.append(None)
+        for i, schedule in enumerate(self.df_list):
+            self._update_chart(i, schedule)
+
+    def release_charts(self):
+        """Free the figures of a tab that has not been viewed for a while."""
+        if not self.charts_built:
+            return
+        for canvas in self.canvas_list:
+            canvas.get_tk_widget().destroy()
+        for fig in self.figure_list:
+            fig.clear()
+        self.figure_list = []
+        self.ax_list = []
+        self.canvas_list = []
+        self.line_list = []
+        self.chart_limits = []
+        self.charts_built = False
+
+    def show(self):
+        """Make sure the tab is built and displays its latest result."""
+        self.build()
+        self._restore_saved_result()
+        if any(schedule is not None for schedule in self.df_list):
+            self.build_charts()
+        if self._last_result is not None and self._shown_result is not self._last_result:
+            self.show_results(self._last_result)
+
+    def _init_chart(self, i):
+        # Titles, labels and legend are fixed per scenario, so they are set up
+        # once here; recalculating only swaps the line data.
+        ax = self.ax_list[i]
+        principal_line, = ax.plot([], [], label="קרן", color="green")
+        interest_line, = ax.plot([], [], label="ריבית", color="red")
+        ax.set_title(f"תרחיש {i+1} - פירוט תשלומים חודשיים", fontsize=9)
+        ax.set_xlabel("חודש", fontsize=8)
+        ax.set_ylabel("₪", fontsize=8)
+        ax.legend(fontsize=7).set_visible(False)
+        ax.grid(True)
+        ax.tick_params(axis='both', which='major', labelsize=7) 
+        self.figure_list[i].tight_layout() 
+        return principal_line, interest_line
+
+    def _update_chart(self, i, schedule):
+        if not self.charts_built:
+            return
+        ax = self.ax_list[i]
+        principal_line, interest_line = self.line_list[i]
+        has_data = schedule is not None and not schedule.empty
+        if has_data:
+            months = schedule.months
+            principal = schedule.principal
+            interest = schedule.interest
+            principal_line.set_data(months, principal)
+            interest_line.set_data(months, interest)
+            limits = (int(months[-1]), float(max(principal.max(), interest.max())))
+        else:
+            principal_line.set_data([], [])
+            interest_line.set_data([], [])
+            limits = None
+        principal_line.set_visible(has_data)
+        interest_line.set_visible(has_data)
+        ax.get_legend().set_visible(has_data)
+
+        if limits is not None and self._needs_rescale(self.chart_limits[i], limits):
+            last_month, top = limits
+            y_top = top * 1.05 if top > 0 else 1
+            ax.set_xlim(1, max(last_month, 2))
+            ax.set_ylim(0, y_top)
+            # Tick labels only change width when the limits do.
+            self.figure_list[i].tight_layout()
+            self.chart_limits[i] = (last_month, y_top)
+        self.canvas_list[i].draw_idle()
+
+    @staticmethod
+    def _needs_rescale(current, limits):
+        # Keep the axes while the new data still fits and fills at least half
+        # of the height, so small rate edits do not re-layout the figure.
+        if current is None:
+            return True
+        last_month, top = limits
+        current_month, current_top = current
+        return last_month != current_month or top > current_top or top < current_top / 2
 
     def _on_frame_configure(self, event=None):
         """Update the scrollregion of the canvas based on the content frame size."""
@@ -419,6 +3809,10 @@ class PropertyTab:
             self.price_entry.config(state='normal')
 
     def clear_results(self):
+        self._set_result_data(None)
+        self._shown_result = None
+        if not self.built:
+            return
         self.affordable_price_label.config(text="")
         self.tax_label.config(text="")
         self.downpayment_label.config(text="")
@@ -430,374 +3824,345 @@ class PropertyTab:
         for lbl in self.rent_comparison_labels:
             lbl.config(text="")
         self.table.delete(*self.table.get_children())
-        for ax in self.ax_list:
-            ax.clear()
-        for canvas in self.canvas_list:
-            canvas.draw()
-        self.df_list = [None, None, None] 
-        self.calculated_results = {}
-        self.loan_scenarios_data = [] 
-        self.loan_scenarios_rent_comparison = []
-
-
-    def calculate(self):
-        self.clear_results() 
+        for i in range(3):
+            self._update_chart(i, None)
+
+    def get_inputs(self):
+        if not self.built:
+            return _copy_inputs(self._pending_inputs)
+        return PropertyInputs(
+            alias=self.alias_entry.get(),
+            link=self.link_entry.get(),
+            price=self.price_entry.get(),
+            area=self.area_entry.get(),
+            ltv=self.ltv_entry.get(),
+            rent=self.rent_entry.get(),
+            inflation=self.inflation_entry.get(),
+            skip_tax=self.skip_tax_var.get(),
+            include_tax_in_mortgage=self.include_tax_in_mortgage_var.get(),
+            exact_agorot=self.exact_agorot_var.get(),
+            skip_broker=self.skip_broker_var.get(),
+            manual_lawyer_fee=self.manual_lawyer_fee_var.get(),
+            lawyer_fee_manual_value=self.lawyer_fee_manual_entry.get(),
+            manual_broker_fee=self.manual_broker_fee_var.get(),
+            broker_fee_manual_value=self.broker_fee_manual_entry.get(),
+            calculate_affordability=self.calculate_affordability_var.get(),
+            available_funds=self.available_funds_entry.get(),
+            rates=[entry.get() for entry in self.rate_entries],
+            years=[entry.get() for entry in self.years_entries],
+            tracks=[list(tracks) for tracks in self.scenario_tracks],
+        )
+
+    def _is_active_tab(self):
+        return (self.idx == self.frame.master.index(self.frame)) if hasattr(self.frame.master, 'index') else False
+
+    def _set_result_data(self, result):
+        if result is None:
+            self.df_list = [None, None, None]
+            self.calculated_results = {}
+            self.loan_scenarios_data = []
+            self.loan_scenarios_rent_comparison = []
+        else:
+            self.calculated_results = result.calculated_results
+            self.loan_scenarios_data = result.loan_scenarios_data
+            self.loan_scenarios_rent_comparison = result.loan_scenarios_rent_comparison
+            self.df_list = list(result.df_list)
+
+    def is_dirty(self):
+        """True if any input changed since the last successful calculation."""
+        return self.pending_inputs() is not None
+
+    def set_inputs(self, inputs):
+        """Fill the input widgets from a PropertyInputs."""
+        if not self.built:
+            self._pending_inputs = _copy_inputs(inputs)
+            return
 
-        is_active_tab = (self.idx == self.frame.master.index(self.frame)) if hasattr(self.frame.master, 'index') else False
+        def put(entry, value):
+            entry.delete(0, tk.END)
+            entry.insert(0, "" if value is None else str(value))
+
+        put(self.alias_entry, inputs.alias)
+        put(self.link_entry, inputs.link)
+        self.price_entry.config(state='normal')
+        put(self.price_entry, inputs.price)
+        put(self.area_entry, inputs.area)
+        put(self.ltv_entry, inputs.ltv)
+        put(self.rent_entry, inputs.rent)
+        put(self.inflation_entry, inputs.inflation)
+        self.skip_tax_var.set(inputs.skip_tax)
+        self.include_tax_in_mortgage_var.set(inputs.include_tax_in_mortgage)
+        self.exact_agorot_var.set(inputs.exact_agorot)
+
+        self.manual_lawyer_fee_var.set(inputs.manual_lawyer_fee)
+        self._toggle_lawyer_fee_entry()
+        if inputs.manual_lawyer_fee:
+            put(self.lawyer_fee_manual_entry, inputs.lawyer_fee_manual_value)
+
+        self.manual_broker_fee_var.set(inputs.manual_broker_fee)
+        self._toggle_broker_fee_entry()
+        if inputs.manual_broker_fee:
+            put(self.broker_fee_manual_entry, inputs.broker_fee_manual_value)
+        self.skip_broker_var.set(inputs.skip_broker)
+
+        self.calculate_affordability_var.set(inputs.calculate_affordability)
+        self._toggle_affordability_calculation()
+        if inputs.calculate_affordability:
+            put(self.available_funds_entry, inputs.available_funds)
 
+        for i in range(3):
+            self.rate_entries[i].config(state='normal')
+            self.years_entries[i].config(state='normal')
+            put(self.rate_entries[i], inputs.rates[i] if i < len(inputs.rates) else "")
+            put(self.years_entries[i], inputs.years[i] if i < len(inputs.years) else "")
+            self._set_mix(i, inputs.tracks[i] if i < len(inputs.tracks) else [])
+
+    def _set_mix(self, i, tracks):
+        # While a scenario has a mix its own rate and term are not used.
+        self.scenario_tracks[i] = [dict(track) for track in tracks]
+        state = 'disabled' if tracks else 'normal'
+        self.rate_entries[i].config(state=state)
+        self.years_entries[i].config(state=state)
+        self.mix_labels[i].config(text=f"תמהיל: {len(tracks)} מסלולים" if tracks else "")
+
+    def edit_mix(self, i):
         try:
-            price = 0.0
-            loan_amount = 0.0
-            down_payment = 0.0
-            purchase_tax = 0.0
-            lawyer_fee = 0.0
-            broker_fee = 0.0
-            total_needed = 0.0
-
-            ltv_str = self.ltv_entry.get()
-            if not ltv_str:
-                if is_active_tab:
-                    show_error_with_copy("קלט חסר", "יש להזין אחוז מימון (LTV).", parent=self.root)
-                return False
-            ltv = float(ltv_str)
-            if not (0 <= ltv <= 100):
-                if is_active_tab:
-                    show_error_with_copy("קלט לא חוקי", "אחוז מימון (LTV) חייב להיות בין 0 ל-100.", parent=self.root)
-                return False
-
-            area_str = self.area_entry.get()
-            area = float(area_str) if area_str else None
-            if area is not None and area <= 0:
-                if is_active_tab:
-                    show_error_with_copy("קלט לא חוקי", "שטח המטר המרובע חייב להיות מספר חיובי.", parent=self.root)
-                return False
-
-            rent_str = self.rent_entry.get()
-            rent = float(rent_str) if rent_str else None
-            if rent is not None and rent < 0:
-                if is_active_tab:
-                    show_error_with_copy("קלט לא חוקי", "שכירות חודשית צפויה אינה יכולה להיות שלילית.", parent=self.root)
-                return False
-
-            if self.calculate_affordability_var.get():
-                available_funds_str = self.available_funds_entry.get()
-                if not available_funds_str:
-                    if is_active_tab:
-                        show_error_with_copy("קלט חסר", "יש להזין את סכום הכסף הפנוי.", parent=self.root)
-                    return False
-                available_funds = float(available_funds_str)
-                if available_funds <= 0:
-                    if is_active_tab:
-                        show_error_with_copy("קלט לא חוקי", "סכום הכסף הפנוי חייב להיות חיובי.", parent=self.root)
-                    return False
-
-                estimated_price = available_funds / ((1 - ltv / 100) + LAWYER_FEE_RATE + BROKER_FEE_RATE)
-                
-                tolerance = 1.0
-                max_iterations = 100
-                current_iteration = 0
-                
-                
-
-                while current_iteration < max_iterations:
-                    current_down_payment_ratio = (1 - ltv / 100)
-                    if self.include_tax_in_mortgage_var.get():
-                        include_tax_ind = True
-                        current_down_payment_from_price = (estimated_price ) * current_down_payment_ratio
-                        current_purchase_tax = 0  if self.skip_tax_var.get() else calculate_purchase_tax(estimated_price)
-                        
-                    if self.manual_lawyer_fee_var.get():
-                        lawyer_fee_val = float(self.lawyer_fee_manual_entry.get()) if self.lawyer_fee_manual_entry.get() else 0
-                        current_lawyer_fee = lawyer_fee_val
-                    else:
-                        current_lawyer_fee = estimated_price * LAWYER_FEE_RATE
-
-                    if self.skip_broker_var.get():
-                        current_broker_fee = 0
-                    elif self.manual_broker_fee_var.get():
-                        broker_fee_val = float(self.broker_fee_manual_entry.get()) if self.broker_fee_manual_entry.get() else 0
-                        current_broker_fee = broker_fee_val
-                    else:
-                        current_broker_fee = estimated_price * BROKER_FEE_RATE
-
-                    if self.include_tax_in_mortgage_var.get():
-
-
-                # loan_amount_f=(price + purchase_tax)
-                # loan_amount = loan_amount_f* (ltv / 100)
-                # down_payment =( price + purchase_tax )* ((100-ltv) / 100)
-                        current_price_tax_f=calculate_purchase_tax(estimated_price)
-                        current_loan_amount_for_affordability_f=int(estimated_price + current_price_tax_f)
-                        current_loan_amount_for_affordability = (current_loan_amount_for_affordability_f * (ltv / 100)) 
-                        # current_down_payment_for_affordability = (estimated_price + current_purchase_tax) - current_loan_amount_for_affordability
-                        current_down_payment_for_affordability = (estimated_price + calculate_purchase_tax(estimated_price))* ((100-ltv) / 100)
-                        current_total_funds_needed = current_down_payment_for_affordability + current_lawyer_fee + current_broker_fee
-                    else:
-                        current_total_funds_needed = current_down_payment_from_price + current_purchase_tax + current_lawyer_fee + current_broker_fee
-
-                    diff = available_funds - current_total_funds_needed
-
-                    if abs(diff) < tolerance:
-                        price = estimated_price
-                        break
-                    
-                    estimated_price += diff * 0.5 
-
-                    current_iteration += 1
-                
-                if current_iteration == max_iterations:
-                    if is_active_tab:
-                        show_error_with_copy("אזהרת חישוב", "לא ניתן למצוא מחיר נכס מדויק עבור ההון העצמי הנתון לאחר מספר רב של ניסיונות. ייתכן שהסכום המחושב הוא קירוב.", parent=self.root)
-                    price = estimated_price 
-
-                self.price_entry.config(state='disabled')
-                self.price_entry.delete(0, tk.END)
-                self.price_entry.insert(0, f"{price:,.0f}")
-                self.affordable_price_label.config(text=f"מחיר הנכס המקסימלי שניתן לרכוש: {price:,.0f} ₪")
-
-            else: 
-                price_str = self.price_entry.get()
-                if not price_str:
-                    if is_active_tab:
-                        show_error_with_copy("קלט חסר", "יש להזין מחיר דירה.", parent=self.root)
-                    return False 
-                price = float(price_str)
-                if price <= 0:
-                    if is_active_tab:
-                        show_error_with_copy("קלט לא חוקי", "מחיר הדירה חייב להיות מספר חיובי.", parent=self.root)
-                    return False
-                self.price_entry.config(state='normal')
-                self.affordable_price_label.config(text="") 
-
-            purchase_tax = 0 if self.skip_tax_var.get() else calculate_purchase_tax(price)
-            
-            if self.manual_lawyer_fee_var.get():
-                try:
-                    lawyer_fee = float(self.lawyer_fee_manual_entry.get())
-                    if lawyer_fee < 0:
-                        if is_active_tab:
-                            show_error_with_copy("קלט לא חוקי", "עלות עו\"ד ידנית אינה יכולה להיות שלילית.", parent=self.root)
-                        return False
-                except ValueError:
-                    if is_active_tab:
-                        show_error_with_copy("שגיאת קלט", "עלות עו\"ד ידנית חייבת להיות מספר.", parent=self.root)
-                    return False
-            else:
-                lawyer_fee = estimate_lawyer_fee(price)
+            inflation = float(self.inflation_entry.get() or 0)
+        except ValueError:
+            inflation = 0.0
+        MortgageMixDialog(self.root, f"תמהיל משכנתא - תרחיש {i+1}", self.scenario_tracks[i],
+                          lambda tracks: self._set_mix(i, tracks),
+                          loan_amount=self.calculated_results.get("loan_amount"), inflation=inflation)
+
+    def pending_inputs(self):
+        """Current inputs if they need a (re)calculation, else None."""
+        inputs = self.get_inputs()
+        if self._last_result is not None and _inputs_key(inputs) == self._last_inputs:
+            return None
+        return inputs
+
+    def _report_error(self, error):
+        if not self._is_active_tab():
+            return
+        if isinstance(error, CalculationError):
+            show_error_with_copy(error.title, error.message, parent=self.root)
+        elif isinstance(error, ValueError):
+            show_error_with_copy("שגיאת קלט", f"שגיאה בנתונים: {error}\nאנא ודא/י שכל השדות המספריים מולאו נכונה.", parent=self.root)
+        else:
+            show_error_with_copy("שגיאה כללית", f"אירעה שגיאה בלתי צפויה: {error}", parent=self.root)
+
+    def apply_result(self, inputs, result, error=None, report_errors=True):
+        """Store the outcome of compute_property(inputs), e.g. from a worker.
+
+        The widgets are not touched; errors are reported for the active tab.
+        """
+        self._set_result_data(result)
+        if result is None:
+            self._last_inputs = None
+            self._last_result = None
+            if error is not None and report_errors:
+                self._report_error(error)
+            return False
+        self._last_inputs = _inputs_key(inputs)
+        self._last_result = result
+        return True
+
+    def is_saved(self, project):
+        """True if `project` already holds this tab's current inputs."""
+        return (project is not None and self.project is project and self.project_id is not None
+                and _inputs_key(self.get_inputs()) == self._saved_inputs)
+
+    def mark_saved(self, project, property_id, inputs):
+        self.project = project
+        self.project_id = property_id
+        if inputs is not None:
+            self._saved_inputs = _inputs_key(inputs)
+
+    def _restore_saved_result(self):
+        # A tab opened from a project reads its result and schedules from
+        # the project file the first time they are needed.
+        if self._last_result is not None or not self.is_saved(self.project):
+            return
+        try:
+            result = self.project.load_result(self.project_id)
+        except sqlite3.Error:
+            return
+        if result is not None:
+            self.apply_result(self.get_inputs(), result)
+
+    def ensure_results(self):
+        """Bring the result attributes up to date without touching any widget.
+
+        Reuses the last result when no input changed. Used by save/export so
+        unchanged tabs skip both the math and the GUI redraw.
+        """
+        self._restore_saved_result()
+        with SPANS.span("calculate.inputs"):
+            inputs = self.pending_inputs()
+        if inputs is None:
+            return True
+        try:
+            with SPANS.span("calculate.compute"):
+                result = compute_property(inputs)
+            return self.apply_result(inputs, result)
+        except Exception as e:
+            return self.apply_result(inputs, None, e)
+
+    def calculate(self, then=None):
+        """Recalculate on a worker and show the result on the Tk thread.
+
+        `then()` runs once the tab holds a result for its current inputs,
+        right away when none of them changed.
+        """
+        started = time.perf_counter_ns()
+        self._restore_saved_result()
+        with SPANS.span("calculate.inputs"):
+            inputs = self.pending_inputs()
+
+        def finish(ok):
+            ok = self._show_outcome(ok)
+            SPANS.record("calculate", started)
+            if ok and then is not None:
+                then()
+
+        if inputs is None:
+            finish(True)
+            return None
+
+        def compute(job):
+            with SPANS.span("calculate.compute"):
+                return compute_property(inputs)
+
+        def release():
+            if self.built:
+                self.calculate_tab_button.config(state='normal')
+
+        def settle(result, error=None):
+            release()
+            finish(self.apply_result(inputs, result, error))
+
+        if self.built:
+            self.calculate_tab_button.config(state='disabled')
+        return self.job_runner.submit("calculate", compute, on_done=settle,
+                                      on_error=lambda e: settle(None, e), on_cancel=release)
+
+    def calculate_now(self):
+        """calculate() on the calling thread; returns whether it succeeded."""
+        with SPANS.span("calculate"):
+            return self._show_outcome(self.ensure_results())
+
+    def _show_outcome(self, ok):
+        if not ok:
+            self.clear_results()
+            return False
+        if self.built and self._shown_result is not self._last_result:
+            self.show_results(self._last_result)
+        return True
+
+    def show_results(self, result):
+        self._set_result_data(result)
+        self._shown_result = result
+        if any(schedule is not None for schedule in self.df_list):
+            with SPANS.span("calculate.charts"):
+                self.build_charts()
+        started = time.perf_counter_ns()
+        results = result.calculated_results
+
+        price = results["calculated_price"]
+        if results["input_calculate_affordability"]:
+            self.price_entry.config(state='normal')
+            self.price_entry.delete(0, tk.END)
+            self.price_entry.insert(0, f"{price:,.0f}")
+            self.price_entry.config(state='disabled')
+            self.affordable_price_label.config(text=f"מחיר הנכס המקסימלי שניתן לרכוש: {price:,.0f} ₪")
+        else:
+            self.price_entry.config(state='normal')
+            self.affordable_price_label.config(text="") 
 
-            if self.skip_broker_var.get():
-                broker_fee = 0
-            elif self.manual_broker_fee_var.get():
-                try:
-                    broker_fee = float(self.broker_fee_manual_entry.get())
-                    if broker_fee < 0:
-                        if is_active_tab:
-                            show_error_with_copy("קלט לא חוקי", "עלות מתווך ידנית אינה יכולה להיות שלילית.", parent=self.root)
-                        return False
-                except ValueError:
-                    if is_active_tab:
-                        show_error_with_copy("שגיאת קלט", "עלות מתווך ידנית חייבת להיות מספר.", parent=self.root)
-                    return False
-            else:
-                broker_fee = estimate_broker_fee(price)
+        self.tax_label.config(text=f"מס רכישה משוער: {results['purchase_tax']:,.0f} ₪")
+        self.downpayment_label.config(text=f"הון עצמי נדרש: {results['down_payment']:,.0f} ₪")
+        self.loan_amount_label.config(text=f"סכום הלוואה מהבנק: {results['loan_amount']:,.0f} ₪")
+        self.lawyer_fee_label.config(text=f"עלות עורך דין משוערת: {results['lawyer_fee']:,.0f} ₪")
+        self.broker_fee_label.config(text=f"עלות מתווך משוערת: {results['broker_fee']:,.0f} ₪")
+        self.total_funds_label.config(text=f"סה\"כ הון דרוש: {results['total_needed']:,.0f} ₪")
 
-            base_loan_amount = price * (ltv / 100)
-            if self.include_tax_in_mortgage_var.get():
-                loan_amount_f=(price + purchase_tax)
-                loan_amount = loan_amount_f* (ltv / 100)
-                down_payment =( price + purchase_tax )* ((100-ltv) / 100)
-            else:
-                loan_amount = base_loan_amount
-                down_payment = (price - base_loan_amount) + purchase_tax
-
-            total_needed = down_payment + lawyer_fee + broker_fee
-
-            if self.calculate_affordability_var.get():
-                total_needed = available_funds 
-
-            self.calculated_results = {
-                "purchase_tax": purchase_tax,
-                "down_payment": down_payment,
-                "loan_amount": loan_amount, 
-                "lawyer_fee": lawyer_fee,
-                "broker_fee": broker_fee,
-                "total_needed": total_needed,
-                "price_per_meter": price / area if area is not None and area > 0 else None,
-                "rent": rent,
-                "input_price": self.price_entry.get(), 
-                "calculated_price": price, 
-                "input_area": area_str,
-                "input_ltv": ltv_str,
-                "input_rent": rent_str,
-                "input_skip_tax": self.skip_tax_var.get(),
-                "input_include_tax_in_mortgage": self.include_tax_in_mortgage_var.get(), 
-                "input_skip_broker": self.skip_broker_var.get(),
-                "input_manual_lawyer_fee": self.manual_lawyer_fee_var.get(), 
-                "input_lawyer_fee_manual_value": self.lawyer_fee_manual_entry.get(),
-                "input_manual_broker_fee": self.manual_broker_fee_var.get(),
-                "input_broker_fee_manual_value": self.broker_fee_manual_entry.get(),
-                "input_calculate_affordability": self.calculate_affordability_var.get(),
-                "input_available_funds": self.available_funds_entry.get(),
-                "input_rates": [], 
-                "input_years": [], 
-                "input_alias": self.alias_entry.get(),
-                "input_link": self.link_entry.get(),
-            }
-            self.loan_scenarios_data = [] 
-            self.loan_scenarios_rent_comparison = []
+        if results["price_per_meter"] is not None:
+            self.price_per_meter_label.config(text=f"מחיר למטר מרובע: {results['price_per_meter']:,.2f} ₪")
+        else:
+            self.price_per_meter_label.config(text="") 
 
-            rates = []
-            years = []
-            valid_scenarios_count = 0
-            for i in range(3):
-                rate_val = self.rate_entries[i].get()
-                years_val = self.years_entries[i].get()
-                
-                current_rate = None
-                current_years = None
-
-                if rate_val and years_val: 
-                    try:
-                        current_rate = float(rate_val)
-                        if current_rate < 0:
-                            if is_active_tab:
-                                show_error_with_copy("קלט לא חוקי", f"ריבית שנתית (תרחיש {i+1}) אינה יכולה להיות שלילית.", parent=self.root)
-                            return False
-                    except ValueError:
-                        if is_active_tab:
-                            show_error_with_copy("שגיאת קלט", f"ריבית שנתית (תרחיש {i+1}) חייבת להיות מספר.", parent=self.root)
-                        return False
-                    
-                    try:
-                        current_years = int(years_val)
-                        if current_years <= 0:
-                            if is_active_tab:
-                                show_error_with_copy("קלט לא חוקי", f"שנים להחזר (תרחיש {i+1}) חייבות להיות מספר חיובי שלם.", parent=self.root)
-                            return False
-                    except ValueError:
-                        if is_active_tab:
-                            show_error_with_copy("שגיאת קלט", f"שנים להחזר (תרחיש {i+1}) חייבות להיות מספר שלם.", parent=self.root)
-                        return False
-                    valid_scenarios_count += 1
-                
-                rates.append(current_rate)
-                years.append(current_years)
-
-            if valid_scenarios_count == 0:
-                if is_active_tab:
-                    show_error_with_copy("אין נתונים לחישוב", "אנא הזן/י לפחות ריבית שנתית אחת ושנים להחזר עבור תרחיש.", parent=self.root)
-                return False 
-            
-            self.calculated_results["input_rates"] = rates
-            self.calculated_results["input_years"] = years
-
-            self.tax_label.config(text=f"מס רכישה משוער: {purchase_tax:,.0f} ₪")
-            self.downpayment_label.config(text=f"הון עצמי נדרש: {down_payment:,.0f} ₪")
-            self.loan_amount_label.config(text=f"סכום הלוואה מהבנק: {loan_amount:,.0f} ₪")
-            self.lawyer_fee_label.config(text=f"עלות עורך דין משוערת: {lawyer_fee:,.0f} ₪")
-            self.broker_fee_label.config(text=f"עלות מתווך משוערת: {broker_fee:,.0f} ₪")
-            self.total_funds_label.config(text=f"סה\"כ הון דרוש: {total_needed:,.0f} ₪")
-
-            if area is not None and area > 0: 
-                self.price_per_meter_label.config(text=f"מחיר למטר מרובע: {price / area:,.2f} ₪")
-            else:
-                self.price_per_meter_label.config(text="") 
+        SPANS.record("calculate.labels", started)
 
+        with SPANS.span("calculate.table"):
             self.table.delete(*self.table.get_children()) 
+            for i in range(3):
+                self.table.insert("", "end", values=result.table_rows[i])
 
-            for p in self.temp_image_paths:
-                try:
-                    import os
-                    os.remove(p)
-                except OSError:
-                    pass
-            self.temp_image_paths = []
+        for p in self.temp_image_paths:
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+        self.temp_image_paths = []
 
+        with SPANS.span("calculate.charts"):
             for i in range(3):
-                if rates[i] is not None and years[i] is not None:
-                    df = generate_amortization_df(loan_amount, rates[i], years[i])
-                    self.df_list[i] = df
-                    
-                    if not df.empty:
-                        total_interest = df["ריבית"].sum()
-                        total_payment_sum_from_df = df["תשלום חודשי"].sum()
-                        
-                        initial_monthly_payment_for_scenario = calculate_monthly_payment(loan_amount, rates[i], years[i])
-
-                        table_row_data = (
-                            f"{loan_amount:,.0f}",
-                            f"{rates[i]:.2f}",
-                            f"{years[i]}",
-                            f"{initial_monthly_payment_for_scenario:,.0f}", 
-                            f"{total_interest:,.0f}",
-                            f"{total_payment_sum_from_df:,.0f}", 
-                        )
-                        self.table.insert("", "end", values=table_row_data)
-                        self.loan_scenarios_data.append({
-                            "תרחיש": f"תרחיש {i+1}",
-                            "סכום הלוואה (₪)": f"{loan_amount:,.0f}",
-                            "ריבית שנתית (%)": f"{rates[i]:.2f}",
-                            "שנים להחזר": f"{years[i]}",
-                            "תשלום חודשי (₪)": f"{initial_monthly_payment_for_scenario:,.0f}",
-                            "סה\"כ ריבית (₪)": f"{total_interest:,.0f}",
-                            "סה\"כ תשלום כולל (₪)": f"{total_payment_sum_from_df:,.0f}"
-                        })
-
-                        rent_compare_str = ""
-                        if rent is not None: 
-                            ratio = rent / initial_monthly_payment_for_scenario if initial_monthly_payment_for_scenario != 0 else 0
-                            rent_compare_str = f"שכירות צפויה: {rent:,.0f} ₪ | תשלום חודשי ראשוני: {initial_monthly_payment_for_scenario:,.0f} ₪ | יחס שכירות/תשלום: {ratio:.2f}"
-                            self.rent_comparison_labels[i].config(text=rent_compare_str)
-                        else:
-                            self.rent_comparison_labels[i].config(text="") 
-                        self.loan_scenarios_rent_comparison.append(rent_compare_str)
-                        
-                        ax = self.ax_list[i]
-                        ax.clear()
-                        ax.plot(df["חודש"], df["קרן"], label="קרן", color="green")
-                        ax.plot(df["חודש"], df["ריבית"], label="ריבית", color="red")
-                        ax.set_title(f"תרחיש {i+1} - פירוט תשלומים חודשיים", fontsize=9)
-                        ax.set_xlabel("חודש", fontsize=8)
-                        ax.set_ylabel("₪", fontsize=8)
-                        ax.legend(fontsize=7)
-                        ax.grid(True)
-                        ax.set_xlim(left=1)
-                        ax.tick_params(axis='both', which='major', labelsize=7) 
-                        self.figure_list[i].tight_layout() 
-                        self.canvas_list[i].draw()
-                    else:
-                        self.df_list[i] = None
-                        self.table.insert("", "end", values=("אין נתונים עבור תרחיש זה",) * 6)
-                        self.rent_comparison_labels[i].config(text="")
-                        self.ax_list[i].clear()
-                        self.canvas_list[i].draw()
-                        self.loan_scenarios_data.append({}) 
-                        self.loan_scenarios_rent_comparison.append("אין נתוני השוואת שכירות עבור תרחיש זה")
+                schedule = self.df_list[i]
+                if schedule is not None:
+                    self.rent_comparison_labels[i].config(text=self.loan_scenarios_rent_comparison[i])
+                    self._update_chart(i, schedule)
                 else:
-                    self.df_list[i] = None
-                    self.table.insert("", "end", values=("אין נתונים עבור תרחיש זה (חסר ריבית/שנים)",) * 6)
                     self.rent_comparison_labels[i].config(text="")
-                    self.ax_list[i].clear()
-                    self.canvas_list[i].draw()
-                    self.loan_scenarios_data.append({}) 
-                    self.loan_scenarios_rent_comparison.append("אין נתוני השוואת שכירות עבור תרחיש זה")
-            
-            self._on_frame_configure()
-
-            return True 
-
-        except ValueError as e:
-            if is_active_tab:
-                show_error_with_copy("שגיאת קלט", f"שגיאה בנתונים: {e}\nאנא ודא/י שכל השדות המספריים מולאו נכונה.", parent=self.root)
-            return False
-        except Exception as e:
-            if is_active_tab:
-                show_error_with_copy("שגיאה כללית", f"אירעה שגיאה בלתי צפויה: {e}", parent=self.root)
-            return False
+                    self._update_chart(i, None)
+
+        self._on_frame_configure()
+
+    def open_sensitivity(self):
+        self.calculate(then=self._open_sensitivity)
+
+    def _open_sensitivity(self):
+        results = self.calculated_results
+        alias = results.get("input_alias") or f"נכס {self.idx + 1}"
+        scenarios = [(rate, years) for rate, years in zip(results["input_rates"], results["input_years"])
+                     if rate is not None and years is not None]
+        SensitivityWindow(self.root, f"ניתוח רגישות - {alias}", results["loan_amount"], results["rent"], scenarios)
+
+    def open_prepayment(self):
+        self.calculate(then=self._open_prepayment)
+
+    def _open_prepayment(self):
+        results = self.calculated_results
+        alias = results.get("input_alias") or f"נכס {self.idx + 1}"
+        tracks = results.get("input_tracks", [[], [], []])
+        scenarios = [(i, rate, years) for i, (rate, years) in enumerate(zip(results["input_rates"], results["input_years"]))
+                     if rate is not None and years is not None and not tracks[i]]
+        if not scenarios:
+            show_error_with_copy("פירעון מוקדם ומחזור", "החישוב זמין רק לתרחישים עם ריבית ותקופה אחידות (ללא תמהיל).", parent=self.root)
+            return
+        PrepaymentWindow(self.root, f"פירעון מוקדם ומחזור - {alias}", results["loan_amount"], scenarios)
+
+    def open_rate_simulation(self):
+        self.calculate(then=self._open_rate_simulation)
+
+    def _open_rate_simulation(self):
+        results = self.calculated_results
+        alias = results.get("input_alias") or f"נכס {self.idx + 1}"
+        tracks = results.get("input_tracks", [[], [], []])
+        scenarios = [(i, rate, years) for i, (rate, years) in enumerate(zip(results["input_rates"], results["input_years"]))
+                     if rate is not None and years is not None and not tracks[i]]
+        if not scenarios:
+            show_error_with_copy("סימולציית ריבית משתנה", "הסימולציה זמינה רק לתרחישים עם ריבית ותקופה אחידות (ללא תמהיל).", parent=self.root)
+            return
+        RateSimulationWindow(self.root, f"סימולציית ריבית משתנה - {alias}", results["loan_amount"], scenarios, self.job_runner)
 
     def export_to_pdf(self):
-        if not self.calculate():
-            return
+        # The report is built from the result alone (charts included), but
+        # calculate() keeps the tab in step with what gets exported; it
+        # continues right away when nothing changed.
+        self.calculate(then=self._export_to_pdf)
+
+    def _export_to_pdf(self):
+        ensure_pdf_support(parent=self.root)
 
         filepath = filedialog.asksaveasfilename(defaultextension=".pdf", 
                                                 filetypes=[("PDF files", "*.pdf")],
@@ -805,210 +4170,31 @@ class PropertyTab:
         if not filepath:
             return
 
-        try:
-            doc = SimpleDocTemplate(filepath, pagesize=A4, rightMargin=36, leftMargin=36, topMargin=36, bottomMargin=36) # Added margins
-            
-            # Use the Hebrew styles defined globally
-            styles = getSampleStyleSheet()
-            # Ensure these styles are added if they were not created due to font loading errors
-            # (they are already added in the global scope if font loading succeeded)
-            if 'Hebrew' not in styles:
-                styles.add(heb_style)
-            if 'HebrewHeading' not in styles:
-                styles.add(heb_heading_style)
-            if 'HebrewSubHeading' not in styles:
-                styles.add(heb_subheading_style)
-            
-            story = []
-
-            # --- Title ---
-            alias = self.calculated_results.get("input_alias", f"נכס {self.idx + 1}")
-            story.append(Paragraph(f"<b>דוח נכס: {alias}</b>", styles['HebrewHeading']))
-            story.append(Spacer(1, 0.2 * inch))
-
-            # --- Input Data Section ---
-            story.append(Paragraph("<b>פרטי קלט:</b>", styles['HebrewSubHeading']))
-            story.append(Spacer(1, 0.1 * inch))
-
-            input_data = [
-                ("קישור:", self.calculated_results.get("input_link", "")),
-                ("מחיר דירה (₪):", f"{self.calculated_results.get('calculated_price', 0):,.0f}"),
-                ("מטר מרובע (שטח):", self.calculated_results.get("input_area", "")),
-                ("אחוז מימון (LTV) %:", self.calculated_results.get("input_ltv", "")),
-                ("שכירות חודשית צפויה (₪):", self.calculated_results.get("input_rent", "")),
-                ("בטל מס רכישה:", "כן" if self.calculated_results.get("input_skip_tax") else "לא"),
-                ("כלול מס רכישה במשכנתא:", "כן" if self.calculated_results.get("input_include_tax_in_mortgage") else "לא"),
-            ]
-            
-            if self.calculated_results.get("input_manual_lawyer_fee"):
-                input_data.append(("הזן עלות עו\"ד ידנית:", self.calculated_results.get("input_lawyer_fee_manual_value", "")))
-            else:
-                input_data.append(("עלות עו\"ד משוערת (% מהמחיר):", f"{LAWYER_FEE_RATE*100:.0f}%"))
+        # Laying out the report, drawing its charts and writing the document
+        # need no widgets, so they run on a worker while the window stays
+        # responsive.
+        started = time.perf_counter_ns()
 
-            if self.calculated_results.get("input_manual_broker_fee"):
-                 input_data.append(("הזן עלות מתווך ידנית:", self.calculated_results.get("input_broker_fee_manual_value", "")))
-            elif self.calculated_results.get("input_skip_broker"):
-                input_data.append(("בטל עלות מתווך:", "כן"))
-            else:
-                input_data.append(("עלות מתווך משוערת (% מהמחיר):", f"{BROKER_FEE_RATE*100:.0f}%"))
-            
-            if self.calculated_results.get("input_calculate_affordability"):
-                input_data.append(("חשב מחיר נכס לפי הון עצמי (₪):", self.calculated_results.get("input_available_funds", "")))
-
-            # Use the Hebrew style for Paragraphs in the table
-            input_table_data = [[Paragraph(f"<b>{k}</b>", styles['Hebrew']), Paragraph(str(v), styles['Hebrew'])] for k, v in input_data]
-            
-            # Adjust colWidths to prevent cutting and fit content
-            table_col_widths = [doc.width * 0.4, doc.width * 0.6] # Allocate width dynamically
-            input_table = Table(input_table_data, colWidths=table_col_widths)
-            input_table.setStyle(TableStyle([
-                ('ALIGN', (0,0), (-1,-1), 'RIGHT'), # Align right for Hebrew
-                ('VALIGN', (0,0), (-1,-1), 'TOP'),
-                ('FONTNAME', (0,0), (0,-1), 'DejaVuSans-Bold'), # This now refers to the registered bold font
-                ('FONTNAME', (1,0), (1,-1), 'DejaVuSans'), # This now refers to the registered normal font
-                ('BOTTOMPADDING', (0,0), (-1,-1), 2),
-                ('GRID', (0,0), (-1,-1), 0.25, colors.black),
-                ('BACKGROUNDS', (0,0), (-1,-1), [colors.HexColor('#F0F8FF'), None]), # Light blue for alternating rows
-            ]))
-            story.append(input_table)
-            story.append(Spacer(1, 0.3 * inch))
-
-            # --- Calculation Summary ---
-            story.append(Paragraph("<b>סיכום חישובים:</b>", styles['HebrewSubHeading']))
-            story.append(Spacer(1, 0.1 * inch))
-
-            summary_data = [
-                ("מס רכישה משוער:", f"{self.calculated_results.get('purchase_tax', 0):,.0f} ₪"),
-                ("הון עצמי נדרש:", f"{self.calculated_results.get('down_payment', 0):,.0f} ₪"),
-                ("סכום הלוואה מהבנק:", f"{self.calculated_results.get('loan_amount', 0):,.0f} ₪"),
-                ("עלות עורך דין משוערת:", f"{self.calculated_results.get('lawyer_fee', 0):,.0f} ₪"),
-                ("עלות מתווך משוערת:", f"{self.calculated_results.get('broker_fee', 0):,.0f} ₪"),
-                ("סה\"כ הון דרוש:", f"{self.calculated_results.get('total_needed', 0):,.0f} ₪"),
-            ]
-            if self.calculated_results.get("price_per_meter") is not None:
-                summary_data.append(("מחיר למטר מרובע:", f"{self.calculated_results.get('price_per_meter', 0):,.2f} ₪"))
-
-            summary_table_data = [[Paragraph(f"<b>{k}</b>", styles['Hebrew']), Paragraph(str(v), styles['Hebrew'])] for k, v in summary_data]
-            summary_table = Table(summary_table_data, colWidths=table_col_widths)
-            summary_table.setStyle(TableStyle([
-                ('ALIGN', (0,0), (-1,-1), 'RIGHT'), # Align right for Hebrew
-                ('VALIGN', (0,0), (-1,-1), 'TOP'),
-                ('FONTNAME', (0,0), (0,-1), 'DejaVuSans-Bold'), # This too
-                ('FONTNAME', (1,0), (1,-1), 'DejaVuSans'), # And this
-                ('BOTTOMPADDING', (0,0), (-1,-1), 2),
-                ('GRID', (0,0), (-1,-1), 0.25, colors.black),
-                ('BACKGROUNDS', (0,0), (-1,-1), [colors.HexColor('#F0F8FF'), None]),
-            ]))
-            story.append(summary_table)
-            story.append(Spacer(1, 0.3 * inch))
-
-            # --- Loan Scenarios Table ---
-            story.append(Paragraph("<b>תרחישי הלוואה:</b>", styles['HebrewSubHeading']))
-            story.append(Spacer(1, 0.1 * inch))
-
-            loan_table_headers = ["תרחיש", "סכום הלוואה (₪)", "ריבית שנתית (%)", "שנים להחזר", "תשלום חודשי (₪)", "סה\"כ ריבית (₪)", "סה\"כ תשלום כולל (₪)"]
-            
-            # Wrap headers in Paragraphs for font styling
-            loan_table_data = [[Paragraph(header, styles['Hebrew']) for header in loan_table_headers]]
-            
-            for i, scenario in enumerate(self.loan_scenarios_data):
-                if scenario:
-                    # Wrap each cell's content in Paragraph for font styling
-                    loan_table_data.append([
-                        Paragraph(scenario.get("תרחיש", ""), styles['Hebrew']),
-                        Paragraph(scenario.get("סכום הלוואה (₪)", ""), styles['Hebrew']),
-                        Paragraph(scenario.get("ריבית שנתית (%)", ""), styles['Hebrew']),
-                        Paragraph(scenario.get("שנים להחזר", ""), styles['Hebrew']),
-                        Paragraph(scenario.get("תשלום חודשי (₪)", ""), styles['Hebrew']),
-                        Paragraph(scenario.get("סה\"כ ריבית (₪)", ""), styles['Hebrew']),
-                        Paragraph(scenario.get("סה\"כ תשלום כולל (₪)", ""), styles['Hebrew'])
-                    ])
-            
-            if len(loan_table_data) > 1:
-                # Calculate optimal column widths based on content or fixed proportions
-                # Adjust colWidths to fit content. A4 width is ~595 points, effective width ~523 points.
-                # 523 / 7 columns ~= 75 points per column. Let's make it a bit more flexible.
-                col_widths = [doc.width * 0.12, doc.width * 0.17, doc.width * 0.12, doc.width * 0.1, doc.width * 0.17, doc.width * 0.16, doc.width * 0.16] # Adjusted widths
-                
-                loan_table = Table(loan_table_data, colWidths=col_widths)
-                loan_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#ADD8E6')),
-                    ('TEXTCOLOR', (0,0), (-1,0), colors.black),
-                    ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-                    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                    ('FONTNAME', (0,0), (-1,0), 'DejaVuSans-Bold'), # Ensure header font is bold
-                    ('FONTSIZE', (0,0), (-1,0), 9), # Smaller font for table headers
-                    ('BOTTOMPADDING', (0,0), (-1,0), 6),
-                    ('BACKGROUNDS', (0,1), (-1,-1), [colors.beige, colors.white]),
-                    ('GRID', (0,0), (-1,-1), 0.25, colors.black),
-                    ('FONTNAME', (0,1), (-1,-1), 'DejaVuSans'), # Regular font for table data
-                    ('FONTSIZE', (0,1), (-1,-1), 8), # Smaller font for table data
-                ]))
-                story.append(loan_table)
-                story.append(Spacer(1, 0.3 * inch))
-            else:
-                story.append(Paragraph("אין נתוני הלוואה לתרחישים.", styles['Hebrew']))
-                story.append(Spacer(1, 0.3 * inch))
-
-            # --- Rent Comparison ---
-            if any(self.loan_scenarios_rent_comparison):
-                story.append(Paragraph("<b>השוואת שכירות:</b>", styles['HebrewSubHeading']))
-                story.append(Spacer(1, 0.1 * inch))
-                for rent_comp_str in self.loan_scenarios_rent_comparison:
-                    if rent_comp_str:
-                        story.append(Paragraph(rent_comp_str, styles['Hebrew']))
-                        story.append(Spacer(1, 0.05 * inch))
-                story.append(Spacer(1, 0.3 * inch))
-
-            # --- Amortization Graphs ---
-            story.append(Paragraph("<b>גרפי פירעון:</b>", styles['HebrewSubHeading']))
-            story.append(Spacer(1, 0.1 * inch))
-
-            for i, fig in enumerate(self.figure_list):
-                # Check if df_list[i] is not None AND not empty
-                if self.df_list[i] is not None and not self.df_list[i].empty: 
-                    buf = io.BytesIO()
-                    fig.savefig(buf, format='png', dpi=200, bbox_inches='tight') # Increased DPI for better quality
-                    buf.seek(0)
-                    
-                    img = RLImage(buf)
-                    
-                    # Calculate aspect ratio to fit within page width
-                    img_width, img_height = img.drawWidth, img.drawHeight
-                    aspect_ratio = img_height / img_width
-                    
-                    # Target width for the image (e.g., 7 inches, leaving margins)
-                    desired_width = 7 * inch # Adjusted to fit page width with margins
-                    desired_height = desired_width * aspect_ratio
-
-                    # If the image is too tall, scale down based on height as well
-                    if desired_height > (A4[1] - (36*2 + 1*inch)): # A4 height - top/bottom margins - some space for title/text
-                         desired_height = (A4[1] - (36*2 + 1*inch))
-                         desired_width = desired_height / aspect_ratio
-                    
-                    img.drawWidth = desired_width
-                    img.drawHeight = desired_height
-                    
-                    # Add PageBreak if graph won't fit on current page
-                    current_y_pos = doc.height - doc.topMargin - sum(el.wrapOn(doc, doc.width, doc.height)[1] for el in story[-2:]) # Estimate height of last elements
-                    if (current_y_pos - desired_height - (0.5*inch)) < doc.bottomMargin and i > 0: # Check if there's enough space
-                        story.append(PageBreak())
-                        story.append(Paragraph(f"<b>גרפי פירעון (המשך):</b>", styles['HebrewSubHeading']))
-                        story.append(Spacer(1, 0.1 * inch))
-
-                    story.append(Paragraph(f"<b>תרחיש {i+1}</b>", styles['Hebrew']))
-                    story.append(img)
-                    story.append(Spacer(1, 0.2 * inch))
-            
-            doc.build(story)
+        def on_done(_):
+            SPANS.record("export_to_pdf", started)
+            self.export_pdf_button.config(state='normal')
             show_error_with_copy("ייצוא ל-PDF", "הדוח נשמר בהצלחה כקובץ PDF.", parent=self.root)
 
-        except Exception as e:
+        def on_error(e):
+            self.export_pdf_button.config(state='normal')
             show_error_with_copy("שגיאת ייצוא ל-PDF", f"אירעה שגיאה בעת ייצוא ל-PDF: {e}", parent=self.root)
 
+        self.export_pdf_button.config(state='disabled')
+        result = self._last_result
+        vector_charts = self.vector_charts_var.get()
+        self.job_runner.submit("export_pdf",
+                               lambda job: write_property_pdf(filepath, result, f"נכס {self.idx + 1}", vector_charts, job),
+                               on_done=on_done, on_error=on_error,
+                               on_cancel=lambda: self.export_pdf_button.config(state='normal'))
+
 
 class MortgageCalculatorApp:
-    def __init__(self, root):
+    def __init__(self, root, max_tabs_with_charts=8):
         self.root = root
         self.root.title("מחשבון נדל\"ן מקיף")
         self.root.geometry("1200x900") 
@@ -1016,7 +4202,15 @@ class MortgageCalculatorApp:
         self.notebook = ttk.Notebook(root)
         self.notebook.pack(expand=True, fill="both", padx=10, pady=10)
 
+        self.job_runner = JobRunner(root)
+        # The open project file (ProjectStore), if any.
+        self.project = None
         self.property_tabs = []
+        # Most recently viewed tabs first; only the first
+        # max_tabs_with_charts of them keep their matplotlib figures.
+        self.max_tabs_with_charts = max_tabs_with_charts
+        self._viewed_tabs = []
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
         self.add_tab()
 
         menu_bar = tk.Menu(root)
@@ -1025,17 +4219,143 @@ class MortgageCalculatorApp:
         file_menu = tk.Menu(menu_bar, tearoff=0)
         menu_bar.add_cascade(label="קובץ", menu=file_menu)
         file_menu.add_command(label="הוסף נכס חדש", command=self.add_tab)
-        file_menu.add_command(label="שמור נתונים (Excel)", command=self.save_data)
-        file_menu.add_command(label="טען נתונים (Excel)", command=self.load_data)
         file_menu.add_separator()
-        file_menu.add_command(label="יציאה", command=root.quit)
+        file_menu.add_command(label="פתח פרויקט", command=self.open_project)
+        file_menu.add_command(label="שמור פרויקט", command=self.save_project, accelerator="Ctrl+S")
+        file_menu.add_command(label="שמור פרויקט בשם...", command=lambda: self.save_project(save_as=True))
+        file_menu.add_separator()
+        file_menu.add_command(label="ייצוא נתונים (Excel)", command=self.save_data)
+        file_menu.add_command(label="ייבוא נתונים (Excel)", command=self.load_data)
+        file_menu.add_command(label="ייצוא תיק נכסים ל-PDF", command=self.export_portfolio_pdf)
+        self.vector_charts_var = tk.BooleanVar(value=False)
+        file_menu.add_checkbutton(label="גרפים וקטוריים בדוח התיק", variable=self.vector_charts_var)
+        file_menu.add_separator()
+        file_menu.add_command(label="יציאה", command=self.close)
+        root.protocol("WM_DELETE_WINDOW", self.close)
+        root.bind("<Control-s>", lambda event: self.save_project())
 
-    def add_tab(self):
+        tools_menu = tk.Menu(menu_bar, tearoff=0)
+        menu_bar.add_cascade(label="כלים", menu=tools_menu)
+        tools_menu.add_command(label="לוח מפתחים (זמני שלבים)", command=self.open_developer_panel, accelerator="Ctrl+Shift+D")
+        root.bind("<Control-D>", lambda event: self.open_developer_panel())
+
+    def close(self):
+        """Cancel running jobs and close the window without waiting for them."""
+        self.job_runner.shutdown()
+        self.root.destroy()
+
+    def open_developer_panel(self):
+        DeveloperPanel(self.root)
+
+    def add_tab(self, select=True):
         idx = len(self.property_tabs)
-        new_tab = PropertyTab(self.notebook, idx, self.root) 
+        new_tab = PropertyTab(self.notebook, idx, self.root, self.job_runner) 
         self.property_tabs.append(new_tab)
         self.notebook.add(new_tab.frame, text=f"נכס {idx + 1}")
-        self.notebook.select(new_tab.frame) 
+        if select:
+            self.notebook.select(new_tab.frame) 
+            self._show_tab(new_tab)
+        return new_tab
+
+    def _on_tab_changed(self, event=None):
+        if not self.property_tabs:
+            return
+        current = self.notebook.index("current")
+        if 0 <= current < len(self.property_tabs):
+            self._show_tab(self.property_tabs[current])
+
+    def _show_tab(self, tab):
+        tab.show()
+        if tab in self._viewed_tabs:
+            self._viewed_tabs.remove(tab)
+        self._viewed_tabs.insert(0, tab)
+        for stale_tab in self._viewed_tabs[self.max_tabs_with_charts:]:
+            stale_tab.release_charts()
+        del self._viewed_tabs[self.max_tabs_with_charts:]
+
+    def _set_project(self, project):
+        self.project = project
+        title = "מחשבון נדל\"ן מקיף"
+        if project is not None:
+            title += f" - {os.path.basename(project.path)}"
+        self.root.title(title)
+
+    def save_project(self, save_as=False):
+        """Save to the open project file, rewriting only the changed tabs."""
+        project = self.project
+        if project is None or save_as:
+            filepath = filedialog.asksaveasfilename(defaultextension=PROJECT_FILE_EXTENSION,
+                                                    filetypes=[("Project files", f"*{PROJECT_FILE_EXTENSION}")],
+                                                    title="שמור פרויקט")
+            if not filepath:
+                return
+            try:
+                project = ProjectStore(filepath)
+            except CalculationError as e:
+                show_error_with_copy(e.title, e.message, parent=self.root)
+                return
+            except sqlite3.Error as e:
+                show_error_with_copy("שגיאה בשמירה", f"לא ניתן לפתוח את קובץ הפרויקט: {e}", parent=self.root)
+                return
+
+        # Unchanged tabs are sent without inputs, so they are not rewritten;
+        # a still-valid result is passed along so it is not recomputed.
+        tabs = list(self.property_tabs)
+        records = []
+        for tab in tabs:
+            property_id = tab.project_id if tab.project is project else None
+            if tab.is_saved(project):
+                records.append((property_id, None, None))
+                continue
+            inputs = tab.get_inputs()
+            result = tab._last_result if tab.pending_inputs() is None else None
+            records.append((property_id, inputs, result))
+        dialog = ProgressDialog(self.root, "שמירת פרויקט")
+
+        def on_done(outcome):
+            dialog.close()
+            ids, computed = outcome
+            self._set_project(project)
+            for tab, property_id, (inputs, result, error) in zip(tabs, ids, computed):
+                tab.mark_saved(project, property_id, inputs)
+                if inputs is not None and (result is not tab._last_result or error is not None):
+                    tab.apply_result(inputs, result, error, report_errors=False)
+
+        def on_error(e):
+            dialog.close()
+            show_error_with_copy("שגיאה בשמירה", f"אירעה שגיאה בעת שמירת הפרויקט: {e}", parent=self.root)
+
+        job = self.job_runner.submit("save_project", _save_project_job, project, records,
+                                     on_done=on_done, on_error=on_error,
+                                     on_progress=dialog.update, on_cancel=dialog.close)
+        dialog.attach(job)
+
+    def open_project(self):
+        filepath = filedialog.askopenfilename(defaultextension=PROJECT_FILE_EXTENSION,
+                                              filetypes=[("Project files", f"*{PROJECT_FILE_EXTENSION}")],
+                                              title="פתח פרויקט")
+        if not filepath:
+            return
+
+        dialog = ProgressDialog(self.root, "פתיחת פרויקט")
+
+        def on_done(outcome):
+            project, properties = outcome
+            self._set_project(project)
+            self._populate_tabs([(inputs, None, None) for _, inputs in properties], dialog, lambda: None,
+                                project=project, property_ids=[property_id for property_id, _ in properties])
+
+        def on_error(e):
+            dialog.close()
+            if isinstance(e, CalculationError):
+                show_error_with_copy(e.title, e.message, parent=self.root)
+            else:
+                show_error_with_copy("שגיאה בפתיחת פרויקט", f"אירעה שגיאה בעת פתיחת הפרויקט: {e}", parent=self.root)
+
+        job = self.job_runner.submit("open_project", _open_project_job, filepath,
+                                     on_done=on_done, on_error=on_error,
+                                     on_progress=dialog.update, on_cancel=dialog.close)
+        dialog.attach(job)
 
     def save_data(self):
         filepath = filedialog.asksaveasfilename(defaultextension=".xlsx", 
@@ -1044,70 +4364,71 @@ class MortgageCalculatorApp:
         if not filepath:
             return
 
-        try:
-            with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-                summary_data = []
-                for idx, prop_tab in enumerate(self.property_tabs):
-                    prop_tab.calculate() 
-                    
-                    results = prop_tab.calculated_results
-                    loan_scenarios = prop_tab.loan_scenarios_data
-                    rent_comparisons = prop_tab.loan_scenarios_rent_comparison
-
-                    alias = results.get("input_alias", f"נכס {idx + 1}")
-                    link = results.get("input_link", "")
-
-                    summary_row = {
-                        "Alias": alias,
-                        "Link": link,
-                        "מחיר דירה (₪)": results.get("calculated_price"),
-                        "מטר מרובע (שטח)": results.get("input_area"),
-                        "אחוז מימון (LTV) %": results.get("input_ltv"),
-                        "שכירות חודשית צפויה (₪)": results.get("input_rent"),
-                        "בטל מס רכישה": "כן" if results.get("input_skip_tax") else "לא",
-                        "כלול מס רכישה במשכנתא": "כן" if results.get("input_include_tax_in_mortgage") else "לא",
-                        "הזן עלות עו\"ד ידנית": "כן" if results.get("input_manual_lawyer_fee") else "לא",
-                        "עלות עו\"ד ידנית": results.get("input_lawyer_fee_manual_value"),
-                        "הזן עלות מתווך ידנית": "כן" if results.get("input_manual_broker_fee") else "לא",
-                        "עלות מתווך ידנית": results.get("input_broker_fee_manual_value"),
-                        "בטל עלות מתווך": "כן" if results.get("input_skip_broker") else "לא",
-                        "חשב מחיר נכס לפי הון עצמי": "כן" if results.get("input_calculate_affordability") else "לא",
-                        "הון עצמי זמין (₪)": results.get("input_available_funds"),
-                        "מס רכישה משוער (₪)": results.get("purchase_tax"),
-                        "הון עצמי נדרש (₪)": results.get("down_payment"),
-                        "סכום הלוואה מהבנק (₪)": results.get("loan_amount"),
-                        "עלות עורך דין משוערת (₪)": results.get("lawyer_fee"),
-                        "עלות מתווך משוערת (₪)": results.get("broker_fee"),
-                        "סה\"כ הון דרוש (₪)": results.get("total_needed"),
-                        "מחיר למטר מרובע (₪)": results.get("price_per_meter"),
-                    }
-                    
-                    for i, scenario in enumerate(loan_scenarios):
-                        prefix = f"תרחיש {i+1} - "
-                        summary_row[prefix + "סכום הלוואה (₪)"] = scenario.get("סכום הלוואה (₪)")
-                        summary_row[prefix + "ריבית שנתית (%)"] = scenario.get("ריבית שנתית (%)")
-                        summary_row[prefix + "שנים להחזר"] = scenario.get("שנים להחזר")
-                        summary_row[prefix + "תשלום חודשי (₪)"] = scenario.get("תשלום חודשי (₪)")
-                        summary_row[prefix + "סה\"כ ריבית (₪)"] = scenario.get("סה\"כ ריבית (₪)")
-                        summary_row[prefix + "סה\"כ תשלום כולל (₪)"] = scenario.get("סה\"כ תשלום כולל (₪)")
-                        
-                    for i, rent_comp in enumerate(rent_comparisons):
-                        summary_row[f"תרחיש {i+1} - השוואת שכירות"] = rent_comp
-
-                    summary_data.append(summary_row)
-
-                    for i, df in enumerate(prop_tab.df_list):
-                        if df is not None and not df.empty:
-                            sheet_name = f"{alias}_תרחיש_{i+1}"
-                            df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-                pd.DataFrame(summary_data).to_excel(writer, sheet_name="סיכום נכסים", index=False)
-            
+        # Widgets are read here on the Tk thread; only changed tabs are
+        # recomputed, on the worker, together with the workbook writing.
+        started = time.perf_counter_ns()
+        with SPANS.span("save_data.inputs"):
+            work = [(tab.pending_inputs(), tab._last_result) for tab in self.property_tabs]
+        dialog = ProgressDialog(self.root, "שמירת נתונים")
+
+        def on_done(computed):
+            SPANS.record("save_data", started)
+            dialog.close()
+            for tab, (inputs, result, error) in zip(self.property_tabs, computed):
+                if inputs is not None:
+                    tab.apply_result(inputs, result, error)
             show_error_with_copy("שמירה בוצעה", "הנתונים נשמרו בהצלחה לקובץ Excel.", parent=self.root)
 
-        except Exception as e:
+        def on_error(e):
+            dialog.close()
             show_error_with_copy("שגיאה בשמירה", f"אירעה שגיאה בעת שמירת הנתונים: {e}", parent=self.root)
 
+        job = self.job_runner.submit("save_data", _save_data_job, filepath, work,
+                                     on_done=on_done, on_error=on_error,
+                                     on_progress=dialog.update, on_cancel=dialog.close)
+        dialog.attach(job)
+
+    def export_portfolio_pdf(self):
+        """One PDF for every property: a summary page, then a section per tab."""
+        ensure_pdf_support(parent=self.root)
+        filepath = filedialog.asksaveasfilename(defaultextension=".pdf",
+                                                filetypes=[("PDF files", "*.pdf")],
+                                                title="שמור דוח תיק נכסים (PDF)")
+        if not filepath:
+            return
+
+        tabs = list(self.property_tabs)
+        for tab in tabs:
+            tab._restore_saved_result()
+        work = [(tab.pending_inputs(), tab._last_result) for tab in tabs]
+        labels = [f"נכס {tab.idx + 1}" for tab in tabs]
+        dialog = ProgressDialog(self.root, "ייצוא תיק נכסים")
+
+        def on_done(computed):
+            dialog.close()
+            failed = []
+            for tab, label, (inputs, result, error) in zip(tabs, labels, computed):
+                if inputs is not None:
+                    tab.apply_result(inputs, result, error, report_errors=False)
+                if result is None:
+                    failed.append(f"{label}: {_error_text(error) if error is not None else ''}")
+            if failed:
+                show_error_with_copy("ייצוא ל-PDF", "הדוח נשמר, ללא הנכסים הבאים שלא חושבו:\n" + "\n".join(failed), parent=self.root)
+            else:
+                show_error_with_copy("ייצוא ל-PDF", "דוח התיק נשמר בהצלחה כקובץ PDF.", parent=self.root)
+
+        def on_error(e):
+            dialog.close()
+            if isinstance(e, CalculationError):
+                show_error_with_copy(e.title, e.message, parent=self.root)
+            else:
+                show_error_with_copy("שגיאת ייצוא ל-PDF", f"אירעה שגיאה בעת ייצוא ל-PDF: {e}", parent=self.root)
+
+        job = self.job_runner.submit("export_portfolio_pdf", _export_portfolio_job, filepath, work, labels,
+                                     self.vector_charts_var.get(), on_done=on_done, on_error=on_error,
+                                     on_progress=dialog.update, on_cancel=dialog.close)
+        dialog.attach(job)
+
     def load_data(self):
         filepath = filedialog.askopenfilename(defaultextension=".xlsx", 
                                                 filetypes=[("Excel files", "*.xlsx")],
@@ -1115,104 +4436,112 @@ class MortgageCalculatorApp:
         if not filepath:
             return
 
-        try:
-            xls = pd.ExcelFile(filepath)
-            
-            for _ in range(len(self.property_tabs)):
-                self.notebook.forget(0)
-            self.property_tabs = []
-
-            if "סיכום נכסים" not in xls.sheet_names:
-                show_error_with_copy("שגיאה בטעינה", "קובץ Excel אינו מכיל גיליון 'סיכום נכסים'.", parent=self.root)
-                return
+        started = time.perf_counter_ns()
+        dialog = ProgressDialog(self.root, "טעינת נתונים")
 
-            summary_df = pd.read_excel(xls, sheet_name="סיכום נכסים")
-
-            for index, row in summary_df.iterrows():
-                self.add_tab()
-                current_tab = self.property_tabs[-1]
-
-                current_tab.alias_entry.delete(0, tk.END)
-                current_tab.alias_entry.insert(0, row.get("Alias", ""))
-                
-                current_tab.link_entry.delete(0, tk.END)
-                current_tab.link_entry.insert(0, row.get("Link", ""))
-
-                current_tab.price_entry.delete(0, tk.END)
-                if not row.get("חשב מחיר נכס לפי הון עצמי"): 
-                    price_val = row.get("מחיר דירה (₪)")
-                    if pd.notna(price_val):
-                        current_tab.price_entry.insert(0, str(int(price_val)))
-
-                current_tab.area_entry.delete(0, tk.END)
-                area_val = row.get("מטר מרובע (שטח)")
-                if pd.notna(area_val):
-                    current_tab.area_entry.insert(0, str(int(area_val)))
-
-                current_tab.ltv_entry.delete(0, tk.END)
-                ltv_val = row.get("אחוז מימון (LTV) %")
-                if pd.notna(ltv_val):
-                    current_tab.ltv_entry.insert(0, str(int(ltv_val)))
-
-                current_tab.rent_entry.delete(0, tk.END)
-                rent_val = row.get("שכירות חודשית צפויה (₪)")
-                if pd.notna(rent_val):
-                    current_tab.rent_entry.insert(0, str(int(rent_val)))
-
-                current_tab.skip_tax_var.set(row.get("בטל מס רכישה") == "כן")
-                current_tab.include_tax_in_mortgage_var.set(row.get("כלול מס רכישה במשכנתא") == "כן")
-
-                manual_lawyer = (row.get("הזן עלות עו\"ד ידנית") == "כן")
-                current_tab.manual_lawyer_fee_var.set(manual_lawyer)
-                current_tab._toggle_lawyer_fee_entry() 
-                if manual_lawyer and pd.notna(row.get("עלות עו\"ד ידנית")):
-                    current_tab.lawyer_fee_manual_entry.delete(0, tk.END)
-                    current_tab.lawyer_fee_manual_entry.insert(0, str(int(row["עלות עו\"ד ידנית"])))
-
-                manual_broker = (row.get("הזן עלות מתווך ידנית") == "כן")
-                current_tab.manual_broker_fee_var.set(manual_broker)
-                current_tab._toggle_broker_fee_entry() 
-                if manual_broker and pd.notna(row.get("עלות מתווך ידנית")):
-                    current_tab.broker_fee_manual_entry.delete(0, tk.END)
-                    current_tab.broker_fee_manual_entry.insert(0, str(int(row["עלות מתווך ידנית"])))
-                current_tab.skip_broker_var.set(row.get("בטל עלות מתווך") == "כן")
-
-                calc_afford = (row.get("חשב מחיר נכס לפי הון עצמי") == "כן")
-                current_tab.calculate_affordability_var.set(calc_afford)
-                current_tab._toggle_affordability_calculation() 
-                if calc_afford and pd.notna(row.get("הון עצמי זמין (₪)")):
-                    current_tab.available_funds_entry.delete(0, tk.END)
-                    current_tab.available_funds_entry.insert(0, str(int(row["הון עצמי זמין (₪)"])))
-                
-                for i in range(3):
-                    rate_col = f"תרחיש {i+1} - ריבית שנתית (%)"
-                    years_col = f"תרחיש {i+1} - שנים להחזר"
-                    
-                    current_tab.rate_entries[i].delete(0, tk.END)
-                    rate_val = row.get(rate_col)
-                    if pd.notna(rate_val):
-                        current_tab.rate_entries[i].insert(0, str(rate_val))
-
-                    current_tab.years_entries[i].delete(0, tk.END)
-                    years_val = row.get(years_col)
-                    if pd.notna(years_val):
-                        current_tab.years_entries[i].insert(0, str(int(years_val)))
-                
-                current_tab.calculate() 
-
-            show_error_with_copy("טעינה בוצעה", "הנתונים נטענו בהצלחה מקובץ Excel.", parent=self.root)
+        def on_error(e):
+            dialog.close()
+            if isinstance(e, CalculationError):
+                show_error_with_copy(e.title, e.message, parent=self.root)
+            else:
+                show_error_with_copy("שגיאה בטעינה", f"אירעה שגיאה בעת טעינת הנתונים: {e}", parent=self.root)
+
+        def on_done(outcome):
+            loaded, problems = outcome
+            populate_started = time.perf_counter_ns()
+
+            def report():
+                SPANS.record("load_data.populate", populate_started)
+                SPANS.record("load_data", started)
+                if problems:
+                    show_error_with_copy("טעינה הושלמה עם שגיאות",
+                                         f"נטענו {len(loaded)} נכסים. השורות הבאות לא נטענו או לא חושבו:\n" + "\n".join(problems),
+                                         parent=self.root)
+                else:
+                    show_error_with_copy("טעינה בוצעה", "הנתונים נטענו בהצלחה מקובץ Excel.", parent=self.root)
 
-        except Exception as e:
-            show_error_with_copy("שגיאה בטעינה", f"אירעה שגיאה בעת טעינת הנתונים: {e}", parent=self.root)
+            # Imported tabs do not belong to the open project any more.
+            self._set_project(None)
+            self._populate_tabs(loaded, dialog, report)
 
+        job = self.job_runner.submit("load_data", lambda job: read_property_workbook(filepath, job),
+                                     on_done=on_done,
+                                     on_error=on_error, on_progress=dialog.update, on_cancel=dialog.close)
+        dialog.attach(job)
 
-if __name__ == "__main__":
-    # Configure Matplotlib for Hebrew support
-    # Using 'DejaVu Sans' as a fallback if 'Arial Unicode MS' is not available
-    plt.rcParams['font.family'] = 'DejaVu Sans' 
-    plt.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'DejaVu Sans', 'sans-serif'] 
-    plt.rcParams['axes.unicode_minus'] = False 
+    # Tabs added per Tk tick while populating, so the window keeps repainting.
+    POPULATE_BATCH = 50
 
+    def _populate_tabs(self, loaded, dialog, on_complete, project=None, property_ids=None):
+        for old_tab in self.property_tabs:
+            old_tab.release_charts()
+            self.notebook.forget(old_tab.frame)
+            old_tab.frame.destroy()
+        self.property_tabs = []
+        self._viewed_tabs = []
+
+        def step(start):
+            if dialog.job is not None and dialog.job.cancelled:
+                dialog.close()
+                return
+            # Tabs stay unbuilt here: they only hold their inputs and the
+            # result computed on the worker until the user opens them.
+            for n in range(start, min(start + self.POPULATE_BATCH, len(loaded))):
+                inputs, result, error = loaded[n]
+                tab = self.add_tab(select=False)
+                tab.set_inputs(inputs)
+                tab.apply_result(inputs, result, error, report_errors=False)
+                if project is not None:
+                    tab.mark_saved(project, property_ids[n], inputs)
+            done = min(start + self.POPULATE_BATCH, len(loaded))
+            dialog.update(done, len(loaded), "בונה לשוניות...")
+            if done < len(loaded):
+                self.root.after(1, step, done)
+            else:
+                dialog.close()
+                if self.property_tabs:
+                    self.notebook.select(self.property_tabs[-1].frame)
+                    self._show_tab(self.property_tabs[-1])
+                on_complete()
+
+        step(0)
+
+
+def _compute_work(job, work):
+    # work holds (inputs, result) per tab, inputs None when result is current.
+    computed = []
+    for n, (inputs, result) in enumerate(work):
+        job.check_cancelled()
+        job.report(n, len(work), "מחשב נכסים...")
+        error = None
+        if inputs is not None:
+            try:
+                result = compute_property(inputs)
+            except Exception as e:
+                result, error = None, e
+        computed.append((inputs, result, error))
+    return computed
+
+def _save_data_job(job, filepath, work):
+    with SPANS.span("save_data.compute"):
+        computed = _compute_work(job, work)
+    with SPANS.span("save_data.write"):
+        write_property_workbook(filepath, [result for _, result, _ in computed], job)
+    return computed
+
+def _export_portfolio_job(job, filepath, work, labels, vector_charts):
+    computed = _compute_work(job, work)
+    entries = [(label, result) for label, (_, result, _) in zip(labels, computed) if result is not None]
+    if not entries:
+        raise CalculationError("אין נתונים לייצוא", "אף אחד מהנכסים לא חושב בהצלחה.")
+    write_portfolio_pdf(filepath, entries, vector_charts, job)
+    return computed
+
+
+if __name__ == "__main__":
     root = tk.Tk()
     app = MortgageCalculatorApp(root)
-    root.mainloop()
\ No newline at end of file
+    if "--startup-report" in sys.argv:
+        root.wait_visibility(root)
+        report_startup()
+    root.mainloop()
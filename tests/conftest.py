@@ -0,0 +1,46 @@
+import os
+import random
+import sys
+
+# secondsimulator.py is a single script at the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import secondsimulator as sim
+
+
+# Also the portfolio benchmark.py runs on.
+def synthetic_portfolio(count, seed=0):
+    """`count` PropertyInputs with a realistic spread of prices and loans.
+
+    About a quarter use the affordability solve, a fifth have a three-track
+    mix in their last scenario and one in ten uses exact agorot schedules.
+    """
+    rng = random.Random(seed)
+    portfolio = []
+    for n in range(count):
+        rates = [f"{rng.uniform(2.5, 6.5):.2f}" for _ in range(3)]
+        years = [str(rng.choice((15, 20, 25, 30))) for _ in range(3)]
+        tracks = [[], [], []]
+        if n % 5 == 4:
+            tracks[2] = [
+                {"kind": "פריים", "share": 40, "rate": f"{rng.uniform(4, 6):.2f}", "years": 30},
+                {"kind": "קבועה לא צמודה", "share": 30, "rate": f"{rng.uniform(4, 5.5):.2f}", "years": 25},
+                {"kind": "קבועה צמודה", "share": 30, "rate": f"{rng.uniform(2.5, 4):.2f}", "years": 20},
+            ]
+        affordability = n % 4 == 3
+        portfolio.append(sim.PropertyInputs(
+            alias=f"נכס {n + 1}",
+            price="" if affordability else str(rng.randrange(900_000, 4_500_000, 1_000)),
+            area=str(rng.randrange(45, 180)),
+            ltv=str(rng.choice((50, 60, 70, 75))),
+            rent=str(rng.randrange(3_000, 9_000, 50)),
+            skip_broker=n % 3 == 0,
+            calculate_affordability=affordability,
+            available_funds=str(rng.randrange(400_000, 1_500_000, 1_000)) if affordability else "",
+            rates=rates,
+            years=years,
+            tracks=tracks,
+            inflation="2.5" if any(tracks) else "",
+            exact_agorot=n % 10 == 9,
+        ))
+    return portfolio
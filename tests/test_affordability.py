@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+import secondsimulator as sim
+
+CONFIGS = [
+    dict(ltv=70),
+    dict(ltv=50, include_tax_in_mortgage=True),
+    dict(ltv=75, skip_tax=True),
+    dict(ltv=60, lawyer_fee=12_000, broker_fee=0),
+    dict(ltv=0),
+]
+KINKS = [kink for kink in sim._purchase_tax_kinks() if kink > 0]
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+@pytest.mark.parametrize("offset", [-25_000.0, -0.5, 0.0, 0.5, 25_000.0])
+def test_residual_on_each_side_of_the_tax_kinks(config, offset):
+    for kink in KINKS:
+        target = kink + offset
+        funds = sim.total_funds_needed(target, **config)
+        price = sim.solve_affordable_price(funds, **config)
+        assert sim.total_funds_needed(price, **config) == pytest.approx(funds, rel=1e-12, abs=1e-6)
+        assert price == pytest.approx(target, rel=1e-9)
+
+
+def test_array_of_funds_keeps_its_shape():
+    funds = np.array([[300_000.0, 900_000.0], [2_000_000.0, 5_000_000.0]])
+    prices = sim.solve_affordable_price(funds, 70)
+    assert prices.shape == funds.shape
+    for price, available in zip(prices.ravel(), funds.ravel()):
+        assert sim.total_funds_needed(price, 70) == pytest.approx(available, rel=1e-12)
+
+
+def test_nan_when_funds_do_not_cover_the_fixed_fees():
+    assert np.isnan(sim.solve_affordable_price(40_000, 70, lawyer_fee=30_000, broker_fee=20_000))
+
+
+def test_inf_when_needed_capital_does_not_grow_with_price():
+    price = sim.solve_affordable_price(50_000, 100, skip_tax=True, lawyer_fee=10_000, broker_fee=0)
+    assert np.isinf(price)
+
+
+def affordability_inputs(**overrides):
+    inputs = sim.PropertyInputs(calculate_affordability=True, rates=["4", "", ""], years=["25", "", ""])
+    for name, value in overrides.items():
+        setattr(inputs, name, value)
+    return inputs
+
+
+def test_compute_property_rejects_funds_below_the_fixed_fees():
+    inputs = affordability_inputs(available_funds="40000", manual_lawyer_fee=True, lawyer_fee_manual_value="30000",
+                                  manual_broker_fee=True, broker_fee_manual_value="20000")
+    with pytest.raises(sim.CalculationError):
+        sim.compute_property(inputs)
+
+
+def test_compute_property_rejects_a_price_independent_capital():
+    inputs = affordability_inputs(available_funds="50000", ltv="100", skip_tax=True, skip_broker=True,
+                                  manual_lawyer_fee=True, lawyer_fee_manual_value="10000")
+    with pytest.raises(sim.CalculationError):
+        sim.compute_property(inputs)
+
+
+def test_compute_property_solves_the_price():
+    result = sim.compute_property(affordability_inputs(available_funds="1000000", ltv="70"))
+    price = result.calculated_results["calculated_price"]
+    assert sim.total_funds_needed(price, 70) == pytest.approx(1_000_000, rel=1e-12)
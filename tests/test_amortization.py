@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import secondsimulator as sim
+
+
+def loop_amortization_df(loan_amount, annual_rate, years):
+    """The month-by-month loop generate_amortization_df used before the closed form."""
+    if loan_amount <= 0 or annual_rate < 0 or years <= 0:
+        return pd.DataFrame()
+    payment = sim.calculate_monthly_payment(loan_amount, annual_rate, years)
+    balance = loan_amount
+    data = []
+    for month in range(1, years * 12 + 1):
+        if balance <= 0:
+            break
+        interest = balance * (annual_rate / 100) / 12
+        principal = min(payment - interest, balance)
+        balance -= principal
+        data.append({
+            "חודש": round(month, 2),
+            "קרן": round(principal, 2),
+            "ריבית": round(interest, 2),
+            "יתרה": round(max(balance, 0), 2),
+            "תשלום חודשי": round(payment, 2),
+        })
+    return pd.DataFrame(data)
+
+
+def random_loans(count, seed):
+    rng = np.random.default_rng(seed)
+    loans = np.round(rng.uniform(10_000, 3_000_000, count), 2)
+    rates = np.round(rng.uniform(0, 12, count), 2)
+    rates[::7] = 0.0
+    years = rng.integers(1, 36, count)
+    return [(float(loan), float(rate), int(term)) for loan, rate, term in zip(loans, rates, years)]
+
+
+@pytest.mark.parametrize("loan_amount,annual_rate,years", random_loans(60, seed=1))
+def test_closed_form_matches_loop(loan_amount, annual_rate, years):
+    expected = loop_amortization_df(loan_amount, annual_rate, years)
+    actual = sim.generate_amortization_df(loan_amount, annual_rate, years)
+
+    assert actual.shape == expected.shape
+    assert list(actual.columns) == list(expected.columns)
+    assert actual.dtypes.to_dict() == expected.dtypes.to_dict()
+    assert (actual["חודש"] == expected["חודש"]).all()
+    # Both sides are rounded to agorot, so values may differ by one rounding step.
+    difference = np.abs(actual.to_numpy(dtype=float) - expected.to_numpy(dtype=float))
+    assert difference.max() <= 0.01 + 1e-9
+
+
+@pytest.mark.parametrize("loan_amount,annual_rate,years", [(0, 4, 25), (-1, 4, 25), (500_000, -1, 25), (500_000, 4, 0)])
+def test_invalid_loans_give_an_empty_frame(loan_amount, annual_rate, years):
+    df = sim.generate_amortization_df(loan_amount, annual_rate, years)
+    assert df.empty
+    assert loop_amortization_df(loan_amount, annual_rate, years).empty
+
+
+def test_batch_matches_generate_schedule_for_mixed_terms():
+    loans = [350_000.0, 1_200_000.0, 80_000.0, 640_000.0, 500_000.0]
+    rates = [4.25, 0.0, 11.5, 3.1, 0.0]
+    years = [30, 20, 1, 12, 5]
+    batch = sim.batch_amortization(loans, rates, years)
+    width = max(years) * 12
+    assert batch["principal"].shape == (len(loans), width)
+
+    for row, (loan, rate, term) in enumerate(zip(loans, rates, years)):
+        schedule = sim.generate_schedule(loan, rate, term)
+        months = len(schedule)
+        assert batch["months"][row] == months == term * 12
+        for key in ("principal", "interest", "balance", "payment"):
+            # The schedule is rounded to agorot, the batch is not.
+            np.testing.assert_allclose(batch[key][row, :months], getattr(schedule, key), atol=0.005 + 1e-9)
+            assert (batch[key][row, months:] == 0).all()
+        assert not batch["after_term"][row, :months].any()
+        assert batch["after_term"][row, months:].all()
+        assert batch["total_interest"][row] == pytest.approx(schedule.total_interest, abs=0.01 * months)
+
+
+def test_batch_refuses_results_over_the_memory_budget():
+    with pytest.raises(ValueError, match="iter_batch_amortization"):
+        sim.batch_amortization([100_000.0] * 10, 4.0, 30, max_bytes=1024)
+    totals = sim.batch_amortization_totals([100_000.0] * 10, 4.0, 30)
+    assert totals["months"].tolist() == [360] * 10
+
+
+def test_totals_use_whole_months_for_fractional_terms():
+    loans, rates, years = np.array([500_000.0, 500_000.0]), np.array([4.0, 0.0]), np.array([10.05, 7.4])
+    payment, total_interest, total_paid = sim.loan_totals(loans, rates, years)
+    batch = sim.batch_amortization(loans, rates, years)
+    assert batch["months"].tolist() == [120, 88]
+    np.testing.assert_allclose(payment, batch["payment"][:, 0])
+    np.testing.assert_allclose(total_paid, batch["total_paid"])
+    np.testing.assert_allclose(total_interest, batch["total_interest"], atol=1e-6)
+    indexed = sim.indexed_totals(loans, rates, years, 0.0)
+    np.testing.assert_allclose(indexed["total_paid"], total_paid)
+    np.testing.assert_allclose(indexed["total_interest"], total_interest, atol=1e-6)
@@ -0,0 +1,19 @@
+import secondsimulator as sim
+
+
+def test_memoized_result_does_not_depend_on_cache_state():
+    sim.clear_caches()
+    before = sim.PAYMENT_CACHE.stats()
+    from_text = sim.calculate_monthly_payment("300000", "4.5", "25")
+    from_numbers = sim.calculate_monthly_payment(300000, 4.5, 25)
+    after = sim.PAYMENT_CACHE.stats()
+    assert (after["misses"] - before["misses"], after["hits"] - before["hits"]) == (1, 1)
+    sim.clear_caches()
+    assert sim.calculate_monthly_payment(300000.0, 4.5, 25.0) == from_text == from_numbers
+    assert sim.calculate_purchase_tax("2000000") == sim.calculate_purchase_tax(2_000_000)
+
+
+def test_cached_values_are_shared_not_recomputed():
+    sim.clear_caches()
+    first = sim.generate_schedule(500_000, 4, 30)
+    assert sim.generate_schedule("500000", "4", "30") is first
@@ -0,0 +1,105 @@
+from decimal import ROUND_HALF_EVEN, ROUND_HALF_UP, Decimal, localcontext
+
+import numpy as np
+import pytest
+
+import secondsimulator as sim
+
+
+ROUNDING = {"half_up": ROUND_HALF_UP, "half_even": ROUND_HALF_EVEN}
+AGORA = Decimal("0.01")
+
+
+def reference_schedule(loan_amount, annual_rate, years, rounding):
+    """Lender schedule in agorot, computed month by month with Decimal.
+
+    The payment is the annuity formula rounded once to agorot, each month's
+    interest is rounded to agorot and the last payment clears the balance.
+    """
+    mode = ROUNDING[rounding]
+    with localcontext() as context:
+        context.prec = 50
+        loan = Decimal(str(loan_amount)).quantize(AGORA, rounding=mode)
+        monthly_rate = Decimal(str(annual_rate)) / 1200
+        months = years * 12
+        if monthly_rate == 0:
+            payment = loan / months
+        else:
+            payment = loan * monthly_rate / (1 - (1 + monthly_rate) ** -months)
+        payment = payment.quantize(AGORA, rounding=mode)
+        balance = loan
+        rows = []
+        for month in range(months):
+            interest = (balance * monthly_rate).quantize(AGORA, rounding=mode)
+            principal = balance if month == months - 1 else min(max(payment - interest, Decimal(0)), balance)
+            balance -= principal
+            rows.append([int(value * 100) for value in (principal, interest, balance, principal + interest)])
+    return np.array(rows, dtype=np.int64).T
+
+
+def random_loans(count, seed):
+    rng = np.random.default_rng(seed)
+    loans = np.round(rng.uniform(1_000, 4_000_000, count), 2)
+    rates = np.round(rng.uniform(0, 15, count), 4)
+    rates[::9] = 0.0
+    years = rng.integers(1, 36, count)
+    return [float(x) for x in loans], [float(x) for x in rates], [int(x) for x in years]
+
+
+@pytest.mark.parametrize("rounding", sim.ROUNDING_MODES)
+def test_batch_reconciles_exactly_in_agorot(rounding):
+    loans, rates, years = random_loans(150, seed=7)
+    batch = sim.exact_batch_amortization(loans, rates, years, rounding)
+    for key in ("principal", "interest", "balance", "payment"):
+        assert batch[key].dtype == np.int64
+
+    for row, (loan, rate, term) in enumerate(zip(loans, rates, years)):
+        months = batch["months"][row]
+        assert months == term * 12
+        principal, interest, balance, payment = (batch[key][row, :months]
+                                                 for key in ("principal", "interest", "balance", "payment"))
+        assert principal.sum() == sim._round_agorot(loan, rounding)
+        assert (payment == principal + interest).all()
+        assert balance[-1] == 0
+        assert (balance >= 0).all()
+        assert batch["total_paid"][row] == principal.sum() + batch["total_interest"][row]
+        np.testing.assert_array_equal(np.vstack([principal, interest, balance, payment]),
+                                      reference_schedule(loan, rate, term, rounding))
+
+
+def test_generate_schedule_in_agorot():
+    for loan, rate, term in zip(*random_loans(40, seed=11)):
+        schedule = sim.generate_schedule(loan, rate, term, agorot=True)
+        assert sim.generate_schedule(loan, rate, term, True) is schedule
+        assert schedule.agorot and schedule.values.dtype == np.int64
+        principal, interest, balance, payment = schedule.values
+        assert principal.sum() == round(loan * 100)
+        assert (payment == principal + interest).all()
+        assert balance[-1] == 0
+        assert schedule.total_paid == pytest.approx(loan + schedule.total_interest, abs=1e-6)
+
+
+def test_generate_schedule_keyword_and_default_forms_share_entries():
+    sim.clear_caches()
+    exact = sim.generate_schedule(100_000, 5, 10, agorot=True)
+    assert exact.agorot
+    assert sim.generate_schedule(loan_amount=100_000, annual_rate=5, years=10, agorot=True) is exact
+    plain = sim.generate_schedule(100_000, 5, 10)
+    assert not plain.agorot
+    assert sim.generate_schedule(100_000, 5, 10, agorot=False) is plain
+    with pytest.raises(TypeError):
+        sim.generate_schedule(100_000, 5, 10, rounding="half_up")
+
+
+def test_rounding_modes_differ_only_on_ties():
+    numerators = np.array([5, 7, 9, 11, 4, 6], dtype=np.int64)
+    assert sim._divide_rounded(numerators, 2, "half_up").tolist() == [3, 4, 5, 6, 2, 3]
+    assert sim._divide_rounded(numerators, 2, "half_even").tolist() == [2, 4, 4, 6, 2, 3]
+    assert sim._divide_rounded(np.array([7]), 3, "half_even").tolist() == [2]
+    assert sim._round_agorot([0.125, 0.135, 0.5], "half_up").tolist() == [13, 14, 50]
+    assert sim._round_agorot([0.125, 0.375, 0.5], "half_even").tolist() == [12, 38, 50]
+
+
+def test_unknown_rounding_mode():
+    with pytest.raises(ValueError):
+        sim.exact_batch_amortization([100_000], [4], [10], "truncate")
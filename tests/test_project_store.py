@@ -0,0 +1,95 @@
+import json
+import sqlite3
+from contextlib import closing
+from dataclasses import asdict
+
+import numpy as np
+import pytest
+
+import secondsimulator as sim
+from conftest import synthetic_portfolio
+
+
+@pytest.fixture
+def store(tmp_path):
+    return sim.ProjectStore(str(tmp_path / "project") + sim.PROJECT_FILE_EXTENSION)
+
+
+def test_save_and_open_round_trip(store):
+    portfolio = synthetic_portfolio(5, seed=5)
+    results = [sim.compute_property(inputs) for inputs in portfolio]
+    ids = store.save([(None, inputs, result) for inputs, result in zip(portfolio, results)])
+
+    reopened = sim.ProjectStore(store.path)
+    loaded = reopened.load_inputs()
+    assert [property_id for property_id, _ in loaded] == ids
+    assert [inputs for _, inputs in loaded] == portfolio
+    for property_id, result in zip(ids, results):
+        saved = reopened.load_result(property_id)
+        assert saved.table_rows == result.table_rows
+        assert saved.calculated_results["scenario_payments"] == result.calculated_results["scenario_payments"]
+        for schedule, expected in zip(saved.df_list, result.df_list):
+            assert (schedule is None) == (expected is None)
+            if schedule is not None:
+                np.testing.assert_array_equal(schedule.shekels(), expected.shekels())
+
+
+def test_incremental_save_reorders_and_deletes(store):
+    portfolio = synthetic_portfolio(3, seed=6)
+    ids = store.save([(None, inputs, None) for inputs in portfolio])
+    # Unchanged properties are passed without inputs; the missing one is deleted.
+    assert store.save([(ids[2], None, None), (ids[0], None, None)]) == [ids[2], ids[0]]
+    assert store.load_inputs() == [(ids[2], portfolio[2]), (ids[0], portfolio[0])]
+    assert store.load_result(ids[0]) is None
+
+
+def test_inputs_from_other_builds(store):
+    current = asdict(synthetic_portfolio(1)[0])
+    older = {key: value for key, value in current.items() if key not in ("tracks", "inflation", "exact_agorot")}
+    newer = dict(current, some_future_field=1)
+    with closing(sqlite3.connect(store.path)) as conn, conn:
+        for position, inputs in enumerate((older, newer)):
+            conn.execute("INSERT INTO properties (position, alias, inputs) VALUES (?, ?, ?)",
+                         (position, inputs["alias"], json.dumps(inputs, ensure_ascii=False)))
+    (_, from_older), (_, from_newer) = store.load_inputs()
+    assert from_older.tracks == [[], [], []] and from_older.inflation == "" and from_older.exact_agorot is False
+    assert asdict(from_newer) == current
+
+
+def test_refuses_a_newer_schema(store):
+    with closing(sqlite3.connect(store.path)) as conn:
+        conn.execute(f"PRAGMA user_version = {sim.PROJECT_SCHEMA_VERSION + 1}")
+    with pytest.raises(sim.CalculationError):
+        sim.ProjectStore(store.path)
+
+
+def test_agorot_schedules_keep_their_type(store):
+    inputs = synthetic_portfolio(1, seed=7)[0]
+    inputs.exact_agorot = True
+    result = sim.compute_property(inputs)
+    [property_id] = store.save([(None, inputs, result)])
+    for schedule, expected in zip(store.load_result(property_id).df_list, result.df_list):
+        if expected is not None:
+            assert schedule.agorot and schedule.values.dtype == np.int64
+            np.testing.assert_array_equal(schedule.values, expected.values)
+
+
+def test_opens_version_2_files(tmp_path):
+    path = str(tmp_path / "old.mortgage")
+    with closing(sqlite3.connect(path)) as conn:
+        conn.executescript(sim.PROJECT_SCHEMA.replace("    agorot INTEGER NOT NULL DEFAULT 0,\n", ""))
+        conn.execute("PRAGMA user_version = 2")
+    store = sim.ProjectStore(path)
+    inputs = synthetic_portfolio(1, seed=8)[0]
+    [property_id] = store.save([(None, inputs, sim.compute_property(inputs))])
+    assert any(schedule is not None for schedule in store.load_result(property_id).df_list)
+
+
+def test_refuses_other_sqlite_files(tmp_path):
+    path = str(tmp_path / "other.db")
+    with closing(sqlite3.connect(path)) as conn:
+        conn.execute("CREATE TABLE notes (body TEXT)")
+    with pytest.raises(sim.CalculationError):
+        sim.ProjectStore(path)
+    with closing(sqlite3.connect(path)) as conn:
+        assert [row[0] for row in conn.execute("SELECT name FROM sqlite_master")] == ["notes"]
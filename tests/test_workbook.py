@@ -0,0 +1,115 @@
+import openpyxl
+import pytest
+
+import secondsimulator as sim
+from conftest import synthetic_portfolio
+
+LTV = "אחוז מימון (LTV) %"
+
+
+@pytest.fixture
+def portfolio():
+    return synthetic_portfolio(6, seed=3)
+
+
+@pytest.fixture
+def workbook_path(tmp_path, portfolio):
+    path = str(tmp_path / "portfolio.xlsx")
+    sim.write_property_workbook(path, [sim.compute_property(inputs) for inputs in portfolio])
+    return path
+
+
+def test_round_trip(workbook_path, portfolio):
+    loaded, problems = sim.read_property_workbook(workbook_path)
+    assert problems == []
+    assert len(loaded) == len(portfolio)
+    for (inputs, result, error), original in zip(loaded, portfolio):
+        assert error is None
+        # A scenario with a mix ignores its typed rate and term; the file
+        # holds the mix's weighted rate and longest term instead.
+        for i, tracks in enumerate(original.tracks):
+            if tracks:
+                original.rates[i], original.years[i] = inputs.rates[i], inputs.years[i]
+        assert sim._inputs_key(inputs) == sim._inputs_key(original)
+        expected = sim.compute_property(original).calculated_results
+        assert result.calculated_results["scenario_payments"] == expected["scenario_payments"]
+
+
+@pytest.mark.skipif(not sim._declares_dimensions(openpyxl), reason="openpyxl outside the pinned series")
+def test_every_sheet_declares_its_dimension(workbook_path):
+    workbook = openpyxl.load_workbook(workbook_path, read_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            rows = sum(1 for _ in worksheet.iter_rows(values_only=True))
+            assert worksheet.calculate_dimension() == f"A1:{openpyxl.utils.get_column_letter(worksheet.max_column)}{rows}"
+    finally:
+        workbook.close()
+
+
+def test_round_trip_without_declared_dimensions(tmp_path, monkeypatch, portfolio):
+    monkeypatch.setattr(sim, "OPENPYXL_DIMENSION_SERIES", ())
+    path = str(tmp_path / "plain.xlsx")
+    sim.write_property_workbook(path, [sim.compute_property(inputs) for inputs in portfolio])
+    loaded, problems = sim.read_property_workbook(path)
+    assert problems == [] and len(loaded) == len(portfolio)
+
+
+def test_malformed_rows_are_reported_and_skipped(tmp_path, workbook_path, portfolio):
+    workbook = openpyxl.load_workbook(workbook_path)
+    summary = workbook[sim.SUMMARY_SHEET_NAME]
+    header = [cell.value for cell in summary[1]]
+    ltv = header.index(LTV) + 1
+    summary.cell(row=3, column=ltv, value="abc")   # unparsable: no inputs
+    summary.cell(row=4, column=ltv, value=150)     # parses, fails to compute
+    summary.append([None] * len(header))           # blank rows are ignored
+    broken = str(tmp_path / "broken.xlsx")
+    workbook.save(broken)
+
+    loaded, problems = sim.read_property_workbook(broken)
+    assert len(problems) == 2
+    assert problems[0].startswith("שורה 3") and problems[1].startswith("שורה 4")
+    assert len(loaded) == len(portfolio) - 1
+    failed = [entry for entry in loaded if entry[2] is not None]
+    assert len(failed) == 1 and isinstance(failed[0][2], sim.CalculationError) and failed[0][1] is None
+
+
+def test_problems_name_the_sheet_row_after_blank_rows(tmp_path, workbook_path, portfolio):
+    workbook = openpyxl.load_workbook(workbook_path)
+    summary = workbook[sim.SUMMARY_SHEET_NAME]
+    ltv = [cell.value for cell in summary[1]].index(LTV) + 1
+    summary.insert_rows(3, amount=2)                 # blank rows 3-4, not written to the file
+    summary.cell(row=5, column=ltv, value="abc")
+    summary.cell(row=8, column=ltv, value=150)
+    broken = str(tmp_path / "gaps.xlsx")
+    workbook.save(broken)
+
+    loaded, problems = sim.read_property_workbook(broken)
+    assert [problem.split(" (")[0] for problem in problems] == ["שורה 5", "שורה 8"]
+    assert len(loaded) == len(portfolio) - 1
+
+
+def test_workbook_without_summary_sheet(tmp_path):
+    path = str(tmp_path / "other.xlsx")
+    workbook = openpyxl.Workbook()
+    workbook.active.append(["x"])
+    workbook.save(path)
+    with pytest.raises(sim.CalculationError):
+        sim.read_property_workbook(path)
+
+
+def test_sheet_names_fit_excel_and_stay_distinct(tmp_path, portfolio):
+    long_alias = "דירת ארבעה חדרים ברחוב הרצל בתל אביב יפו"
+    for inputs, alias in zip(portfolio, [long_alias, long_alias, "a/b", "A/B", "", ""]):
+        inputs.alias = alias
+    path = str(tmp_path / "names.xlsx")
+    sim.write_property_workbook(path, [sim.compute_property(inputs) for inputs in portfolio])
+
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    names = workbook.sheetnames
+    workbook.close()
+    assert all(len(name) <= sim.SHEET_NAME_LIMIT for name in names)
+    assert len({name.casefold() for name in names}) == len(names)
+    labels = sim.schedule_sheet_labels([inputs.alias for inputs in portfolio])
+    assert labels[0] == long_alias[:len(labels[0])] and labels[1].endswith(" (2)")
+    assert labels[2:] == ["a_b", "A_B (2)", "", " (2)"]
+    assert f"{labels[1]}_תרחיש_1" in names